@@ -0,0 +1,139 @@
+import hashlib
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+
+from results import preview
+
+# Words that make a question depend on the previous turns ("now show only electronics").
+FOLLOW_UP_MARKERS = {"now", "only", "those", "these", "that", "them", "it", "same", "instead", "previous", "above"}
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL and an optional pickle spill directory."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600, disk_dir: str = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pkl")
+
+    def _load_from_disk(self, key: str):
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                stored_key, value = pickle.load(f)
+            return value if stored_key == key else None
+        except Exception:
+            return None
+
+    def get(self, key: str, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+        value = self._load_from_disk(key) if self.disk_dir else None
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return default
+        self.set(key, value, persist=False)
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value, persist: bool = True):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        if self.disk_dir and persist:
+            try:
+                tmp = self._disk_path(key) + ".tmp"
+                with open(tmp, "wb") as f:
+                    pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self._disk_path(key))
+            except Exception as e:
+                print(f"⚠️ Could not persist cache entry: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(".pkl"):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, name))
+                    except OSError:
+                        pass
+
+    def __len__(self):
+        return len(self._data)
+
+
+class AnswerCache:
+    """
+    Three cache levels shared by every ChatBot in the process:
+    normalized question -> (English question, SQL), SQL -> result DataFrame,
+    result fingerprint -> summary text.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600, disk_dir: str = None):
+        def level(name):
+            return TTLCache(maxsize, ttl, os.path.join(disk_dir, name) if disk_dir else None)
+
+        self.questions = level("questions")
+        self.results = level("results")
+        self.summaries = level("summaries")
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        q = re.sub(r"\s+", " ", question.lower()).strip()
+        return q.strip(" ?!.")
+
+    @staticmethod
+    def normalize_sql(sql: str) -> str:
+        return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+    def question_key(self, question: str, memory_context: str = "") -> str:
+        """Context-free key unless the question refers back to earlier turns."""
+        q = self.normalize_question(question)
+        words = set(re.findall(r"[a-z_]+", q))
+        if words & FOLLOW_UP_MARKERS and memory_context:
+            return q + "\x00" + hashlib.sha1(memory_context.encode("utf-8")).hexdigest()
+        return q
+
+    @staticmethod
+    def result_fingerprint(sql: str, table: pa.Table) -> str:
+        h = hashlib.sha1(AnswerCache.normalize_sql(sql).encode("utf-8"))
+        h.update(str((table.num_rows, table.num_columns)).encode())
+        h.update(pd.util.hash_pandas_object(preview(table, 10), index=False).values.tobytes())
+        return h.hexdigest()
+
+    def clear(self):
+        self.questions.clear()
+        self.results.clear()
+        self.summaries.clear()
@@ -0,0 +1,120 @@
+import re
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Local chart recommendation from a result's schema and shape — replaces the per-render
+# model call. Works on the Arrow result; big results are reduced before plotting.
+
+TEMPORAL_NAMES = re.compile(r"(^|_)(date|day|month|year|week|quarter|timestamp|period|ts)($|_)")
+ID_NAMES = re.compile(r"(_id|_prefix)$|^id$")
+SHARE_NAMES = re.compile(r"share|pct|percent|proportion|ratio|fraction")
+ADDITIVE_NAMES = re.compile(r"count|total|sum|revenue|value|orders|qty|^n_|num")
+AVERAGE_NAMES = re.compile(r"avg|mean|median|min|max|rate|score")
+# dimensions whose values form a natural parts-of-a-whole split
+PIE_DIMENSIONS = {"payment_type", "order_status", "review_score", "main_payment_type"}
+
+MAX_PIE_SLICES = 6
+MAX_BAR_CATEGORIES = 30
+MAX_POINTS = 5000
+
+
+def _is_numeric(t: pa.DataType) -> bool:
+    return pa.types.is_integer(t) or pa.types.is_floating(t) or pa.types.is_decimal(t)
+
+
+def classify_columns(table: pa.Table) -> dict:
+    """Split columns into temporal / numeric / categorical (IDs are never plotted as measures)."""
+    kinds = {"temporal": [], "numeric": [], "categorical": []}
+    for field in table.schema:
+        name, t = field.name.lower(), field.type
+        if pa.types.is_timestamp(t) or pa.types.is_date(t) or (TEMPORAL_NAMES.search(name) and not pa.types.is_string(t)):
+            kinds["temporal"].append(field.name)
+        elif _is_numeric(t) and not ID_NAMES.search(name):
+            kinds["numeric"].append(field.name)
+        elif pa.types.is_string(t) or pa.types.is_large_string(t) or pa.types.is_dictionary(t) \
+                or pa.types.is_boolean(t) or _is_numeric(t):
+            kinds["categorical"].append(field.name)
+    return kinds
+
+
+def _stride_sample(table: pa.Table, max_rows: int) -> pa.Table:
+    if table.num_rows <= max_rows:
+        return table
+    step = -(-table.num_rows // max_rows)
+    return table.take(pa.array(range(0, table.num_rows, step)))
+
+
+def _is_additive(column: str) -> bool:
+    name = column.lower()
+    return bool(ADDITIVE_NAMES.search(name)) and not AVERAGE_NAMES.search(name)
+
+
+def _top_categories(table: pa.Table, x: str, y: str, limit: int) -> pa.Table:
+    """One row per x (sum for additive measures, mean otherwise); beyond `limit`, the rest become 'Other'."""
+    how = "sum" if _is_additive(y) else "mean"
+    grouped = table.group_by(x).aggregate([(y, how)]).rename_columns([x, y])
+    ordered = grouped.sort_by([(y, "descending")])
+    if ordered.num_rows <= limit:
+        return ordered
+    rest = ordered.slice(limit).column(y)
+    other = (pc.sum(rest) if how == "sum" else pc.mean(rest)).as_py()
+    return pa.table({
+        x: pc.cast(ordered.slice(0, limit).column(x), pa.string()).to_pylist() + ["Other"],
+        y: ordered.slice(0, limit).column(y).to_pylist() + [other],
+    })
+
+
+def _with_period(table: pa.Table) -> tuple:
+    """order_year + order_month → one sortable 'period' axis (YYYY-MM)."""
+    names = table.column_names
+    if "order_year" in names and "order_month" in names:
+        year = pc.cast(table.column("order_year"), pa.string())
+        month = pc.utf8_lpad(pc.cast(table.column("order_month"), pa.string()), 2, "0")
+        period = pc.binary_join_element_wise(year, month, "-")
+        return table.append_column("period", period), "period"
+    return table, None
+
+
+def recommend_chart(table: pa.Table, question: str = "") -> dict:
+    """
+    Returns {"type", "x", "y", "table", "title"}; type is one of
+    bar, line, pie, scatter, histogram or None. "table" is what should be plotted
+    (sorted, aggregated or down-sampled as needed). The question only hints share semantics.
+    """
+    none = {"type": None, "x": None, "y": None, "table": table, "title": None}
+    if table is None or table.num_rows == 0:
+        return none
+    kinds = classify_columns(table)
+    numeric, temporal, categorical = kinds["numeric"], kinds["temporal"], kinds["categorical"]
+
+    # time series
+    if temporal and numeric:
+        table, period = _with_period(table)
+        x = period or temporal[0]
+        y = numeric[0]
+        plotted = _stride_sample(table.sort_by([(x, "ascending")]), MAX_POINTS)
+        return {"type": "line", "x": x, "y": y, "table": plotted, "title": f"{y} trend"}
+
+    if categorical and numeric:
+        x, y = categorical[0], numeric[0]
+        n_categories = pc.count_distinct(table.column(x)).as_py()
+        non_negative = (pc.min(table.column(y)).as_py() or 0) >= 0
+        share_like = (SHARE_NAMES.search(y.lower()) or SHARE_NAMES.search(question.lower())
+                      or (x.lower() in PIE_DIMENSIONS and _is_additive(y)))
+        if n_categories <= MAX_PIE_SLICES and non_negative and share_like:
+            return {"type": "pie", "x": x, "y": y, "table": table, "title": f"{y} share by {x}"}
+        if n_categories > MAX_BAR_CATEGORIES or n_categories < table.num_rows:
+            table = _top_categories(table, x, y, MAX_BAR_CATEGORIES)
+        return {"type": "bar", "x": x, "y": y, "table": table, "title": f"{y} by {x}"}
+
+    if len(numeric) >= 2:
+        x, y = numeric[0], numeric[1]
+        return {"type": "scatter", "x": x, "y": y, "table": _stride_sample(table, MAX_POINTS),
+                "title": f"{y} vs {x}"}
+
+    if len(numeric) == 1 and table.num_rows > 1:
+        return {"type": "histogram", "x": numeric[0], "y": None, "table": table,
+                "title": f"Distribution of {numeric[0]}"}
+
+    return none
@@ -1,68 +1,317 @@
 # app/chatbot.py
 import google.generativeai as genai
 from query_executor import QueryExecutor
-from utils import clean_sql
+from utils import clean_sql, clean_json
+from cache import AnswerCache
+from results import preview, is_truncated
+from intents import IntentParser
+from schema_index import SchemaIndex
 import pandas as pd
+import pyarrow as pa
+import json
 from collections import deque
+from config import FUSED_PROMPTS, INTENT_FAST_PATH, SCHEMA_COMPACTION, MEMORY_SUMMARY_CHARS, SQL_PREVALIDATION
+from scheduler import Scheduler
+from tracing import get_tracer, record_usage, Tracer
 
 class ChatBot:
     """Conversational AI Assistant — generates SQL, executes, summarizes, and returns both text + dataframe."""
 
-    def __init__(self, api_key: str, model_name: str, df: pd.DataFrame):
+    def __init__(self, api_key: str, model_name: str, df: pd.DataFrame = None, executor: QueryExecutor = None,
+                 cache: AnswerCache = None, fused: bool = FUSED_PROMPTS, scheduler: Scheduler = None,
+                 fast_path: bool = INTENT_FAST_PATH, tracer: Tracer = None,
+                 compact_schema: bool = SCHEMA_COMPACTION, prevalidate: bool = SQL_PREVALIDATION):
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
-        self.executor = QueryExecutor(df)
+        self.executor = executor or QueryExecutor(df)
         self.df = df
         self.memory = deque(maxlen=6)
+        # per-bot cache unless a process-wide one is shared in
+        self.cache = cache or AnswerCache()
+        # translate + generate SQL in one structured call instead of two sequential ones
+        self.fused = fused
+        # shared rate limiter / thread pools used by ask_async
+        self.scheduler = scheduler
+        # template answers for common aggregate questions (built on first use)
+        self.fast_path = fast_path
+        self.intents = None
+        # per-stage spans (see tracing.py); the "trace" key of each answer is its root span
+        self.tracer = tracer or get_tracer()
+        # per-question schema excerpts instead of every column (built on first use)
+        self.compact_schema = compact_schema
+        self.schema_index = None
+        # bind generated SQL locally and fix misspelled identifiers before running it
+        self.prevalidate = prevalidate
 
-    def _generate_schema_description(self) -> str:
-        cols = list(self.df.columns)
-        return (
-            f"The dataset has {len(cols)} columns: {', '.join(cols)}.\n"
-            "Use 'olist' as the table name. Important columns:\n"
+    def _generate_schema_description(self, user_query: str = None) -> str:
+        if self.compact_schema and user_query:
+            if self.schema_index is None:
+                self.schema_index = SchemaIndex.from_executor(self.executor)
+            return self.schema_index.describe(user_query)
+        cols = list(self.df.columns) if self.df is not None else self.executor.columns()
+        # rollup_* tables are internal; QueryExecutor rewrites eligible queries onto them
+        tables = {t: c for t, c in self.executor.table_columns().items()
+                  if t != "olist" and not t.startswith("rollup_")}
+        desc = (
+            f"Table 'olist' is the denormalized join ({len(cols)} columns): {', '.join(cols)}.\n"
+            "It has one row per order item x payment x review, so order-level sums on it double-count.\n"
+            "Important columns:\n"
             "- product_category_name / product_category_name_english → category names\n"
             "- product_length_cm, product_height_cm, product_width_cm, product_weight_g → dimensions\n"
             "- price, payment_value, freight_value → financial metrics\n"
             "- delivery_days → delivery time (days)\n"
             "- review_score → 1–5 rating\n"
             "- customer_state, seller_geo_state → geography\n"
+            "- distance_km → seller-to-customer distance (km, between zip-prefix centroids)\n"
+            "Geo functions: haversine_km(lat1, lng1, lat2, lng2) returns km; "
+            "zips_within_km(lat, lng, km) is a table function (zip_prefix, city, state, distance_km).\n"
         )
+        if tables:
+            desc += "\nNormalized tables (prefer these — they scan far fewer rows):\n"
+            for table, table_cols in tables.items():
+                desc += f"- {table}({', '.join(table_cols)})\n"
+            desc += (
+                "Keys: orders.order_id, customers.customer_id, products.product_id, sellers.seller_id, "
+                "items(order_id, order_item_id), payments(order_id, payment_sequential), geo.zip_prefix.\n"
+            )
+            if "order_facts" in tables:
+                desc += "Use order_facts (one row per order) for revenue, order counts, delivery and review averages.\n"
+        return desc
 
     def _get_memory_context(self) -> str:
         if not self.memory:
             return "No previous conversation."
-        return "\n".join([f"User: {q}\nBot: {a}" for q, a in self.memory])
+        return "\n".join([f"User: {q}\nBot: {self._clip(a)}" for q, a in self.memory])
 
-    def ask(self, user_query: str):
-        """Processes a user query, runs SQL if needed, returns dict: {answer, result}"""
+    @staticmethod
+    def _clip(text: str, limit: int = MEMORY_SUMMARY_CHARS) -> str:
+        """First sentence of a past answer, at most `limit` characters; enough context for follow-ups."""
+        text = " ".join(text.split())
+        end = text.find(". ")
+        if 0 < end < limit:
+            return text[:end + 1]
+        return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + " …"
+
+    def _is_glossary(self, user_query: str) -> bool:
+        return any(k in user_query.lower() for k in ["what is", "define", "meaning of", "explain correlation between"])
+
+    def ask(self, user_query: str, stream: bool = False):
+        """
+        Processes a user query, runs SQL if needed, returns dict: {answer, result}.
+        With stream=True a summary that is not cached comes back as a "stream" generator of
+        text chunks (to be appended to "answer") so the table can be shown first.
+        """
+        with self.tracer.span("ask", stream=stream) as span:
+            return self._traced(span, self._run_steps(self._pipeline(user_query, stream, span)))
+
+    async def ask_async(self, user_query: str, stream: bool = False):
+        """
+        Same pipeline as ask(), but every model call goes through the shared Scheduler
+        (token bucket, bounded concurrency, jittered retries) and DuckDB runs on its
+        thread pool. Must be awaited on the scheduler's loop, e.g.
+        scheduler.run(bot.ask_async(q)). With stream=True "stream" is an async generator.
+        """
+        with self.tracer.span("ask", stream=stream) as span:
+            return self._traced(span, await self._run_steps_async(self._pipeline(user_query, stream, span)))
+
+    # ------------------------ PIPELINE ------------------------
+    # The question → answer pipeline is written once, as a generator that yields the
+    # blocking steps it needs and receives their results:
+    #   ("db", fn, *args)                 DuckDB work (fast path, schema, validate + run)
+    #   ("model", stage, prompt, kwargs)  a generate_content call
+    #   ("stream", *args)                 the streamed summary generator (see _stream_summary)
+    # ask() performs them inline; ask_async() awaits them on the Scheduler. A step that
+    # raises is thrown back into the pipeline at the yield.
+
+    def _pipeline(self, user_query: str, stream: bool, span):
         try:
             user_query = user_query.strip()
             if not user_query:
                 return {"answer": "⚠️ Please provide a question.", "result": None}
 
+            # Template fast path — no model calls
+            fast = yield ("db", self._answer_from_intent, user_query)
+            if fast is not None:
+                span.set(path="intent")
+                return fast
+
             # Glossary / Definition Mode
-            if any(k in user_query.lower() for k in ["what is", "define", "meaning of", "explain correlation between"]):
-                glossary_prompt = f"""
+            if self._is_glossary(user_query):
+                glossary_key = "glossary:" + self.cache.normalize_question(user_query)
+                glossary = self.cache.summaries.get(glossary_key)
+                span.set(path="glossary", glossary_cache_hit=glossary is not None)
+                if glossary is None:
+                    glossary = (yield ("model", "glossary", self._glossary_prompt(user_query), {})).text.strip()
+                    self.cache.summaries.set(glossary_key, glossary)
+                self.memory.append((user_query, glossary))
+                return {"answer": f"📘 **Definition:** {glossary}", "result": None}
+
+            question_key = self.cache.question_key(user_query, self._get_memory_context())
+            cached = self.cache.questions.get(question_key)
+            span.set(path="model", question_cache_hit=cached is not None)
+            if cached is not None:
+                user_query_en, sql_query = cached
+                result = yield ("db", self._run_cached, sql_query)
+            else:
+                user_query_en, sql_query = yield from self._generate_sql(user_query)
+                if not sql_query:
+                    return {"answer": "⚠️ Unable to create SQL for this query.", "result": None}
+
+                # SQL Execution; SQL that does not bind goes straight to the fix prompt
+                sql_query, result = yield ("db", self._execute, sql_query)
+                if isinstance(result, str):
+                    span.set(fix_attempts=1)
+                    fix = yield from self._attempt_sql_fix(user_query_en, result, sql_query)
+                    if not fix:
+                        return {"answer": result, "result": None}
+                    sql_query, result = yield ("db", self._execute, fix)
+                    if isinstance(result, str):
+                        return {"answer": result, "result": None}
+                self.cache.questions.set(question_key, (user_query_en, sql_query))
+
+            if isinstance(result, str):
+                return {"answer": result, "result": None}
+
+            # Summarize
+            fingerprint = self.cache.result_fingerprint(sql_query, result)
+            summary = self.cache.summaries.get(fingerprint)
+            span.set(summary_cache_hit=summary is not None)
+            if summary is None:
+                summary_prompt = self._summary_prompt(user_query_en, sql_query, result)
+                if stream:
+                    # table is ready now; the prose follows chunk by chunk
+                    chunks = yield ("stream", summary_prompt, user_query_en, fingerprint, span)
+                    return {"answer": self._truncation_note(result) + "🗣️ **Answer:** ",
+                            "result": result, "sql": sql_query, "stream": chunks}
+                summary = (yield ("model", "summarize", summary_prompt, {})).text.strip()
+                self.cache.summaries.set(fingerprint, summary)
+            self.memory.append((user_query_en, summary))
+
+            return {"answer": self._truncation_note(result) + f"🗣️ **Answer:** {summary}",
+                    "result": result, "sql": sql_query}
+
+        except Exception as e:
+            return {"answer": f"❌ Error: {e}", "result": None}
+
+    def _run_steps(self, steps):
+        """Drive a pipeline generator synchronously; returns its return value."""
+        value, error = None, None
+        while True:
+            try:
+                step = steps.throw(error) if error is not None else steps.send(value)
+            except StopIteration as done:
+                return done.value
+            value, error = None, None
+            kind, *args = step
+            try:
+                if kind == "db":
+                    value = args[0](*args[1:])
+                elif kind == "model":
+                    value = self._generate(args[0], args[1], **args[2])
+                else:
+                    value = self._stream_summary(*args)
+            except Exception as e:
+                error = e
+
+    async def _run_steps_async(self, steps):
+        """Drive a pipeline generator on the Scheduler: DuckDB on its pool, model calls rate-limited."""
+        value, error = None, None
+        while True:
+            try:
+                step = steps.throw(error) if error is not None else steps.send(value)
+            except StopIteration as done:
+                return done.value
+            value, error = None, None
+            kind, *args = step
+            try:
+                if kind == "db":
+                    value = await self.scheduler.run_db(args[0], *args[1:])
+                elif kind == "model":
+                    value = await self._generate_async(args[0], args[1], **args[2])
+                else:
+                    value = self._stream_summary_async(*args)
+            except Exception as e:
+                error = e
+
+    def _answer_from_intent(self, user_query: str):
+        """Answer from a SQL template + templated summary when the question matches a known intent."""
+        if not self.fast_path:
+            return None
+        with self.tracer.span("intent") as span:
+            if self.intents is None:
+                self.intents = IntentParser.from_executor(self.executor)
+            intent = self.intents.match(user_query)
+            span.set(matched=intent is not None)
+            if intent is None:
+                return None
+            result = self._run_cached(intent["sql"])
+        if isinstance(result, str):
+            # template didn't fit this dataset; let the model path handle it
+            return None
+        summary = IntentParser.summarize(intent, result)
+        self.memory.append((user_query, summary))
+        return {"answer": self._truncation_note(result) + f"🗣️ **Answer:** {summary}",
+                "result": result, "sql": intent["sql"]}
+
+    @staticmethod
+    def _traced(span, output: dict) -> dict:
+        """Attach the root span to the answer (e.g. to parent the chart stage) and flag errors."""
+        if output.get("result") is None and str(output.get("answer", "")).startswith("❌"):
+            span.fail(output["answer"])
+        output["trace"] = span
+        return output
+
+    @staticmethod
+    def _truncation_note(result: pa.Table) -> str:
+        if is_truncated(result):
+            return f"ℹ️ Result capped at the first {result.num_rows:,} rows.\n\n"
+        return ""
+
+    # ------------------------ PROMPTS ------------------------
+    @staticmethod
+    def _glossary_prompt(user_query: str) -> str:
+        return f"""
 You are an analytics tutor. Explain this concept clearly in 3–4 lines in context of e-commerce analytics.
 Query: {user_query}
 """
-                glossary = self.model.generate_content(glossary_prompt).text.strip()
-                self.memory.append((user_query, glossary))
-                return {"answer": f"📘 **Definition:** {glossary}", "result": None}
 
-            # Language Translation
-            translation_prompt = f"""
+    @staticmethod
+    def _fused_prompt(user_query: str, schema: str, memory: str) -> str:
+        return f"""
+You are a data analyst working with DuckDB (tables described below).
+{schema}
+
+Conversation so far:
+{memory}
+
+User query (any language): "{user_query}"
+
+Return only a JSON object with two keys:
+"question_en": the user query translated into English (unchanged if already English),
+"sql": one valid DuckDB SQL query answering it (no markdown).
+"""
+
+    @staticmethod
+    def _parse_fused(text: str, user_query: str):
+        """(English question, SQL) from the fused JSON reply; no SQL when the reply is not that JSON."""
+        try:
+            payload = json.loads(clean_json(text))
+            return (payload.get("question_en") or user_query).strip(), clean_sql(payload.get("sql") or "")
+        except (ValueError, AttributeError, TypeError):
+            # never send the raw reply (prose, broken JSON) to the database as SQL
+            return user_query, ""
+
+    @staticmethod
+    def _translation_prompt(user_query: str) -> str:
+        return f"""
 Translate this query into English if needed; else return it unchanged:
 Query: "{user_query}"
 """
-            translated = self.model.generate_content(translation_prompt).text.strip()
-            user_query_en = translated or user_query
-
-            # SQL Generation
-            schema = self._generate_schema_description()
-            memory = self._get_memory_context()
-            prompt_sql = f"""
-You are a data analyst working with DuckDB (table name: olist).
+
+    @staticmethod
+    def _sql_prompt(user_query_en: str, schema: str, memory: str) -> str:
+        return f"""
+You are a data analyst working with DuckDB (tables described below).
 {schema}
 
 Conversation so far:
@@ -72,50 +321,149 @@ User query: "{user_query_en}"
 
 Generate a valid DuckDB SQL query (no markdown, no explanation).
 """
-            response_sql = self.model.generate_content(prompt_sql)
-            sql_query = clean_sql(response_sql.text)
-            if not sql_query:
-                return {"answer": "⚠️ Unable to create SQL for this query.", "result": None}
 
-            # SQL Execution
-            result = self.executor.run_query(sql_query)
-            if isinstance(result, str):
-                fix = self._attempt_sql_fix(user_query_en, result)
-                if fix:
-                    result = self.executor.run_query(fix)
-                    if isinstance(result, str):
-                        return {"answer": result, "result": None}
-                    sql_query = fix
-                else:
-                    return {"answer": result, "result": None}
+    @staticmethod
+    def _fix_prompt(user_query: str, error_msg: str, sql_query: str = "", schema: str = "") -> str:
+        return f"""
+A DuckDB SQL query failed with error: {error_msg}
+User query: {user_query}
+SQL: {sql_query}
+{schema}
+Generate a corrected SQL query (no markdown).
+"""
 
-            # Summarize
-            summary_prompt = f"""
+    @staticmethod
+    def _summary_prompt(user_query_en: str, sql_query: str, result: pa.Table) -> str:
+        return f"""
 Write a concise 3–4 sentence summary explaining these results for a manager.
 
 User question: {user_query_en}
 SQL: {sql_query}
 
 Sample data:
-{result.head(10).to_markdown()}
+{preview(result, 10).to_markdown()}
 """
-            summary = self.model.generate_content(summary_prompt).text.strip()
+
+    # ------------------------ MODEL CALLS ------------------------
+    _FUSED_CONFIG = {"response_mime_type": "application/json"}
+
+    def _generate(self, stage: str, prompt: str, **kwargs):
+        """model.generate_content in a trace span named after the pipeline stage."""
+        with self.tracer.span(stage, prompt_chars=len(prompt)) as span:
+            response = self.model.generate_content(prompt, **kwargs)
+            record_usage(span, response)
+            return response
+
+    async def _generate_async(self, stage: str, prompt: str, **kwargs):
+        with self.tracer.span(stage, prompt_chars=len(prompt)) as span:
+            response = await self.scheduler.generate(self.model, prompt, **kwargs)
+            record_usage(span, response)
+            return response
+
+    def _generate_sql(self, user_query: str):
+        """Pipeline steps returning (English question, SQL). Fused mode does both in a single model call."""
+        memory = self._get_memory_context()
+        if self.fused:
+            schema = yield ("db", self._generate_schema_description, user_query)
+            response = yield ("model", "translate_sql", self._fused_prompt(user_query, schema, memory),
+                              {"generation_config": self._FUSED_CONFIG})
+            return self._parse_fused(response.text, user_query)
+
+        translated = (yield ("model", "translate", self._translation_prompt(user_query), {})).text.strip()
+        user_query_en = translated or user_query
+        schema = yield ("db", self._generate_schema_description, user_query_en)
+        response_sql = yield ("model", "generate_sql", self._sql_prompt(user_query_en, schema, memory), {})
+        return user_query_en, clean_sql(response_sql.text)
+
+    def _stream_summary(self, summary_prompt: str, user_query_en: str, fingerprint: str, parent=None):
+        """
+        Yield summary chunks as they arrive; memory and cache are updated once it completes.
+        Its "summarize" span outlives ask(), so it is opened under the ask span explicitly.
+        """
+        span = self.tracer.start_span("summarize", parent, stream=True, prompt_chars=len(summary_prompt))
+        parts = []
+        try:
+            try:
+                for chunk in self.model.generate_content(summary_prompt, stream=True):
+                    # usage_metadata on the last chunk covers the whole response
+                    record_usage(span, chunk)
+                    text = getattr(chunk, "text", "")
+                    if text:
+                        parts.append(text)
+                        yield text
+            except Exception as e:
+                span.fail(e)
+                yield f" ❌ Error: {e}"
+                return
+            summary = "".join(parts).strip()
+            self.cache.summaries.set(fingerprint, summary)
+            self.memory.append((user_query_en, summary))
+        finally:
+            span.end()
+
+    async def _stream_summary_async(self, summary_prompt: str, user_query_en: str, fingerprint: str,
+                                    parent=None):
+        span = self.tracer.start_span("summarize", parent, stream=True, prompt_chars=len(summary_prompt))
+        parts = []
+        try:
+            try:
+                async for text in self.scheduler.generate_stream(self.model, summary_prompt):
+                    parts.append(text)
+                    yield text
+            except Exception as e:
+                span.fail(e)
+                yield f" ❌ Error: {e}"
+                return
+            summary = "".join(parts).strip()
+            self.cache.summaries.set(fingerprint, summary)
             self.memory.append((user_query_en, summary))
+        finally:
+            span.end()
 
-            return {"answer": f"🗣️ **Answer:** {summary}", "result": result}
+    def _prevalidate(self, sql_query: str):
+        """
+        (SQL with misspelled identifiers fixed, None) when it binds, else (SQL, "❌ Query error: …")
+        so the caller can skip running it. A no-op when prevalidation is off.
+        """
+        if not self.prevalidate:
+            return sql_query, None
+        with self.tracer.span("validate") as span:
+            checked = self.executor.validate_sql(sql_query)
+            span.set(local_fixes=len(checked["fixes"]))
+            if checked["fixes"]:
+                print("🩹 Fixed SQL locally: " + ", ".join(f"{old} → {new}" for old, new in checked["fixes"]))
+            if checked["error"]:
+                span.fail(checked["error"])
+                return checked["sql"], f"❌ Query error: {checked['error']}"
+            return checked["sql"], None
 
-        except Exception as e:
-            return {"answer": f"❌ Error: {e}", "result": None}
+    def _run_cached(self, sql_query: str):
+        """Run SQL through the shared result cache; errors (returned as str) are never cached."""
+        with self.tracer.span("execute") as span:
+            key = self.cache.normalize_sql(sql_query)
+            result = self.cache.results.get(key)
+            span.set(result_cache_hit=result is not None)
+            if result is None:
+                result = self.executor.run_query(sql_query)
+                if not isinstance(result, str):
+                    self.cache.results.set(key, result)
+            if isinstance(result, str):
+                span.fail(result)
+            else:
+                span.set(rows=result.num_rows)
+            return result
+
+    def _execute(self, sql_query: str):
+        """(SQL as run, result or error str): pre-validation, then the result cache / DuckDB."""
+        sql_query, error = self._prevalidate(sql_query)
+        return sql_query, error if error is not None else self._run_cached(sql_query)
 
-    def _attempt_sql_fix(self, user_query: str, error_msg: str):
-        """Try to fix invalid SQL automatically."""
+    def _attempt_sql_fix(self, user_query: str, error_msg: str, sql_query: str = ""):
+        """Pipeline steps asking the model to fix invalid SQL; returns the fix or None."""
         try:
-            prompt_fix = f"""
-A DuckDB SQL query failed with error: {error_msg}
-User query: {user_query}
-Generate a corrected SQL query (no markdown).
-"""
-            fix = self.model.generate_content(prompt_fix).text.strip()
+            schema = (yield ("db", self._generate_schema_description, user_query)) if self.compact_schema else ""
+            prompt = self._fix_prompt(user_query, error_msg, sql_query, schema)
+            fix = (yield ("model", "fix_sql", prompt, {})).text.strip()
             return clean_sql(fix)
         except Exception:
             return None
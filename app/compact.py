@@ -0,0 +1,85 @@
+import re
+
+import pandas as pd
+
+# Memory-compaction stage for the merged pandas frame. Every encoding stays
+# registrable in DuckDB: categoricals become ENUMs (they still compare, join and
+# LIKE against plain strings); they are the only saving. Numeric columns keep their
+# 64-bit widths: a frame registered with TINYINT/SMALLINT columns makes ordinary
+# generated SQL such as length_cm * height_cm * width_cm overflow, since DuckDB
+# multiplies in the operand type.
+
+# 32-char hex ids (order_id, customer_id, ...) are stored as categoricals: int32
+# surrogate codes per row plus one copy of each distinct id string.
+HEX_ID = re.compile(r"^[0-9a-f]{32}$")
+ID_SUFFIX = "_id"
+# Other text columns become categorical when at most this share of rows is distinct.
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+
+def _is_text(s: pd.Series) -> bool:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return False
+    return s.dtype == object or pd.api.types.is_string_dtype(s.dtype)
+
+
+def _looks_like_hex_id(s: pd.Series) -> bool:
+    sample = s.dropna().head(1000)
+    return not sample.empty and sample.astype(str).str.fullmatch(HEX_ID.pattern).all()
+
+
+def _compact_text(s: pd.Series) -> pd.Series:
+    if s.name.endswith(ID_SUFFIX) and _looks_like_hex_id(s):
+        return s.astype("category")
+    non_null = s.notna().sum()
+    if non_null and s.nunique(dropna=True) <= CATEGORY_MAX_UNIQUE_RATIO * non_null:
+        return s.astype("category")
+    return s
+
+
+def _compact_numeric(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_integer_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+        # dt.year / dt.month come out as int32; the SQL loaders produce BIGINT
+        nullable = isinstance(s.dtype, pd.api.extensions.ExtensionDtype)
+        return s.astype("Int64" if nullable else "int64")
+    return s
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of df with categorical text/ids (integers widened to 64 bits); values are unchanged."""
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if _is_text(s):
+            out[col] = _compact_text(s)
+        elif pd.api.types.is_numeric_dtype(s.dtype):
+            out[col] = _compact_numeric(s)
+        else:
+            out[col] = s
+    return pd.DataFrame(out, index=df.index)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Per-column dtype and deep memory usage before/after compaction, largest savings first."""
+    b = before.memory_usage(deep=True, index=False)
+    a = after.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        "dtype_before": before.dtypes.astype(str),
+        "dtype_after": after.dtypes.astype(str),
+        "bytes_before": b,
+        "bytes_after": a,
+    })
+    report["saved_pct"] = (100 * (1 - report["bytes_after"] / report["bytes_before"].where(report["bytes_before"] > 0))).round(1)
+    return report.sort_values("bytes_before", ascending=False)
+
+
+def compact_with_report(df: pd.DataFrame, verbose: bool = True):
+    """compact_frame plus its memory_report; prints the totals (and top columns) when verbose."""
+    compacted = compact_frame(df)
+    report = memory_report(df, compacted)
+    if verbose:
+        total_b, total_a = report["bytes_before"].sum(), report["bytes_after"].sum()
+        print(f"🗜️ Compacted olist frame: {total_b / 1e6:.1f} MB -> {total_a / 1e6:.1f} MB "
+              f"({100 * (1 - total_a / max(total_b, 1)):.0f}% smaller)")
+        print(report.head(15).to_string())
+    return compacted, report
@@ -7,3 +7,65 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 MODEL_NAME = os.getenv("MODEL_NAME", "gemini-2.0-flash")
 DATA_PATH = os.getenv("DATA_PATH", "./data")
+CACHE_DIR = os.getenv("CACHE_DIR", "./.cache")
+# "duckdb" builds the olist table with SQL straight from the CSVs; "pandas" uses the DataFrame merge
+LOADER_MODE = os.getenv("LOADER_MODE", "duckdb")
+# LOADER_MODE=stream: CSVs are read in STREAM_BLOCK_MB blocks, spilled to Parquet under CACHE_DIR/stream
+# and merged by DuckDB within STREAM_MEMORY_LIMIT
+STREAM_BLOCK_MB = int(os.getenv("STREAM_BLOCK_MB", "16"))
+STREAM_MEMORY_LIMIT = os.getenv("STREAM_MEMORY_LIMIT", "1GB")
+# LOADER_MODE=pandas only: store ids and low-cardinality text as categoricals, the only memory saving
+# (prints a memory report); the duckdb and stream loaders never build a pandas frame
+COMPACT_DTYPES = os.getenv("COMPACT_DTYPES", "1") == "1"
+# Shared answer cache (question -> SQL -> result -> summary); QUERY_CACHE_DIR="" keeps it in memory only
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+QUERY_CACHE_DIR = os.getenv("QUERY_CACHE_DIR", "")
+# Translate + generate SQL in one structured prompt (saves a model round-trip per question)
+FUSED_PROMPTS = os.getenv("FUSED_PROMPTS", "1") == "1"
+# Async engine (ChatBot.ask_async): model rate limit, concurrency, retries and DuckDB workers
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_BURST = int(os.getenv("LLM_BURST", "10"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+DB_WORKERS = int(os.getenv("DB_WORKERS", "4"))
+# Max DuckDB cursors borrowed at once from the process-wide pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))
+# Query guardrails: EXPLAIN cost ceiling, result row cap, wall-clock timeout, DuckDB resource limits
+QUERY_GUARDS = os.getenv("QUERY_GUARDS", "1") == "1"
+QUERY_MAX_ROWS = int(os.getenv("QUERY_MAX_ROWS", "10000"))
+# "Download full CSV" exports stop after this many rows (same cost check and timeout as queries)
+QUERY_MAX_EXPORT_ROWS = int(os.getenv("QUERY_MAX_EXPORT_ROWS", "1000000"))
+QUERY_MAX_ESTIMATED_ROWS = int(os.getenv("QUERY_MAX_ESTIMATED_ROWS", "50000000"))
+QUERY_TIMEOUT_SECONDS = float(os.getenv("QUERY_TIMEOUT_SECONDS", "30"))
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT", "2GB")
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", "4"))
+# Answer common aggregate questions from local SQL templates before calling the model
+INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "1") == "1"
+# Precompute grouping-set rollups at load time and answer eligible aggregate queries from them
+ROLLUPS = os.getenv("ROLLUPS", "1") == "1"
+# Tracing: per-stage spans (ask, translate, generate_sql, execute, duckdb, fix_sql, summarize, chart…).
+# TRACE_EXPORT="jsonl" appends them to TRACE_JSONL_PATH, "prometheus" serves /metrics on METRICS_PORT
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", os.path.join(CACHE_DIR, "traces.jsonl"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+# Queries slower than SLOW_QUERY_MS have DuckDB's JSON profile of that run written to PROFILE_DIR
+# (0 disables; otherwise every query is profiled, which costs a little per query)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(CACHE_DIR, "profiles"))
+# Prompt compaction: the SQL prompt lists only the tables/columns (with example values) a question refers to,
+# and past answers in the conversation memory are clipped to MEMORY_SUMMARY_CHARS
+SCHEMA_COMPACTION = os.getenv("SCHEMA_COMPACTION", "1") == "1"
+MEMORY_SUMMARY_CHARS = int(os.getenv("MEMORY_SUMMARY_CHARS", "240"))
+# Bind generated SQL locally before running it; misspelled tables/columns/functions are fixed without a model call
+SQL_PREVALIDATION = os.getenv("SQL_PREVALIDATION", "1") == "1"
+# Chat history: result tables per session are kept in memory up to HISTORY_BUDGET_MB; older ones are spilled
+# to zstd Parquet under HISTORY_DIR/<session> (HISTORY_SPILL=0: dropped and re-run from their SQL) and only
+# the first HISTORY_KEEP_ROWS rows stay for display. Session directories idle for HISTORY_TTL seconds are
+# removed every HISTORY_CLEANUP_INTERVAL seconds
+HISTORY_BUDGET_MB = float(os.getenv("HISTORY_BUDGET_MB", "64"))
+HISTORY_DIR = os.getenv("HISTORY_DIR", os.path.join(CACHE_DIR, "history"))
+HISTORY_KEEP_ROWS = int(os.getenv("HISTORY_KEEP_ROWS", "100"))
+HISTORY_SPILL = os.getenv("HISTORY_SPILL", "1") == "1"
+HISTORY_TTL = float(os.getenv("HISTORY_TTL", "86400"))
+HISTORY_CLEANUP_INTERVAL = float(os.getenv("HISTORY_CLEANUP_INTERVAL", "900"))
@@ -1,33 +1,421 @@
 # app/data_loader.py
 import pandas as pd
+import duckdb
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-def load_olist_data(data_path: str):
+from compact import compact_with_report
+from geo import centroids_sql, geo_centroids, haversine_km, register_geo_functions
+from timing import StageTimer
+
+# Bump whenever the merge / feature engineering below changes so stale snapshots are rebuilt.
+LOADER_VERSION = "2"
+
+OLIST_FILES = {
+    "orders": "olist_orders_dataset.csv",
+    "customers": "olist_customers_dataset.csv",
+    "items": "olist_order_items_dataset.csv",
+    "products": "olist_products_dataset.csv",
+    "payments": "olist_order_payments_dataset.csv",
+    "reviews": "olist_order_reviews_dataset.csv",
+    "sellers": "olist_sellers_dataset.csv",
+    "geolocs": "olist_geolocation_dataset.csv",
+    "translation": "product_category_name_translation.csv",
+}
+
+# Conversions the pandas loader applies to each file right after reading it, before the
+# merge fans rows out. Olist timestamps are "YYYY-MM-DD HH:MM:SS"; anything else falls
+# back to ISO8601 parsing for just those values.
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+FILE_DATES = {
+    "orders": ["order_purchase_timestamp", "order_approved_at", "order_delivered_carrier_date",
+               "order_delivered_customer_date", "order_estimated_delivery_date"],
+    "items": ["shipping_limit_date"],
+    "reviews": ["review_creation_date", "review_answer_timestamp"],
+}
+FILE_NUMERICS = {
+    "items": ["price", "freight_value"],
+    "payments": ["payment_value"],
+    "products": ["product_weight_g", "product_length_cm", "product_height_cm", "product_width_cm"],
+}
+# Threads for the concurrent file reads (pandas' CSV tokenizer and datetime parsing release the GIL)
+LOAD_WORKERS = min(len(OLIST_FILES), os.cpu_count() or 1)
+
+SNAPSHOT_FILE = "olist_merged.parquet"
+MANIFEST_FILE = "olist_merged.manifest.json"
+
+
+def source_fingerprint(data_path: str) -> dict:
+    """Size + mtime of every source CSV plus the loader version — the snapshot cache key."""
+    files = {}
+    for name in OLIST_FILES.values():
+        p = os.path.join(data_path, name)
+        try:
+            st = os.stat(p)
+            files[name] = [st.st_size, st.st_mtime_ns]
+        except OSError:
+            files[name] = None
+    return {"loader_version": LOADER_VERSION, "files": files}
+
+
+def _sql_path(p: str) -> str:
+    return p.replace("'", "''")
+
+
+def _read_snapshot(cache_dir: str, fingerprint: dict):
+    snapshot = os.path.join(cache_dir, SNAPSHOT_FILE)
+    manifest = os.path.join(cache_dir, MANIFEST_FILE)
+    try:
+        with open(manifest, "r", encoding="utf-8") as f:
+            if json.load(f) != fingerprint:
+                return None
+        return duckdb.read_parquet(snapshot).df()
+    except Exception:
+        return None
+
+
+def _write_snapshot(cache_dir: str, fingerprint: dict, merged: pd.DataFrame):
+    """Write parquet + manifest atomically; the manifest is written last so a crash never leaves a valid-looking key."""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        snapshot = os.path.join(cache_dir, SNAPSHOT_FILE)
+        manifest = os.path.join(cache_dir, MANIFEST_FILE)
+        tmp = snapshot + ".tmp"
+        conn = duckdb.connect(database=":memory:")
+        conn.register("merged", merged)
+        conn.execute(f"COPY merged TO '{_sql_path(tmp)}' (FORMAT PARQUET, COMPRESSION ZSTD)")
+        conn.close()
+        os.replace(tmp, snapshot)
+        with open(manifest + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(fingerprint, f)
+        os.replace(manifest + ".tmp", manifest)
+    except Exception as e:
+        print(f"⚠️ Could not write snapshot to {cache_dir}: {e}")
+
+
+def load_olist_data(data_path: str, cache_dir: str = None, compact: bool = False):
+    """
+    Load the merged Olist frame. When cache_dir is given, a Parquet snapshot keyed on the
+    source files' sizes/mtimes and LOADER_VERSION is reused across process restarts and
+    only rebuilt when an input changes. With compact=True ids and low-cardinality text
+    become categoricals (see compact.py).
+    """
+    merged = None
+    if cache_dir:
+        fingerprint = source_fingerprint(data_path)
+        merged = _read_snapshot(cache_dir, fingerprint)
+        if merged is not None:
+            print("⚡ Loaded Olist snapshot:", merged.shape)
+
+    if merged is None:
+        merged = build_merged(data_path)
+        if cache_dir and not merged.empty:
+            _write_snapshot(cache_dir, fingerprint, merged)
+    if compact and not merged.empty:
+        merged, _ = compact_with_report(merged)
+    return merged
+
+
+# Median fills and derived columns over an unfilled base relation (one row per order item x
+# payment x review). `medians` yields m_price / m_freight / m_payment; the full load takes
+# them from the base itself, ingest.py passes incrementally maintained values.
+OLIST_MEDIANS = """
+SELECT median(price) AS m_price, median(freight_value) AS m_freight, median(payment_value) AS m_payment
+FROM base"""
+
+OLIST_FILLED_SQL = """
+WITH base AS ({base}),
+medians AS ({medians}),
+filled AS (
+    SELECT base.* REPLACE (
+        COALESCE(price, m_price) AS price,
+        COALESCE(freight_value, m_freight) AS freight_value,
+        COALESCE(payment_value, m_payment) AS payment_value
+    )
+    FROM base, medians
+)
+SELECT
+    order_id, order_status,
+    year(order_purchase_timestamp) AS order_year,
+    month(order_purchase_timestamp) AS order_month,
+    order_purchase_timestamp,
+    customer_id, customer_unique_id, customer_city, customer_state, customer_zip_code_prefix,
+    customer_lat, customer_lng, customer_geo_city, customer_geo_state,
+    seller_id, seller_city, seller_state, seller_zip_code_prefix,
+    seller_lat, seller_lng, seller_geo_city, seller_geo_state,
+    order_item_id, product_id, product_category_name, product_category_name_english,
+    product_name_lenght, product_description_lenght, product_photos_qty,
+    product_weight_g, product_length_cm, product_height_cm, product_width_cm,
+    price, freight_value, payment_type, payment_installments, payment_value,
+    CASE WHEN COALESCE(payment_value, 0) > 0 THEN payment_value
+         ELSE COALESCE(price, 0) + COALESCE(freight_value, 0) END AS total_order_value,
+    review_id, review_score, review_creation_date, review_answer_timestamp,
+    review_comment_title, review_comment_message,
+    CAST(floor((epoch(order_delivered_customer_date) - epoch(order_purchase_timestamp)) / 86400) AS BIGINT)
+        AS delivery_days,
+    haversine_km(customer_lat, customer_lng, seller_lat, seller_lng) AS distance_km
+FROM filled
+"""
+
+
+def csv_sources(data_path: str) -> dict:
+    """{key: read_csv_auto(...) relation} for every Olist CSV present in data_path."""
+    src = {}
+    for key, name in OLIST_FILES.items():
+        p = os.path.join(data_path, name)
+        if os.path.exists(p):
+            src[key] = f"read_csv_auto('{_sql_path(p)}', header=true)"
+    return src
+
+
+def load_olist_duckdb(conn, data_path: str, table: str = "olist", sources: dict = None) -> bool:
+    """
+    DuckDB-native loader: read the CSVs with read_csv_auto and build the merged `olist`
+    table entirely in SQL (joins, geolocation dedup, date parsing, median fills and
+    derived columns), so the data is never materialized in pandas.
+    sources overrides the relation read per file key (the streaming loader passes its
+    staged Parquet partitions). Returns False when a source file is missing; callers
+    fall back to load_olist_data.
+    """
+    print("🦆 Loading Olist dataset into DuckDB (SQL merge)...")
+    src = sources or csv_sources(data_path)
+    missing = [OLIST_FILES[key] for key in OLIST_FILES if key not in src]
+    if missing:
+        print(f"⚠️ Missing {', '.join(missing)}; DuckDB loader unavailable.")
+        return False
+    register_geo_functions(conn)
+    conn.execute("CREATE OR REPLACE TEMP VIEW geolocs_unique AS " + centroids_sql(src["geolocs"]))
+    conn.execute(f"""
+CREATE OR REPLACE TEMP VIEW olist_base AS
+SELECT
+    o.order_id, o.order_status,
+    TRY_CAST(o.order_purchase_timestamp AS TIMESTAMP) AS order_purchase_timestamp,
+    TRY_CAST(o.order_delivered_customer_date AS TIMESTAMP) AS order_delivered_customer_date,
+    c.customer_id, c.customer_unique_id, c.customer_city, c.customer_state,
+    TRY_CAST(c.customer_zip_code_prefix AS BIGINT) AS customer_zip_code_prefix,
+    cg.lat AS customer_lat, cg.lng AS customer_lng,
+    cg.city AS customer_geo_city, cg.state AS customer_geo_state,
+    s.seller_id, s.seller_city, s.seller_state,
+    TRY_CAST(s.seller_zip_code_prefix AS BIGINT) AS seller_zip_code_prefix,
+    sg.lat AS seller_lat, sg.lng AS seller_lng,
+    sg.city AS seller_geo_city, sg.state AS seller_geo_state,
+    i.order_item_id, i.product_id,
+    p.product_category_name, t.product_category_name_english,
+    p.product_name_lenght, p.product_description_lenght, p.product_photos_qty,
+    TRY_CAST(p.product_weight_g AS DOUBLE) AS product_weight_g,
+    TRY_CAST(p.product_length_cm AS DOUBLE) AS product_length_cm,
+    TRY_CAST(p.product_height_cm AS DOUBLE) AS product_height_cm,
+    TRY_CAST(p.product_width_cm AS DOUBLE) AS product_width_cm,
+    TRY_CAST(i.price AS DOUBLE) AS price,
+    TRY_CAST(i.freight_value AS DOUBLE) AS freight_value,
+    pay.payment_type, pay.payment_installments,
+    TRY_CAST(pay.payment_value AS DOUBLE) AS payment_value,
+    r.review_id, r.review_score,
+    TRY_CAST(r.review_creation_date AS TIMESTAMP) AS review_creation_date,
+    TRY_CAST(r.review_answer_timestamp AS TIMESTAMP) AS review_answer_timestamp,
+    r.review_comment_title, r.review_comment_message
+FROM {src["orders"]} o
+LEFT JOIN {src["customers"]} c ON o.customer_id = c.customer_id
+LEFT JOIN geolocs_unique cg ON TRY_CAST(c.customer_zip_code_prefix AS BIGINT) = cg.zip_prefix
+LEFT JOIN {src["items"]} i ON o.order_id = i.order_id
+LEFT JOIN {src["products"]} p ON i.product_id = p.product_id
+LEFT JOIN {src["translation"]} t ON p.product_category_name = t.product_category_name
+LEFT JOIN {src["payments"]} pay ON o.order_id = pay.order_id
+LEFT JOIN {src["reviews"]} r ON o.order_id = r.order_id
+LEFT JOIN {src["sellers"]} s ON i.seller_id = s.seller_id
+LEFT JOIN geolocs_unique sg ON TRY_CAST(s.seller_zip_code_prefix AS BIGINT) = sg.zip_prefix
+""")
+    conn.execute(f"CREATE OR REPLACE TABLE {table} AS "
+                 + OLIST_FILLED_SQL.format(base="SELECT * FROM olist_base", medians=OLIST_MEDIANS))
+    conn.execute("DROP VIEW IF EXISTS olist_base")
+    conn.execute("DROP VIEW IF EXISTS geolocs_unique")
+    n_rows, n_cols = conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0], len(conn.execute(f"DESCRIBE {table}").fetchall())
+    print("✅ DuckDB olist table:", (n_rows, n_cols))
+    return True
+
+
+# Normalized tables registered next to the denormalized `olist` table: name -> (primary key, SELECT)
+STAR_TABLES = {
+    "customers": ("customer_id", """
+SELECT customer_id, customer_unique_id,
+       TRY_CAST(customer_zip_code_prefix AS BIGINT) AS customer_zip_code_prefix,
+       customer_city, customer_state
+FROM {customers}"""),
+    "sellers": ("seller_id", """
+SELECT seller_id, TRY_CAST(seller_zip_code_prefix AS BIGINT) AS seller_zip_code_prefix,
+       seller_city, seller_state
+FROM {sellers}"""),
+    "products": ("product_id", """
+SELECT p.product_id, p.product_category_name, t.product_category_name_english,
+       p.product_name_lenght, p.product_description_lenght, p.product_photos_qty,
+       TRY_CAST(p.product_weight_g AS DOUBLE) AS product_weight_g,
+       TRY_CAST(p.product_length_cm AS DOUBLE) AS product_length_cm,
+       TRY_CAST(p.product_height_cm AS DOUBLE) AS product_height_cm,
+       TRY_CAST(p.product_width_cm AS DOUBLE) AS product_width_cm
+FROM {products} p
+LEFT JOIN {translation} t ON p.product_category_name = t.product_category_name"""),
+    "orders": ("order_id", """
+SELECT order_id, customer_id, order_status,
+       TRY_CAST(order_purchase_timestamp AS TIMESTAMP) AS order_purchase_timestamp,
+       TRY_CAST(order_approved_at AS TIMESTAMP) AS order_approved_at,
+       TRY_CAST(order_delivered_carrier_date AS TIMESTAMP) AS order_delivered_carrier_date,
+       TRY_CAST(order_delivered_customer_date AS TIMESTAMP) AS order_delivered_customer_date,
+       TRY_CAST(order_estimated_delivery_date AS TIMESTAMP) AS order_estimated_delivery_date,
+       year(TRY_CAST(order_purchase_timestamp AS TIMESTAMP)) AS order_year,
+       month(TRY_CAST(order_purchase_timestamp AS TIMESTAMP)) AS order_month,
+       CAST(floor((epoch(TRY_CAST(order_delivered_customer_date AS TIMESTAMP))
+                   - epoch(TRY_CAST(order_purchase_timestamp AS TIMESTAMP))) / 86400) AS BIGINT) AS delivery_days
+FROM {orders}"""),
+    "items": ("order_id, order_item_id", """
+SELECT order_id, order_item_id, product_id, seller_id,
+       TRY_CAST(shipping_limit_date AS TIMESTAMP) AS shipping_limit_date,
+       TRY_CAST(price AS DOUBLE) AS price,
+       TRY_CAST(freight_value AS DOUBLE) AS freight_value
+FROM {items}"""),
+    "payments": ("order_id, payment_sequential", """
+SELECT order_id, payment_sequential, payment_type, payment_installments,
+       TRY_CAST(payment_value AS DOUBLE) AS payment_value
+FROM {payments}"""),
+    # review_id is not unique in the public Olist export, so reviews carry no primary key
+    "reviews": (None, """
+SELECT review_id, order_id, review_score, review_comment_title, review_comment_message,
+       TRY_CAST(review_creation_date AS TIMESTAMP) AS review_creation_date,
+       TRY_CAST(review_answer_timestamp AS TIMESTAMP) AS review_answer_timestamp
+FROM {reviews}"""),
+    # one centroid per zip prefix (see geo.py)
+    "geo": ("zip_prefix", centroids_sql("{geolocs}")),
+}
+
+# One row per order: item, payment and review aggregates are computed per source table
+# before joining, so nothing fans out and sums are not double-counted.
+ORDER_FACTS_SELECT = """
+WITH it AS (
+    SELECT order_id, count(*) AS n_items, count(DISTINCT seller_id) AS n_sellers,
+           sum(price) AS items_value, sum(freight_value) AS freight_value
+    FROM items GROUP BY order_id
+),
+pay AS (
+    SELECT order_id, sum(payment_value) AS payment_value, max(payment_installments) AS payment_installments,
+           arg_max(payment_type, payment_value) AS main_payment_type
+    FROM payments GROUP BY order_id
+),
+rev AS (
+    SELECT order_id, avg(review_score) AS review_score FROM reviews GROUP BY order_id
+),
+dist AS (
+    -- farthest seller from the customer, centroid to centroid
+    SELECT i.order_id, max(haversine_km(cg.lat, cg.lng, sg.lat, sg.lng)) AS distance_km
+    FROM items i
+    JOIN orders o ON i.order_id = o.order_id
+    JOIN customers c ON o.customer_id = c.customer_id
+    JOIN geo cg ON c.customer_zip_code_prefix = cg.zip_prefix
+    JOIN sellers s ON i.seller_id = s.seller_id
+    JOIN geo sg ON s.seller_zip_code_prefix = sg.zip_prefix
+    GROUP BY i.order_id
+)
+SELECT o.order_id, o.customer_id, c.customer_unique_id, c.customer_city, c.customer_state,
+       o.order_status, o.order_purchase_timestamp, o.order_year, o.order_month, o.delivery_days,
+       COALESCE(it.n_items, 0) AS n_items, COALESCE(it.n_sellers, 0) AS n_sellers,
+       it.items_value, it.freight_value,
+       pay.payment_value, pay.payment_installments, pay.main_payment_type,
+       COALESCE(pay.payment_value, COALESCE(it.items_value, 0) + COALESCE(it.freight_value, 0)) AS total_order_value,
+       rev.review_score, dist.distance_km
+FROM orders o
+LEFT JOIN customers c ON o.customer_id = c.customer_id
+LEFT JOIN it ON o.order_id = it.order_id
+LEFT JOIN pay ON o.order_id = pay.order_id
+LEFT JOIN rev ON o.order_id = rev.order_id
+LEFT JOIN dist ON o.order_id = dist.order_id
+"""
+ORDER_FACTS_SQL = "CREATE OR REPLACE TABLE order_facts AS" + ORDER_FACTS_SELECT
+
+
+def _add_primary_key(conn, table: str, key: str):
+    try:
+        conn.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({key})")
+    except duckdb.Error as e:
+        print(f"⚠️ No primary key on {table}: {e}")
+
+
+def load_star_schema(conn, data_path: str, sources: dict = None) -> list:
+    """
+    Register the normalized Olist tables (orders, items, products, payments, reviews,
+    sellers, customers, geo) plus the per-order `order_facts` table in DuckDB.
+    Tables whose CSV is missing are skipped; returns the names that were created.
+    """
+    src = sources or csv_sources(data_path)
+
+    created = []
+    for table, (key, select) in STAR_TABLES.items():
+        try:
+            conn.execute(f"CREATE OR REPLACE TABLE {table} AS {select.format(**src)}")
+        except (KeyError, duckdb.Error) as e:
+            print(f"⚠️ Skipping table {table}: {e}")
+            continue
+        if key:
+            _add_primary_key(conn, table, key)
+        created.append(table)
+
+    register_geo_functions(conn)
+    if {"orders", "customers", "items", "payments", "reviews", "sellers", "geo"} <= set(created):
+        conn.execute(ORDER_FACTS_SQL)
+        _add_primary_key(conn, "order_facts", "order_id")
+        created.append("order_facts")
+    print("✅ Star schema tables:", ", ".join(created))
+    return created
+
+
+def parse_dates(s: pd.Series) -> pd.Series:
+    """to_datetime with the explicit Olist format; only values that don't match it are re-parsed as ISO8601."""
+    parsed = pd.to_datetime(s, format=DATE_FORMAT, errors="coerce")
+    leftover = parsed.isna() & s.notna()
+    if leftover.any():
+        parsed[leftover] = pd.to_datetime(s[leftover], format="ISO8601", errors="coerce")
+    return parsed
+
+
+def read_source(data_path: str, key: str) -> pd.DataFrame:
+    """Read one Olist CSV and convert its date / numeric columns (empty frame if unreadable)."""
+    p = os.path.join(data_path, OLIST_FILES[key])
+    try:
+        df = pd.read_csv(p)
+    except Exception as e:
+        print(f"⚠️ Could not read {p}: {e}")
+        return pd.DataFrame()
+    for col in FILE_DATES.get(key, []):
+        if col in df.columns:
+            df[col] = parse_dates(df[col])
+    for col in FILE_NUMERICS.get(key, []):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def build_merged(data_path: str):
     """
     Load all Olist CSVs from data_path, merge them into a single DataFrame,
     convert important columns to numeric/datetime, and return the merged frame.
+    The files are read and converted concurrently; a per-stage timing breakdown is printed.
     """
     print("📦 Loading Olist dataset (full merge with geolocation & dimensions)...")
+    timer = StageTimer("pandas merge loader")
 
-    def read_csv_safe(p):
-        try:
-            return pd.read_csv(p)
-        except Exception as e:
-            print(f"⚠️ Could not read {p}: {e}")
-            return pd.DataFrame()
-
-    orders      = read_csv_safe(os.path.join(data_path, "olist_orders_dataset.csv"))
-    customers   = read_csv_safe(os.path.join(data_path, "olist_customers_dataset.csv"))
-    items       = read_csv_safe(os.path.join(data_path, "olist_order_items_dataset.csv"))
-    products    = read_csv_safe(os.path.join(data_path, "olist_products_dataset.csv"))
-    payments    = read_csv_safe(os.path.join(data_path, "olist_order_payments_dataset.csv"))
-    reviews     = read_csv_safe(os.path.join(data_path, "olist_order_reviews_dataset.csv"))
-    sellers     = read_csv_safe(os.path.join(data_path, "olist_sellers_dataset.csv"))
-    geolocs     = read_csv_safe(os.path.join(data_path, "olist_geolocation_dataset.csv"))
-    translation = read_csv_safe(os.path.join(data_path, "product_category_name_translation.csv"))
-
-    # Unique geolocations by prefix
-    geolocs_unique = geolocs.drop_duplicates(subset=["geolocation_zip_code_prefix"]) if not geolocs.empty else geolocs
+    def timed_read(key):
+        with timer.stage(f"read {key}"):
+            return read_source(data_path, key)
+
+    with timer.stage("read + convert (parallel)"):
+        with ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix="olist-read") as pool:
+            frames = dict(zip(OLIST_FILES, pool.map(timed_read, OLIST_FILES)))
+    orders, customers, items = frames["orders"], frames["customers"], frames["items"]
+    products, payments, reviews = frames["products"], frames["payments"], frames["reviews"]
+    sellers, geolocs, translation = frames["sellers"], frames["geolocs"], frames["translation"]
+    del frames
+
+    # One centroid per zip prefix
+    with timer.stage("geo centroids"):
+        geolocs_unique = geo_centroids(geolocs)
 
     # Merge geolocation into customers
     if not customers.empty and not geolocs_unique.empty:
@@ -78,22 +466,12 @@ def load_olist_data(data_path: str):
         if not sellers.empty:
             merged = merged.merge(sellers, on="seller_id", how="left")
 
-    # Parse dates
-    date_cols = [
-        "order_purchase_timestamp", "order_approved_at",
-        "order_delivered_carrier_date", "order_delivered_customer_date",
-        "order_estimated_delivery_date", "shipping_limit_date",
-        "review_creation_date", "review_answer_timestamp"
-    ]
-    for col in date_cols:
-        if col in merged.columns:
-            merged[col] = pd.to_datetime(merged[col], errors="coerce")
+    timer.lap("merge")
 
-    # Numeric fills
+    # Numeric fills (dates and numerics were already converted per file)
     for col in ["price", "freight_value", "payment_value"]:
         if col in merged.columns:
-            merged[col] = pd.to_numeric(merged[col], errors="coerce")
-            merged[col].fillna(merged[col].median(skipna=True), inplace=True)
+            merged[col] = merged[col].fillna(merged[col].median(skipna=True))
 
     # Feature engineering
     if "order_purchase_timestamp" in merged.columns:
@@ -108,6 +486,10 @@ def load_olist_data(data_path: str):
     else:
         merged["delivery_days"] = None
 
+    if {"customer_lat", "customer_lng", "seller_lat", "seller_lng"} <= set(merged.columns):
+        merged["distance_km"] = haversine_km(merged["customer_lat"], merged["customer_lng"],
+                                             merged["seller_lat"], merged["seller_lng"])
+
     # total_order_value: prefer payment_value if present
     if "payment_value" in merged.columns:
         merged["total_order_value"] = merged["payment_value"].fillna(0)
@@ -139,10 +521,12 @@ def load_olist_data(data_path: str):
         "total_order_value",
         "review_id", "review_score", "review_creation_date", "review_answer_timestamp",
         "review_comment_title", "review_comment_message",
-        "delivery_days"
+        "delivery_days", "distance_km"
     ]
     keep_existing = [c for c in keep_cols if c in merged.columns]
     merged = merged[keep_existing].copy()
+    timer.lap("fills + features")
 
     print("✅ Final merged shape:", merged.shape)
+    print(timer.report())
     return merged
@@ -0,0 +1,128 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import duckdb
+
+from data_loader import load_olist_data, load_olist_duckdb, load_star_schema
+from rollups import RollupStore
+from streaming import load_olist_streaming
+from timing import StageTimer
+from config import (DUCKDB_MEMORY_LIMIT, DUCKDB_THREADS, ROLLUPS, COMPACT_DTYPES,
+                    STREAM_BLOCK_MB, STREAM_MEMORY_LIMIT, SLOW_QUERY_MS)
+
+# Statement types a session cursor may run; everything else (DDL, DML, COPY, ATTACH, SET…) is rejected.
+READ_ONLY_STATEMENTS = {duckdb.StatementType.SELECT, duckdb.StatementType.EXPLAIN}
+
+
+def connection_config() -> dict:
+    """memory_limit / threads from config.py, applied when a DuckDB database is opened."""
+    config = {}
+    if DUCKDB_MEMORY_LIMIT:
+        config["memory_limit"] = DUCKDB_MEMORY_LIMIT
+    if DUCKDB_THREADS > 0:
+        config["threads"] = DUCKDB_THREADS
+    return config
+
+
+def check_read_only(conn, sql_query: str):
+    """Raise ValueError unless every statement in sql_query is a SELECT/EXPLAIN."""
+    for statement in conn.extract_statements(sql_query):
+        if statement.type not in READ_ONLY_STATEMENTS:
+            raise ValueError(f"Only read-only queries are allowed (got {statement.type.name}).")
+
+
+class DuckDBPool:
+    """
+    One process-wide DuckDB database shared by every Streamlit session.
+    Sessions borrow cursors (cheap connections onto the same database, so the
+    `olist` data exists once) and are limited to read-only statements; the
+    loaders write through `writer()`. Once loaded, seal() cuts the database off
+    from the file system and network so session SQL can only read loaded tables.
+    """
+
+    def __init__(self, database: str = ":memory:", max_cursors: int = 16):
+        self.conn = duckdb.connect(database=database, config=connection_config())
+        self.max_cursors = max_cursors
+        self._write_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_cursors)
+        self._idle = queue.LifoQueue()
+        self.rollups = RollupStore()
+
+    @contextmanager
+    def writer(self):
+        with self._write_lock:
+            yield self.conn
+
+    def seal(self, profiling: bool = False):
+        """
+        Turn off external access (read_csv('/etc/passwd'), COPY, ATTACH, httpfs…) and lock
+        the configuration, so no session can switch it back. Call once the loaders are done;
+        later writes (ingest.py) must bring their data in as registered Arrow tables.
+
+        All max_cursors cursors are opened first, since a locked database refuses SET;
+        with profiling each one records a JSON profile of its last query (see
+        QueryExecutor's slow-query log).
+        """
+        with self._write_lock:
+            self.conn.execute("SET enable_external_access = false")
+            for _ in range(self.max_cursors - self._idle.qsize()):
+                cur = self.conn.cursor()
+                if profiling:
+                    cur.execute("SET enable_profiling = 'no_output'")
+                self._idle.put(cur)
+            self.conn.execute("SET lock_configuration = true")
+
+    @contextmanager
+    def cursor(self):
+        """Borrow a cursor; blocks when max_cursors are already in use."""
+        self._slots.acquire()
+        try:
+            try:
+                cur = self._idle.get_nowait()
+            except queue.Empty:
+                cur = self.conn.cursor()
+            try:
+                yield cur
+            finally:
+                self._idle.put(cur)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+        self.conn.close()
+
+
+def create_olist_pool(data_path: str, loader_mode: str = "duckdb", cache_dir: str = None,
+                      max_cursors: int = 16, rollups: bool = ROLLUPS) -> DuckDBPool:
+    """
+    Build the shared database once: `olist` (SQL, streaming or pandas merge), the
+    star-schema tables and the rollups.
+    """
+    timer = StageTimer("startup")
+    pool = DuckDBPool(max_cursors=max_cursors)
+    with pool.writer() as conn:
+        spill_dir = os.path.join(cache_dir or ".cache", "stream")
+        with timer.stage(f"olist ({loader_mode})"):
+            streamed = loader_mode == "stream" and load_olist_streaming(
+                conn, data_path, spill_dir, STREAM_MEMORY_LIMIT, STREAM_BLOCK_MB, DUCKDB_MEMORY_LIMIT)
+            if not streamed and not (loader_mode == "duckdb" and load_olist_duckdb(conn, data_path)):
+                merged = load_olist_data(data_path, cache_dir=cache_dir, compact=COMPACT_DTYPES)
+                # copy into DuckDB's columnar storage once; the pandas frame can then be released
+                conn.register("olist_merged_df", merged)
+                conn.execute("CREATE OR REPLACE TABLE olist AS SELECT * FROM olist_merged_df")
+                conn.unregister("olist_merged_df")
+                del merged
+        if not streamed:
+            # the streaming loader builds the star tables from its staged partitions
+            with timer.stage("star schema"):
+                load_star_schema(conn, data_path)
+        if rollups:
+            with timer.stage("rollups"):
+                pool.rollups = RollupStore.build(conn)
+    pool.seal(profiling=SLOW_QUERY_MS > 0)
+    print(timer.report())
+    return pool
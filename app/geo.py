@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# Geolocation subsystem. The raw file has ~1M points, many per zip prefix, plus a few
+# coordinates outside Brazil. Each prefix is reduced to one centroid in a single grouped
+# pass. The `geo` table is keyed by integer prefix and stored sorted by a 1° lat/lng grid
+# cell: zone maps then skip every row group outside a radius query's bounding box, so
+# that bounding box works as the spatial index. The distance helpers are SQL macros, so
+# every pooled cursor can call them and DuckDB runs them vectorized.
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.195
+# Generous bounding box around Brazil; points outside are data-entry errors
+BRAZIL_BOUNDS = {"lat": (-34.0, 5.5), "lng": (-74.0, -34.0)}
+
+GEO_CENTROIDS_SQL = """
+WITH pts AS (
+    SELECT TRY_CAST(geolocation_zip_code_prefix AS BIGINT) AS zip_prefix,
+           geolocation_lat AS lat, geolocation_lng AS lng,
+           geolocation_city AS city, geolocation_state AS state
+    FROM {geolocs}
+    WHERE TRY_CAST(geolocation_zip_code_prefix AS BIGINT) IS NOT NULL
+      AND geolocation_lat BETWEEN {lat_min} AND {lat_max}
+      AND geolocation_lng BETWEEN {lng_min} AND {lng_max}
+)
+SELECT zip_prefix, avg(lat) AS lat, avg(lng) AS lng, mode(city) AS city, mode(state) AS state,
+       count(*) AS n_points
+FROM pts
+GROUP BY zip_prefix
+ORDER BY floor(avg(lat)), floor(avg(lng)), zip_prefix"""
+
+HAVERSINE_MACRO = """
+CREATE OR REPLACE MACRO haversine_km(lat1, lng1, lat2, lng2) AS
+    2 * {r} * asin(sqrt(
+        pow(sin(radians(lat2 - lat1) / 2), 2)
+        + cos(radians(lat1)) * cos(radians(lat2)) * pow(sin(radians(lng2 - lng1) / 2), 2)
+    ))"""
+
+# zip prefixes whose centroid lies within km of (lat0, lng0), nearest first; needs the geo table
+RADIUS_MACRO = """
+CREATE OR REPLACE MACRO zips_within_km(lat0, lng0, km) AS TABLE
+    SELECT zip_prefix, city, state, haversine_km(lat0, lng0, lat, lng) AS distance_km
+    FROM geo
+    WHERE lat BETWEEN lat0 - km / {kpd} AND lat0 + km / {kpd}
+      AND lng BETWEEN lng0 - km / ({kpd} * greatest(cos(radians(lat0)), 0.01))
+                  AND lng0 + km / ({kpd} * greatest(cos(radians(lat0)), 0.01))
+      AND haversine_km(lat0, lng0, lat, lng) <= km
+    ORDER BY distance_km"""
+
+
+def centroids_sql(geolocs: str) -> str:
+    return GEO_CENTROIDS_SQL.format(
+        geolocs=geolocs,
+        lat_min=BRAZIL_BOUNDS["lat"][0], lat_max=BRAZIL_BOUNDS["lat"][1],
+        lng_min=BRAZIL_BOUNDS["lng"][0], lng_max=BRAZIL_BOUNDS["lng"][1],
+    )
+
+
+def register_geo_functions(conn):
+    """
+    Create haversine_km(...) and, once the geo table exists, zips_within_km(...) in the
+    database, so every cursor sees them.
+    """
+    conn.execute(HAVERSINE_MACRO.format(r=EARTH_RADIUS_KM))
+    has_geo = conn.execute(
+        "SELECT count(*) FROM information_schema.tables WHERE table_schema = 'main' AND table_name = 'geo'"
+    ).fetchone()[0]
+    if has_geo:
+        conn.execute(RADIUS_MACRO.format(kpd=KM_PER_DEGREE))
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Vectorized great-circle distance in km; NaN wherever a coordinate is missing."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(a, dtype="float64")) for a in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def geo_centroids(geolocs: pd.DataFrame) -> pd.DataFrame:
+    """
+    pandas counterpart of GEO_CENTROIDS_SQL for the merge loader: one row per
+    geolocation_zip_code_prefix with mean lat/lng and the most frequent city/state.
+    """
+    if geolocs.empty:
+        return geolocs
+    prefix = pd.to_numeric(geolocs["geolocation_zip_code_prefix"], errors="coerce")
+    lat, lng = geolocs["geolocation_lat"], geolocs["geolocation_lng"]
+    pts = geolocs.assign(geolocation_zip_code_prefix=prefix)[
+        prefix.notna()
+        & lat.between(*BRAZIL_BOUNDS["lat"])
+        & lng.between(*BRAZIL_BOUNDS["lng"])
+    ]
+    key = "geolocation_zip_code_prefix"
+    coords = pts.groupby(key, sort=True)[["geolocation_lat", "geolocation_lng"]].mean()
+    # most frequent label per prefix: count (prefix, label) pairs, keep the top one (ties -> alphabetical)
+    labels = []
+    for col in ("geolocation_city", "geolocation_state"):
+        counts = pts.groupby([key, col]).size().rename("n").reset_index()
+        top = counts.sort_values([key, "n", col], ascending=[True, False, True]).drop_duplicates(key)
+        labels.append(top.set_index(key)[col])
+    out = coords.join(labels).reset_index()
+    out[key] = out[key].astype("int64")
+    return out
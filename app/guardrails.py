@@ -0,0 +1,101 @@
+import json
+import re
+import threading
+
+import duckdb
+import pyarrow as pa
+
+# Operators whose output can be the product of their inputs when DuckDB gives no estimate.
+PRODUCT_OPERATORS = {"CROSS_PRODUCT", "NESTED_LOOP_JOIN", "BLOCKWISE_NL_JOIN", "PIECEWISE_MERGE_JOIN"}
+# EXPLAIN ANALYZE runs the query it explains
+EXPLAIN_ANALYZE = re.compile(r"^\s*EXPLAIN\s*(\([^)]*\bANALY[SZ]E\b|ANALY[SZ]E\b)", re.IGNORECASE)
+
+
+def _parse_cardinality(value) -> int:
+    try:
+        return int(str(value).lstrip("~").replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def _node_estimate(node: dict) -> tuple:
+    """(this node's estimated rows, max estimate anywhere in the subtree)."""
+    children = [_node_estimate(child) for child in node.get("children", [])]
+    rows = _parse_cardinality(node.get("extra_info", {}).get("Estimated Cardinality"))
+    if rows is None:
+        if node.get("name") in PRODUCT_OPERATORS and children:
+            rows = 1
+            for child_rows, _ in children:
+                rows *= max(child_rows, 1)
+        else:
+            rows = max((child_rows for child_rows, _ in children), default=0)
+    return rows, max([rows] + [subtree_max for _, subtree_max in children])
+
+
+def estimate_rows(conn, sql_query: str) -> int:
+    """Largest intermediate cardinality DuckDB's optimizer expects for sql_query (EXPLAIN, nothing runs)."""
+    rows = conn.execute(f"EXPLAIN (FORMAT JSON) {sql_query}").fetchall()
+    plan = json.loads(rows[0][1])
+    return max((_node_estimate(node)[1] for node in plan), default=0)
+
+
+def single_statement(conn, sql_query: str):
+    """
+    The StatementType of sql_query; ValueError unless it is exactly one SELECT or plain
+    EXPLAIN, so nothing slips past the cost check and the row cap behind a "SELECT 1;".
+    """
+    statements = conn.extract_statements(sql_query)
+    if len(statements) != 1:
+        raise ValueError(f"Only one statement per query is allowed (got {len(statements)}).")
+    statement = statements[0]
+    if statement.type not in (duckdb.StatementType.SELECT, duckdb.StatementType.EXPLAIN):
+        raise ValueError(f"Only SELECT queries are allowed (got {statement.type.name}).")
+    if statement.type == duckdb.StatementType.EXPLAIN and EXPLAIN_ANALYZE.match(statement.query):
+        raise ValueError("EXPLAIN ANALYZE is not allowed; it runs the query.")
+    return statement.type
+
+
+def fetch_limited(cursor, max_rows: int, batch_size: int = 65536) -> pa.Table:
+    """At most max_rows rows of the cursor's pending result, read batch by batch; the rest is never built."""
+    reader = cursor.fetch_record_batch(batch_size)
+    batches, rows = [], 0
+    for batch in reader:
+        batches.append(batch)
+        rows += batch.num_rows
+        if rows >= max_rows:
+            break
+    return pa.Table.from_batches(batches, schema=reader.schema).slice(0, max_rows)
+
+
+def cap_rows(conn, sql_query: str, max_rows: int) -> str:
+    """Wrap a single SELECT in an outer LIMIT of max_rows + 1 so truncation can be detected."""
+    statements = conn.extract_statements(sql_query)
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        return sql_query
+    return f"SELECT * FROM (\n{sql_query}\n) AS capped LIMIT {max_rows + 1}"
+
+
+class QueryTimeout:
+    """Context manager that interrupts the connection's running query after `seconds`."""
+
+    def __init__(self, conn, seconds: float):
+        self.conn = conn
+        self.seconds = seconds
+        self.fired = False
+        self._timer = None
+
+    def _interrupt(self):
+        self.fired = True
+        self.conn.interrupt()
+
+    def __enter__(self):
+        if self.seconds and self.seconds > 0:
+            self._timer = threading.Timer(self.seconds, self._interrupt)
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._timer is not None:
+            self._timer.cancel()
+        return False
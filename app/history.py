@@ -0,0 +1,231 @@
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Bounded chat history. Every bot answer used to keep its full result table (plus export
+# bytes) in st.session_state for the life of the session. ChatHistory keeps results in
+# memory only while the session's total (tables, export bytes and the data copied into
+# Plotly figures) fits its budget. Beyond that, the least recently shown result is spilled
+# to a zstd Parquet file in the session's directory, or, with spilling off or failing,
+# dropped and recomputed from its SQL. Only the first keep_rows rows stay in memory for
+# display; the figure is dropped. A full download reads the spilled file without bringing
+# it back; "load full result" makes it resident again and rebuilds the figure. Idle
+# session directories are removed by a background sweep.
+
+
+def _copy_head(table: pa.Table, n: int) -> pa.Table:
+    """First n rows in fresh buffers (a slice would keep the whole parent table alive)."""
+    return table.take(pa.array(range(min(n, table.num_rows)), type=pa.int64()))
+
+
+def _figure_bytes(figure) -> int:
+    """Approximate size of the plotted data a Plotly figure holds (x/y/values/labels arrays)."""
+    total = 0
+    for trace in getattr(figure, "data", ()):
+        for value in trace.to_plotly_json().values():
+            if isinstance(value, np.ndarray):
+                total += value.nbytes
+                if value.dtype == object:
+                    total += sum(sys.getsizeof(v) for v in value)
+            elif isinstance(value, (list, tuple)):
+                total += sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+    return total
+
+
+def _export_bytes(message: dict) -> int:
+    visual = message.get("visual") or {}
+    return sum(len(visual[k]) for k in ("csv", "pdf") if isinstance(visual.get(k), (bytes, bytearray)))
+
+
+class ChatHistory:
+    """
+    List-like chat history for one session, with result tables held under budget_mb.
+    Messages are dicts ({"role", "text", "data", "sql", "question", "visual"}); bot messages
+    whose result has been spilled have "data" None, "preview" (first keep_rows rows), "rows"
+    and "spilled" (Parquet path, or None when it must be recomputed from "sql").
+    Download callables run outside the script thread, so state changes take a lock.
+    """
+
+    def __init__(self, root_dir: str, budget_mb: float = 64, keep_rows: int = 100, spill: bool = True,
+                 recompute=None, visualize=None, session_id: str = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.dir = os.path.join(root_dir, self.session_id)
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.keep_rows = keep_rows
+        self.spill = spill
+        # recompute(sql) -> pa.Table | error str, for results that were not written to disk
+        self.recompute = recompute
+        # visualize(question, table) -> Plotly figure, to rebuild a dropped figure on reload
+        self.visualize = visualize
+        self.messages = []
+        self._lock = threading.RLock()
+        # message id -> (message, bytes of its table and figure), least recently used first; export
+        # bytes are added by download callables at any time, so they are measured when needed
+        self._resident = OrderedDict()
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self.messages))
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __getitem__(self, i):
+        return self.messages[i]
+
+    def _touch(self):
+        """Mark the session as active for the idle-directory sweep."""
+        if os.path.isdir(self.dir):
+            os.utime(self.dir)
+
+    # ------------------------ BUDGET ------------------------
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(size + _export_bytes(message) for message, size in self._resident.values())
+
+    def _account(self, message: dict):
+        data = message.get("data")
+        # results no longer than the kept preview gain nothing from spilling
+        if data is not None and data.num_rows > self.keep_rows:
+            figure = (message.get("visual") or {}).get("figure")
+            self._resident[message["id"]] = (message, data.nbytes + _figure_bytes(figure))
+            self._resident.move_to_end(message["id"])
+
+    def _enforce_budget(self, keep: str = None):
+        """Spill least recently used results until the resident ones fit (never `keep`); callers hold the lock."""
+        for message_id, (message, _size) in list(self._resident.items()):
+            if self.resident_bytes() <= self.budget:
+                break
+            if message_id != keep:
+                self._evict(message)
+
+    def _evict(self, message: dict):
+        table = message["data"]
+        path = None
+        if self.spill:
+            path = os.path.join(self.dir, f"{message['id']}.parquet")
+            try:
+                if not os.path.exists(path):
+                    os.makedirs(self.dir, exist_ok=True)
+                    pq.write_table(table, path, compression="zstd")
+            except OSError as e:
+                print(f"⚠️ Could not spill chat result to disk ({e}); keeping its SQL only")
+                path = None
+        message.update(preview=_copy_head(table, self.keep_rows), rows=table.num_rows, spilled=path)
+        message["data"] = None
+        # the figure embeds a copy of the plotted data; export bytes are rebuilt on the next download
+        visual = message.get("visual") or {}
+        if visual.get("figure") is not None:
+            visual["figure"] = None
+        for key in ("csv", "pdf"):
+            visual.pop(key, None)
+        self._resident.pop(message["id"], None)
+
+    # ------------------------ MESSAGES ------------------------
+    def append(self, message: dict) -> dict:
+        message.setdefault("id", uuid.uuid4().hex[:12])
+        with self._lock:
+            self.messages.append(message)
+            self._account(message)
+            self._enforce_budget(keep=message["id"])
+            self._touch()
+        return message
+
+    def shown(self, message: dict):
+        """The table to display: the full result when resident, else the kept first rows (None: no result)."""
+        with self._lock:
+            return message["data"] if message.get("data") is not None else message.get("preview")
+
+    def load(self, message: dict):
+        """
+        The full result without making it resident: from memory, the spilled Parquet file
+        or by re-running its SQL. For one-off exports; None when it cannot be restored.
+        """
+        data = message.get("data")
+        if data is not None:
+            return data
+        if message.get("spilled") and os.path.exists(message["spilled"]):
+            return pq.read_table(message["spilled"])
+        if message.get("sql") and self.recompute is not None:
+            table = self.recompute(message["sql"])
+            if isinstance(table, str):
+                print(f"⚠️ Could not recompute chat result: {table}")
+                return None
+            return table
+        return None
+
+    def result(self, message: dict):
+        """
+        The full result, reloading a spilled one (see load) and rebuilding its figure; it
+        counts against the budget again. None when it cannot be restored.
+        """
+        with self._lock:
+            if message.get("data") is not None:
+                if message["id"] in self._resident:
+                    self._resident.move_to_end(message["id"])
+                return message["data"]
+            table = self.load(message)
+            if table is None:
+                return None
+            visual = message.get("visual")
+            if visual and visual.get("figure") is None and visual.get("chart_type") and self.visualize is not None:
+                visual["figure"] = self.visualize(message.get("question", ""), table)
+            message.update(data=table, preview=None)
+            self._account(message)
+            self._enforce_budget(keep=message["id"])
+            self._touch()
+            return table
+
+    def clear(self):
+        with self._lock:
+            self.messages.clear()
+            self._resident.clear()
+            shutil.rmtree(self.dir, ignore_errors=True)
+
+
+# ------------------------ EXPIRED SESSIONS ------------------------
+def cleanup_expired(root_dir: str, ttl: float) -> int:
+    """Remove session directories idle for more than ttl seconds; returns how many were removed."""
+    removed = 0
+    now = time.time()
+    try:
+        entries = list(os.scandir(root_dir))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_dir() and now - entry.stat().st_mtime > ttl:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+class HistoryJanitor:
+    """Background thread running cleanup_expired every `interval` seconds (one per process)."""
+
+    def __init__(self, root_dir: str, ttl: float, interval: float):
+        self.root_dir = root_dir
+        self.ttl = ttl
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="history-janitor", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            removed = cleanup_expired(self.root_dir, self.ttl)
+            if removed:
+                print(f"🧹 Removed {removed} expired chat session(s) from {self.root_dir}")
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,232 @@
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from data_loader import STAR_TABLES, OLIST_FILLED_SQL, ORDER_FACTS_SELECT
+from rollups import RollupStore
+
+# Incremental refresh: delta files for the fact-side tables are upserted into the star
+# tables, and only the `olist` / `order_facts` rows of the orders they touch are rebuilt,
+# inside one transaction on the pool's writer, so sessions keep querying the previous
+# snapshot until it commits.
+
+# Source tables a delta may target -> the key a delta row replaces
+DELTA_KEYS = {
+    "orders": ["order_id"],
+    "items": ["order_id", "order_item_id"],
+    "payments": ["order_id", "payment_sequential"],
+    "reviews": ["review_id", "order_id"],
+}
+
+# Columns median-filled in `olist` -> the name the fill SQL expects
+FILL_COLUMNS = {"price": "m_price", "freight_value": "m_freight", "payment_value": "m_payment"}
+
+# Column types widened to the SQL loaders' canonical ones before the first upsert
+NARROW_TYPES = {"TINYINT": "BIGINT", "SMALLINT": "BIGINT", "INTEGER": "BIGINT", "UTINYINT": "BIGINT",
+                "USMALLINT": "BIGINT", "UINTEGER": "BIGINT", "FLOAT": "DOUBLE"}
+
+# Bookkeeping lives outside `main`, so it never shows up in the schema given to the model
+STATE_SCHEMA = "ingest_state"
+
+# The unfilled olist rows for a set of orders, rebuilt from the star tables
+OLIST_BASE_SQL = """
+SELECT
+    o.order_id, o.order_status, o.order_purchase_timestamp, o.order_delivered_customer_date,
+    c.customer_id, c.customer_unique_id, c.customer_city, c.customer_state, c.customer_zip_code_prefix,
+    cg.lat AS customer_lat, cg.lng AS customer_lng, cg.city AS customer_geo_city, cg.state AS customer_geo_state,
+    s.seller_id, s.seller_city, s.seller_state, s.seller_zip_code_prefix,
+    sg.lat AS seller_lat, sg.lng AS seller_lng, sg.city AS seller_geo_city, sg.state AS seller_geo_state,
+    i.order_item_id, i.product_id,
+    p.product_category_name, p.product_category_name_english,
+    p.product_name_lenght, p.product_description_lenght, p.product_photos_qty,
+    p.product_weight_g, p.product_length_cm, p.product_height_cm, p.product_width_cm,
+    i.price, i.freight_value,
+    pay.payment_type, pay.payment_installments, pay.payment_value,
+    r.review_id, r.review_score, r.review_creation_date, r.review_answer_timestamp,
+    r.review_comment_title, r.review_comment_message
+FROM orders o
+LEFT JOIN customers c ON o.customer_id = c.customer_id
+LEFT JOIN geo cg ON c.customer_zip_code_prefix = cg.zip_prefix
+LEFT JOIN items i ON o.order_id = i.order_id
+LEFT JOIN products p ON i.product_id = p.product_id
+LEFT JOIN payments pay ON o.order_id = pay.order_id
+LEFT JOIN reviews r ON o.order_id = r.order_id
+LEFT JOIN sellers s ON i.seller_id = s.seller_id
+LEFT JOIN geo sg ON s.seller_zip_code_prefix = sg.zip_prefix
+{where}"""
+
+
+def _read_delta(path: str) -> pa.Table:
+    """
+    Delta file as an Arrow table. Read in Python rather than with read_csv/read_parquet:
+    the shared database has external access turned off once loaded (DuckDBPool.seal).
+    """
+    if os.path.splitext(path)[1].lower() in (".parquet", ".pq"):
+        return pq.read_table(path)
+    # like DuckDB's read_csv: an empty field is NULL in every column, and "NA" / "null" are text
+    return pa_csv.read_csv(path, parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                           convert_options=pa_csv.ConvertOptions(null_values=[""], strings_can_be_null=True))
+
+
+def _base(orders_table: str = None) -> str:
+    where = f"WHERE o.order_id IN (SELECT order_id FROM {orders_table})" if orders_table else ""
+    return OLIST_BASE_SQL.format(where=where)
+
+
+def _count_fill_values(conn, orders_table: str = None, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) the base rows' non-null fill values from the histogram."""
+    for col in FILL_COLUMNS:
+        conn.execute(f"""
+INSERT INTO {STATE_SCHEMA}.fill_stats
+SELECT '{col}', {col}, {sign} * count(*) FROM ({_base(orders_table)}) WHERE {col} IS NOT NULL GROUP BY 2""")
+
+
+def _medians(conn) -> dict:
+    """Exact median per fill column from the value histogram (average of the two middle values)."""
+    medians = {}
+    for col in FILL_COLUMNS:
+        medians[col] = conn.execute(f"""
+WITH h AS (
+    SELECT value, n, sum(n) OVER (ORDER BY value) AS cum, sum(n) OVER () AS total
+    FROM {STATE_SCHEMA}.fill_stats WHERE column_name = '{col}'
+)
+SELECT avg(value) FROM h
+WHERE (cum - n <= (total - 1) // 2 AND (total - 1) // 2 < cum)
+   OR (cum - n <= total // 2 AND total // 2 < cum)""").fetchone()[0]
+    return medians
+
+
+def _ensure_state(conn):
+    """First ingest: build the fill-value histogram and the set of orders that carry filled values."""
+    exists = conn.execute(
+        "SELECT count(*) FROM information_schema.tables WHERE table_schema = ? AND table_name = 'fill_stats'",
+        [STATE_SCHEMA],
+    ).fetchone()[0]
+    if exists:
+        return
+    # a compacted pandas load registers categoricals as ENUMs, which can't take new values, and
+    # an older one narrow integers, which can't take a delta outside the range seen at load time
+    for col, dtype in conn.execute(
+        "SELECT column_name, data_type FROM information_schema.columns WHERE table_schema = 'main' AND table_name = 'olist'"
+    ).fetchall():
+        wide = "VARCHAR" if dtype.startswith("ENUM") else NARROW_TYPES.get(dtype)
+        if wide:
+            conn.execute(f'ALTER TABLE olist ALTER "{col}" TYPE {wide}')
+    conn.execute(f"CREATE SCHEMA IF NOT EXISTS {STATE_SCHEMA}")
+    conn.execute(f"CREATE TABLE {STATE_SCHEMA}.fill_stats (column_name VARCHAR, value DOUBLE, n BIGINT)")
+    _count_fill_values(conn)
+    nulls = " OR ".join(f"{col} IS NULL" for col in FILL_COLUMNS)
+    conn.execute(f"CREATE TABLE {STATE_SCHEMA}.filled_orders AS SELECT DISTINCT order_id FROM ({_base()}) WHERE {nulls}")
+    conn.execute(f"CREATE TABLE {STATE_SCHEMA}.medians (column_name VARCHAR, value DOUBLE)")
+    for col, value in _medians(conn).items():
+        conn.execute(f"INSERT INTO {STATE_SCHEMA}.medians VALUES (?, ?)", [col, value])
+
+
+def _upsert(conn, name: str):
+    keys = DELTA_KEYS[name]
+    match = " AND ".join(f"t.{k} IS NOT DISTINCT FROM d.{k}" for k in keys)
+    conn.execute(f"DELETE FROM {name} t WHERE EXISTS (SELECT 1 FROM delta_{name} d WHERE {match})")
+    conn.execute(f"INSERT INTO {name} BY NAME SELECT * FROM delta_{name}")
+
+
+def ingest_deltas(pool, deltas: dict, cache=None) -> dict:
+    """
+    Upsert new or changed rows into the live database.
+
+    deltas maps "orders" / "items" / "payments" / "reviews" to a CSV or Parquet file with
+    the same columns as the original Olist export. Rows replace existing ones by key; the
+    affected orders are re-joined against the cached dimension tables and swapped into
+    `olist` and `order_facts`. The price / freight / payment median fills are maintained
+    from a value histogram, and previously filled rows are refreshed only when a median
+    moves. `cache` (an AnswerCache) is cleared after the commit.
+
+    Rollups are rebuilt from a full scan of `olist` / `order_facts`, not patched: their
+    min / max and distinct counts can't be updated by subtracting old rows, and every
+    delta touches the grand-total and per-year groups, which span most of the table
+    anyway. That scan is most of an ingest on a large table (about 1.1s of 1.4s at ~100k
+    orders), so batch deltas into one call; "rollup_seconds" in the result reports it.
+    """
+    unknown = set(deltas) - set(DELTA_KEYS)
+    if unknown:
+        raise ValueError(f"Unsupported delta tables: {', '.join(sorted(unknown))}")
+    if not deltas:
+        return {"orders": 0, "olist_rows": 0}
+
+    start = time.perf_counter()
+    with pool.writer() as conn:
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            _ensure_state(conn)
+            for name, path in deltas.items():
+                conn.register(f"delta_source_{name}", _read_delta(path))
+                select = STAR_TABLES[name][1].format(**{name: f"delta_source_{name}"})
+                conn.execute(f"CREATE OR REPLACE TEMP TABLE delta_{name} AS {select}")
+                conn.unregister(f"delta_source_{name}")
+            conn.execute("CREATE OR REPLACE TEMP TABLE affected_orders AS "
+                         + " UNION ".join(f"SELECT order_id FROM delta_{name}" for name in deltas))
+
+            # swap the affected orders' contribution to the fill histogram around the upsert
+            _count_fill_values(conn, "affected_orders", -1)
+            for name in deltas:
+                _upsert(conn, name)
+            _count_fill_values(conn, "affected_orders", 1)
+            conn.execute(f"""
+CREATE OR REPLACE TABLE {STATE_SCHEMA}.fill_stats AS
+SELECT column_name, value, sum(n)::BIGINT AS n FROM {STATE_SCHEMA}.fill_stats GROUP BY ALL HAVING sum(n) <> 0""")
+
+            old = dict(conn.execute(f"SELECT column_name, value FROM {STATE_SCHEMA}.medians").fetchall())
+            medians = _medians(conn)
+            nulls = " OR ".join(f"{col} IS NULL" for col in FILL_COLUMNS)
+            conn.execute(f"DELETE FROM {STATE_SCHEMA}.filled_orders WHERE order_id IN (SELECT order_id FROM affected_orders)")
+            conn.execute(f"""
+INSERT INTO {STATE_SCHEMA}.filled_orders
+SELECT DISTINCT order_id FROM ({_base("affected_orders")}) WHERE {nulls}""")
+
+            rebuild = "affected_orders"
+            if medians != old:
+                conn.execute(f"""
+CREATE OR REPLACE TEMP TABLE rebuild_orders AS
+SELECT order_id FROM affected_orders UNION SELECT order_id FROM {STATE_SCHEMA}.filled_orders""")
+                rebuild = "rebuild_orders"
+                conn.execute(f"DELETE FROM {STATE_SCHEMA}.medians")
+                for col, value in medians.items():
+                    conn.execute(f"INSERT INTO {STATE_SCHEMA}.medians VALUES (?, ?)", [col, value])
+
+            fills = ", ".join(
+                f"CAST({'NULL' if medians[col] is None else repr(float(medians[col]))} AS DOUBLE) AS {alias}"
+                for col, alias in FILL_COLUMNS.items()
+            )
+            conn.execute(f"DELETE FROM olist WHERE order_id IN (SELECT order_id FROM {rebuild})")
+            conn.execute("INSERT INTO olist BY NAME "
+                         + OLIST_FILLED_SQL.format(base=_base(rebuild), medians=f"SELECT {fills}"))
+            olist_rows = conn.execute(f"SELECT count(*) FROM olist WHERE order_id IN (SELECT order_id FROM {rebuild})").fetchone()[0]
+
+            conn.execute("DELETE FROM order_facts WHERE order_id IN (SELECT order_id FROM affected_orders)")
+            conn.execute(f"INSERT INTO order_facts BY NAME SELECT * FROM ({ORDER_FACTS_SELECT}) "
+                         "WHERE order_id IN (SELECT order_id FROM affected_orders)")
+            n_orders = conn.execute("SELECT count(*) FROM affected_orders").fetchone()[0]
+
+            # full rebuild, see the docstring
+            rollup_start = time.perf_counter()
+            if pool.rollups.specs:
+                pool.rollups = RollupStore.build(conn, pool.rollups.specs, pool.rollups.max_dims)
+            rollup_seconds = time.perf_counter() - rollup_start
+            for name in deltas:
+                conn.execute(f"DROP TABLE IF EXISTS delta_{name}")
+            conn.execute("DROP TABLE IF EXISTS affected_orders")
+            conn.execute("DROP TABLE IF EXISTS rebuild_orders")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    if cache is not None:
+        cache.clear()
+    stats = {"orders": n_orders, "olist_rows": olist_rows, "medians_changed": medians != old,
+             "seconds": round(time.perf_counter() - start, 3), "rollup_seconds": round(rollup_seconds, 3)}
+    print(f"🔄 Ingested {', '.join(deltas)}: {n_orders} orders, {olist_rows} olist rows rebuilt "
+          f"in {stats['seconds']:.2f}s ({stats['rollup_seconds']:.2f}s rollups)")
+    return stats
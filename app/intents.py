@@ -0,0 +1,275 @@
+import re
+
+# Deterministic fast path: common aggregate questions ("revenue by state", "average
+# delivery_days per customer_state", "top 5 categories by total_order_value in 2018",
+# "maximum product width") are parsed locally, answered with a SQL template over the
+# star-schema tables and summarized from a template — no model calls. Anything the
+# parser does not fully understand falls through to the LLM path.
+
+# table sets the templates can target; each maps dimensions / measures to SQL expressions
+SOURCES = {
+    "orders": {
+        "from": "order_facts f",
+        "requires": {"order_facts"},
+        "dims": {
+            "customer_state": "f.customer_state", "customer_city": "f.customer_city",
+            "order_year": "f.order_year", "order_month": "f.order_month",
+            "payment_type": "f.main_payment_type", "order_status": "f.order_status",
+        },
+        "measures": {
+            "revenue": "f.total_order_value", "delivery_days": "f.delivery_days",
+            "review_score": "f.review_score", "freight_value": "f.freight_value",
+            "distance_km": "f.distance_km", "orders": "COUNT(*)",
+        },
+    },
+    "products": {
+        "from": "products p",
+        "requires": {"products"},
+        "dims": {"category": "p.product_category_name_english"},
+        "measures": {
+            "product_width_cm": "p.product_width_cm", "product_length_cm": "p.product_length_cm",
+            "product_height_cm": "p.product_height_cm", "product_weight_g": "p.product_weight_g",
+            "products": "COUNT(*)",
+        },
+    },
+    "items": {
+        "from": ("items i JOIN products p ON i.product_id = p.product_id "
+                 "LEFT JOIN orders o ON i.order_id = o.order_id "
+                 "LEFT JOIN sellers s ON i.seller_id = s.seller_id"),
+        "requires": {"items", "products", "orders", "sellers"},
+        "dims": {
+            "category": "p.product_category_name_english", "seller_state": "s.seller_state",
+            "seller_city": "s.seller_city", "order_year": "o.order_year", "order_month": "o.order_month",
+        },
+        "measures": {
+            "revenue": "i.price + i.freight_value", "price": "i.price", "freight_value": "i.freight_value",
+            "delivery_days": "o.delivery_days", "orders": "COUNT(DISTINCT i.order_id)",
+            "product_width_cm": "p.product_width_cm", "product_length_cm": "p.product_length_cm",
+            "product_height_cm": "p.product_height_cm", "product_weight_g": "p.product_weight_g",
+        },
+    },
+}
+
+MEASURES = {
+    # key: (phrases, default aggregate, label)
+    "revenue": (["total_order_value", "total order value", "order value", "revenue", "sales", "gmv",
+                 "payment_value", "payment value"], "sum", "revenue"),
+    "orders": (["orders", "order count", "order_count"], "count", "number of orders"),
+    "products": (["products count", "product count"], "count", "number of products"),
+    "delivery_days": (["delivery_days", "delivery days", "delivery time", "days to deliver"], "avg",
+                      "delivery days"),
+    "review_score": (["review_score", "review score", "rating", "ratings", "review"], "avg", "review score"),
+    "distance_km": (["distance_km", "distance", "shipping distance", "seller distance"], "avg",
+                    "seller-to-customer distance (km)"),
+    "price": (["price", "item price"], "avg", "price"),
+    "freight_value": (["freight_value", "freight value", "freight", "shipping cost"], "sum", "freight value"),
+    "product_width_cm": (["product_width_cm", "product width", "width"], "avg", "product width (cm)"),
+    "product_length_cm": (["product_length_cm", "product length", "length"], "avg", "product length (cm)"),
+    "product_height_cm": (["product_height_cm", "product height", "height"], "avg", "product height (cm)"),
+    "product_weight_g": (["product_weight_g", "product weight", "weight"], "avg", "product weight (g)"),
+}
+
+DIMENSIONS = {
+    # key: (phrases, label for one / many)
+    "customer_state": (["customer_state", "customer state", "customer states", "state", "states"],
+                       "customer state", "customer states"),
+    "customer_city": (["customer_city", "customer city", "city", "cities"], "city", "cities"),
+    "seller_state": (["seller_state", "seller state", "seller states"], "seller state", "seller states"),
+    "seller_city": (["seller_city", "seller city", "seller cities"], "seller city", "seller cities"),
+    "category": (["product_category_name_english", "product_category_name", "product categories",
+                  "product category", "categories", "category"], "category", "categories"),
+    "order_year": (["order_year", "year", "years"], "year", "years"),
+    "order_month": (["order_month", "month", "months"], "month", "months"),
+    "payment_type": (["payment_type", "payment type", "payment types", "payment method"],
+                     "payment type", "payment types"),
+    "order_status": (["order_status", "order status"], "order status", "order statuses"),
+}
+
+AGGREGATES = {
+    "avg": ["average", "avg", "mean"],
+    "sum": ["total", "sum of", "sum"],
+    "max": ["maximum", "max", "largest", "biggest"],
+    "min": ["minimum", "min", "smallest"],
+}
+ORDER_WORDS = {"desc": ["highest", "most", "best", "top", "greatest"], "asc": ["lowest", "least", "worst", "fewest"]}
+
+STOPWORDS = set("""
+which what whats is are was were the a an of by per for in on at each every show me list give tell get
+find generated generate has have had did does do with and across all number how many much value values
+centimeters centimetres cm grams g kg product products customer customers overall there from to please
+our we it its that wise breakdown distribution group grouped
+""".split())
+
+AGG_SQL = {"avg": "AVG({})", "sum": "SUM({})", "max": "MAX({})", "min": "MIN({})"}
+AGG_LABEL = {"avg": "average", "sum": "total", "max": "maximum", "min": "minimum", "count": ""}
+AGG_ALIAS = {"avg": "avg", "sum": "total", "max": "max", "min": "min"}
+TEMPORAL_DIMS = {"order_year", "order_month"}
+
+TRANSLATION_PATTERN = re.compile(r"\b(english|translation|translate)\b.*\b(word|name|term|of|for)\b")
+
+
+def _phrase_regex(phrase: str):
+    return re.compile(r"(?<![\w])" + re.escape(phrase) + r"(?![\w])")
+
+
+def _fmt(value) -> str:
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    if isinstance(value, int):
+        return f"{value:,}"
+    return str(value)
+
+
+class IntentParser:
+    """Matches a question against the phrase vocabulary; returns a template match or None."""
+
+    def __init__(self, tables: set, categories: dict = None):
+        self.tables = set(tables)
+        # every known spelling of a category -> (portuguese name, english name)
+        self.categories = {}
+        for pt, en in (categories or {}).items():
+            for spelling in {pt, en, pt.replace("_", " "), (en or "").replace("_", " ")}:
+                if spelling:
+                    self.categories[spelling.lower()] = (pt, en)
+        vocab = []
+        for key, (phrases, _, _) in MEASURES.items():
+            vocab += [(p, "measure", key) for p in phrases]
+        for key, (phrases, _, _) in DIMENSIONS.items():
+            vocab += [(p, "dim", key) for p in phrases]
+        for key, phrases in AGGREGATES.items():
+            vocab += [(p, "agg", key) for p in phrases]
+        for key, phrases in ORDER_WORDS.items():
+            vocab += [(p, "order", key) for p in phrases]
+        vocab += [(spelling, "category", spelling) for spelling in self.categories]
+        # longest phrases first so "total order value" wins over "total"
+        self.vocab = [(p, _phrase_regex(p), kind, key) for p, kind, key in sorted(vocab, key=lambda v: -len(v[0]))]
+
+    @classmethod
+    def from_executor(cls, executor):
+        tables = set(executor.table_columns())
+        categories = {}
+        if "products" in tables:
+            rows = executor.run_query(
+                "SELECT DISTINCT product_category_name, product_category_name_english FROM products "
+                "WHERE product_category_name IS NOT NULL"
+            )
+            if not isinstance(rows, str):
+                categories = dict(zip(rows.column(0).to_pylist(), rows.column(1).to_pylist()))
+        return cls(tables, categories)
+
+    # ------------------------ PARSING ------------------------
+    def match(self, question: str):
+        """Returns {"sql", "kind", ...} for a fully understood question, else None."""
+        q = re.sub(r"[^\w\s]", " ", question.lower())
+        q = re.sub(r"\s+", " ", q).strip()
+        found = {"measure": [], "dim": [], "agg": [], "order": [], "category": []}
+
+        top = re.search(r"\btop (\d{1,3})\b", q)
+        limit = int(top.group(1)) if top else None
+        if top:
+            q = q.replace(top.group(0), " ")
+            found["order"].append("desc")
+        year = re.search(r"\b(20\d\d)\b", q)
+        if year:
+            q = q.replace(year.group(0), " ")
+
+        for phrase, regex, kind, key in self.vocab:
+            if regex.search(q):
+                q = regex.sub(" ", q)
+                found[kind].append(key)
+
+        leftover = [w for w in q.split() if w not in STOPWORDS]
+        if TRANSLATION_PATTERN.search(question.lower()) and len(found["category"]) == 1:
+            pt, en = self.categories[found["category"][0]]
+            return self._translation(pt, en)
+        if leftover or len(found["measure"]) != 1 or len(found["dim"]) > 1 or len(found["category"]) > 1 \
+                or len(set(found["agg"])) > 1 or len(set(found["order"])) > 1:
+            return None
+
+        measure = found["measure"][0]
+        dim = found["dim"][0] if found["dim"] else None
+        agg = found["agg"][0] if found["agg"] else MEASURES[measure][1]
+        if measure in ("orders", "products"):
+            agg = "count"
+        elif agg == "count":
+            return None
+        # rankings by default, except time axes which read best in calendar order
+        order = found["order"][0] if found["order"] else ("desc" if dim and dim not in TEMPORAL_DIMS else None)
+        category = self.categories[found["category"][0]][1] if found["category"] else None
+        return self._aggregate(measure, agg, dim, order, limit, year and int(year.group(1)), category)
+
+    # ------------------------ TEMPLATES ------------------------
+    def _source_for(self, measure, dim, year, category):
+        for name, source in SOURCES.items():
+            if not source["requires"] <= self.tables or measure not in source["measures"]:
+                continue
+            if dim and dim not in source["dims"]:
+                continue
+            if year and "order_year" not in source["dims"]:
+                continue
+            if category and "category" not in source["dims"]:
+                continue
+            return source
+        return None
+
+    def _aggregate(self, measure, agg, dim, order, limit, year, category):
+        source = self._source_for(measure, dim, year, category)
+        if source is None:
+            return None
+        expr = source["measures"][measure]
+        metric_sql = expr if agg == "count" else AGG_SQL[agg].format(expr)
+        alias = measure if agg == "count" else f"{AGG_ALIAS[agg]}_{measure}"
+        where = []
+        if year:
+            where.append(f"{source['dims']['order_year']} = {year}")
+        if category:
+            where.append(f"{source['dims']['category']} = '{category.replace(chr(39), chr(39) * 2)}'")
+        where_sql = f"\nWHERE {' AND '.join(where)}" if where else ""
+
+        if dim:
+            sql = (f"SELECT {source['dims'][dim]} AS {dim}, {metric_sql} AS {alias}\n"
+                   f"FROM {source['from']}{where_sql}\nGROUP BY 1\n"
+                   + (f"ORDER BY 2 {order.upper()} NULLS LAST" if order else "ORDER BY 1"))
+            if limit:
+                sql += f"\nLIMIT {limit}"
+        else:
+            sql = f"SELECT {metric_sql} AS {alias}\nFROM {source['from']}{where_sql}"
+
+        label = " ".join(w for w in [AGG_LABEL[agg], MEASURES[measure][2]] if w)
+        scope = " ".join(s for s in [f"for {category}" if category else "", f"in {year}" if year else ""] if s)
+        return {"kind": "aggregate", "sql": sql, "label": label, "dim": dim, "order": order, "scope": scope}
+
+    @staticmethod
+    def _translation(pt, en):
+        sql = ("SELECT DISTINCT product_category_name, product_category_name_english FROM products "
+               f"WHERE product_category_name = '{pt.replace(chr(39), chr(39) * 2)}'")
+        return {"kind": "translation", "sql": sql, "label": "translation"}
+
+    @staticmethod
+    def summarize(intent: dict, table) -> str:
+        """Templated answer text for an intent's result table."""
+        if table.num_rows == 0:
+            return "No matching data was found."
+        rows = table.to_pylist()
+        if intent["kind"] == "translation":
+            return (f"The Portuguese category **{rows[0]['product_category_name']}** is "
+                    f"**{rows[0]['product_category_name_english']}** in English.")
+        scope = f" {intent['scope']}" if intent["scope"] else ""
+        value_col = table.column_names[-1]
+        if not intent["dim"]:
+            return f"The {intent['label']}{scope} is **{_fmt(rows[0][value_col])}**."
+        dim = intent["dim"]
+        one, many = DIMENSIONS[dim][1], DIMENSIONS[dim][2]
+        if intent["order"] is None:
+            peak = max((r for r in rows if r[value_col] is not None), key=lambda r: r[value_col], default=rows[0])
+            return (f"The {intent['label']}{scope} peaks in {one} **{peak[dim]}** ({_fmt(peak[value_col])}) "
+                    f"across {len(rows)} {many if len(rows) != 1 else one}.")
+        first = rows[0]
+        direction = "lowest" if intent["order"] == "asc" else "highest"
+        text = (f"**{first[dim]}** has the {direction} {intent['label']}{scope} "
+                f"({_fmt(first[value_col])}) among {len(rows)} {many if len(rows) != 1 else one}.")
+        if len(rows) > 1:
+            second, last = rows[1], rows[-1]
+            text += f" Next is **{second[dim]}** ({_fmt(second[value_col])})"
+            text += f", and **{last[dim]}** is last ({_fmt(last[value_col])})." if len(rows) > 2 else "."
+        return text
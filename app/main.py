@@ -2,9 +2,20 @@
 import streamlit as st
 import hashlib
 from chatbot import ChatBot
-from data_loader import load_olist_data
-from config import GEMINI_API_KEY, MODEL_NAME, DATA_PATH
-from visualizer import visualize_result
+from query_executor import QueryExecutor
+from cache import AnswerCache
+from scheduler import Scheduler
+from db_pool import create_olist_pool
+from tracing import get_tracer
+from history import ChatHistory, HistoryJanitor
+from config import (
+    GEMINI_API_KEY, MODEL_NAME, DATA_PATH, CACHE_DIR, LOADER_MODE,
+    QUERY_CACHE_TTL, QUERY_CACHE_SIZE, QUERY_CACHE_DIR,
+    LLM_REQUESTS_PER_MINUTE, LLM_BURST, LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES, DB_WORKERS,
+    DB_POOL_SIZE, HISTORY_BUDGET_MB, HISTORY_DIR, HISTORY_KEEP_ROWS, HISTORY_SPILL, HISTORY_TTL,
+    HISTORY_CLEANUP_INTERVAL,
+)
+from visualizer import prepare_visual, render_visual
 
 # ------------------------ PAGE SETUP ------------------------
 st.set_page_config(page_title="E-Commerce Insight Chat", page_icon="🧠", layout="wide")
@@ -52,23 +63,52 @@ st.markdown("<div class='title'>🧠 GenAI E-Commerce Insight Assistant</div>",
 st.caption("Chat naturally to explore insights from the Olist e-commerce dataset.")
 
 # ------------------------ LOAD DATA ------------------------
-@st.cache_data(show_spinner=True)
-def get_data():
-    return load_olist_data(DATA_PATH)
-
-data = get_data()
+@st.cache_resource(show_spinner=True)
+def get_pool():
+    # one DuckDB database per process; every session borrows read-only cursors from it
+    return create_olist_pool(DATA_PATH, LOADER_MODE, cache_dir=CACHE_DIR, max_cursors=DB_POOL_SIZE)
+
+@st.cache_resource
+def get_answer_cache():
+    # one cache for every session in this process
+    return AnswerCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL, QUERY_CACHE_DIR or None)
+
+@st.cache_resource
+def get_scheduler():
+    # shared event loop + rate limiter so concurrent sessions don't serialize or burst into 429s
+    return Scheduler(LLM_REQUESTS_PER_MINUTE, LLM_BURST, LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES, db_workers=DB_WORKERS)
+
+@st.cache_resource
+def get_history_janitor():
+    # removes the spilled results of sessions that have been idle for HISTORY_TTL
+    return HistoryJanitor(HISTORY_DIR, HISTORY_TTL, HISTORY_CLEANUP_INTERVAL)
+
+pool = get_pool()
+answer_cache = get_answer_cache()
+scheduler = get_scheduler()
+tracer = get_tracer()
+get_history_janitor()
 
 # ------------------------ SESSION STATE ------------------------
 if "bot" not in st.session_state:
-    st.session_state.bot = ChatBot(GEMINI_API_KEY, MODEL_NAME, data)
+    st.session_state.bot = ChatBot(GEMINI_API_KEY, MODEL_NAME, executor=QueryExecutor(pool=pool),
+                                   cache=answer_cache, scheduler=scheduler)
 if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []  # [{"role": "user"/"bot", "text": str, "data": pd.DataFrame | None}]
+    # [{"role": "user"/"bot", "text": str, "data": pyarrow.Table | None, "sql": str | None, "question": str,
+    #   "visual": dict | None}]; results beyond the session budget move to disk, keeping a "preview" of the
+    # first rows (their figure is rebuilt when the full result is loaded back)
+    st.session_state.chat_history = ChatHistory(
+        HISTORY_DIR, HISTORY_BUDGET_MB, HISTORY_KEEP_ROWS, HISTORY_SPILL,
+        recompute=st.session_state.bot.executor.run_query,
+        visualize=lambda question, table: prepare_visual(question, table)["figure"],
+    )
 
 bot: ChatBot = st.session_state.bot
+history: ChatHistory = st.session_state.chat_history
 
 # Add initial greeting
-if not st.session_state.chat_history:
-    st.session_state.chat_history.append({
+if not history:
+    history.append({
         "role": "bot",
         "text": "👋 Hello! I’m your AI assistant. Ask me anything about the Olist dataset — "
                 "for example, *'Which city placed the most orders last year?'* or *'Show average delivery days by state.'*",
@@ -96,7 +136,7 @@ with col2:
 
     st.markdown("---")
     if st.button("🔄 Clear Chat History"):
-        st.session_state.chat_history = []
+        history.clear()
         bot.memory.clear()
         st.success("Chat history cleared!")
         st.rerun()
@@ -108,13 +148,27 @@ with col1:
 
     with chat_box:
         st.markdown("<div class='chat-box'>", unsafe_allow_html=True)
-        for msg in st.session_state.chat_history:
+        for msg in history:
             if msg["role"] == "user":
                 st.markdown(f"<div class='user-msg'>{msg['text']}</div>", unsafe_allow_html=True)
             else:
                 st.markdown(f"<div class='bot-msg'>{msg['text']}</div>", unsafe_allow_html=True)
-                if "data" in msg and msg["data"] is not None:
-                    visualize_result(msg["text"], msg["data"])
+                table = history.shown(msg)
+                if table is not None:
+                    # chart choice and figure were computed once when the answer arrived
+                    sql = msg.get("sql")
+                    full_export = (lambda sql=sql: bot.executor.iter_batches(sql)) if sql else None
+                    if table is msg.get("data"):
+                        render_visual(msg["visual"], table, full_export=full_export)
+                    else:
+                        st.caption(f"ℹ️ Showing the first {table.num_rows:,} of {msg['rows']:,} rows; "
+                                   "the full result and its chart were moved out of memory.")
+                        # downloads read the spilled file off the script thread without making it resident
+                        render_visual(msg["visual"], table, full_export=full_export,
+                                      load=lambda msg=msg: history.load(msg))
+                        if st.button("🔄 Load full result", key=f"load_{msg['id']}"):
+                            history.result(msg)
+                            st.rerun()
         st.markdown("</div>", unsafe_allow_html=True)
 
     st.markdown("---")
@@ -125,16 +179,31 @@ with col1:
     if st.button("Send") or selected_query:
         if final_query:
             # Add user message
-            st.session_state.chat_history.append({"role": "user", "text": final_query, "data": None})
+            history.append({"role": "user", "text": final_query, "data": None})
 
             # Run bot
             with st.spinner("Thinking..."):
-                output = bot.ask(final_query)
+                output = scheduler.run(bot.ask_async(final_query, stream=True))
                 answer_text = output["answer"]
-                result_df = output["result"]
-
-            # Add bot message
-            st.session_state.chat_history.append({"role": "bot", "text": answer_text, "data": result_df})
+                result_table = output["result"]
+
+            # Show the table right away and stream the summary under it
+            if output.get("stream") is not None:
+                with chat_box:
+                    if result_table is not None:
+                        st.dataframe(result_table.slice(0, 100), use_container_width=True)
+                    answer_text += st.write_stream(scheduler.iterate(output["stream"]))
+
+            # Add bot message (with its chart state, so reruns never rebuild it)
+            visual = None
+            if result_table is not None:
+                with tracer.span("chart", parent=output.get("trace"), rows=result_table.num_rows) as span:
+                    visual = prepare_visual(final_query, result_table)
+                    span.set(chart_type=visual["chart_type"])
+            history.append({
+                "role": "bot", "text": answer_text, "data": result_table, "sql": output.get("sql"),
+                "question": final_query, "visual": visual,
+            })
 
             st.rerun()
         else:
@@ -1,22 +1,199 @@
-# app/query_executor.py
 import duckdb
+import json
+import os
 import pandas as pd
+import threading
+import time
+from contextlib import contextmanager
+from data_loader import load_star_schema
+from db_pool import check_read_only, connection_config
+from results import with_flags, is_truncated
+from rollups import RollupStore
+from guardrails import estimate_rows, cap_rows, single_statement, fetch_limited, QueryTimeout
+from sql_check import check_sql
+from tracing import get_tracer, Tracer
+from config import (QUERY_GUARDS, QUERY_MAX_ROWS, QUERY_MAX_EXPORT_ROWS, QUERY_MAX_ESTIMATED_ROWS,
+                    QUERY_TIMEOUT_SECONDS, SLOW_QUERY_MS, PROFILE_DIR)
 
 class QueryExecutor:
     """
-    Registers a pandas DataFrame in an in-memory DuckDB instance and
-    executes SQL queries safely.
+    Executes SQL against DuckDB. Either borrows read-only cursors from a shared
+    DuckDBPool (see db_pool.py), registers a pandas DataFrame as 'olist' in a private
+    in-memory instance, or wraps an existing connection that already holds an 'olist'
+    table. When data_path is given the normalized star-schema tables and
+    `order_facts` are registered as well.
+
+    In guarded mode only a single SELECT (or plain EXPLAIN) is accepted; it is EXPLAINed
+    first and rejected when the optimizer expects more than QUERY_MAX_ESTIMATED_ROWS
+    intermediate rows, results are read batch by batch and capped at QUERY_MAX_ROWS (the
+    result's "truncated" flag is set), and queries running longer than
+    QUERY_TIMEOUT_SECONDS are interrupted.
+
+    Results are pyarrow Tables straight from DuckDB (no pandas conversion);
+    iter_batches() streams large results lazily for exports (up to QUERY_MAX_EXPORT_ROWS).
+
+    Aggregate queries that only group/filter by rollup dimensions are transparently
+    rewritten to read from the precomputed rollup tables (see rollups.py); the pool's
+    RollupStore is used unless one is passed in.
+
+    Each query runs in a "duckdb" trace span (rows, rollup, truncation). With SLOW_QUERY_MS
+    set, DuckDB profiles every query (the pool's cursors are set up by DuckDBPool.seal);
+    for queries slower than that the JSON profile of the run itself is written to
+    PROFILE_DIR and the span's "profile" attribute has the path.
     """
-    def __init__(self, dataframe: pd.DataFrame):
-        self.df = dataframe.copy()
-        self.conn = duckdb.connect(database=":memory:")
-        # register table name 'olist'
-        self.conn.register("olist", self.df)
+    def __init__(self, dataframe: pd.DataFrame = None, conn=None, data_path: str = None, pool=None,
+                 guarded: bool = QUERY_GUARDS, rollups: RollupStore = None, tracer: Tracer = None):
+        self.pool = pool
+        self.tracer = tracer or get_tracer()
+        self.slow_query_ms = SLOW_QUERY_MS
+        self.profile_dir = PROFILE_DIR
+        self.rollups = rollups or (pool.rollups if pool is not None else RollupStore())
+        self.guarded = guarded
+        self.max_rows = QUERY_MAX_ROWS
+        self.max_export_rows = QUERY_MAX_EXPORT_ROWS
+        self.max_estimated_rows = QUERY_MAX_ESTIMATED_ROWS
+        self.timeout = QUERY_TIMEOUT_SECONDS
+        if pool is not None:
+            self.df = None
+            self.conn = None
+        elif conn is not None:
+            self.df = None
+            self.conn = conn
+        else:
+            # register() scans the frame in place — no defensive copy needed
+            self.df = dataframe
+            self.conn = duckdb.connect(database=":memory:", config=connection_config())
+            # register table name 'olist'
+            self.conn.register("olist", self.df)
+        # one statement at a time per connection; ask_async may overlap queries from the same session
+        self._lock = threading.Lock()
+        if self.conn is not None and self.slow_query_ms > 0:
+            try:
+                self.conn.execute("SET enable_profiling = 'no_output'")
+            except duckdb.Error as e:
+                print(f"⚠️ Slow-query profiling unavailable on this connection: {e}")
+        if data_path and self.conn is not None:
+            load_star_schema(self.conn, data_path)
+
+    @contextmanager
+    def _cursor(self):
+        if self.pool is not None:
+            with self.pool.cursor() as cur:
+                yield cur
+        else:
+            with self._lock:
+                yield self.conn
+
+    def columns(self, table: str = "olist") -> list:
+        with self._cursor() as cur:
+            return [row[0] for row in cur.execute(f"DESCRIBE {table}").fetchall()]
+
+    def table_columns(self) -> dict:
+        """{table_name: [columns]} for every table/view visible on the connection."""
+        with self._cursor() as cur:
+            rows = cur.execute(
+                "SELECT table_name, column_name FROM information_schema.columns "
+                "WHERE table_schema = 'main' ORDER BY table_name, ordinal_position"
+            ).fetchall()
+        tables = {}
+        for table, column in rows:
+            tables.setdefault(table, []).append(column)
+        return tables
+
+    def validate_sql(self, sql_query: str) -> dict:
+        """Bind sql_query without running it and repair misspelled identifiers (see sql_check.py)."""
+        with self._cursor() as cur:
+            return check_sql(cur, sql_query)
 
     def run_query(self, sql_query: str):
-        try:
-            print(f"🧠 Executing SQL:\n{sql_query}")
-            result = self.conn.execute(sql_query).fetchdf()
+        with self.tracer.span("duckdb", guarded=self.guarded) as span:
+            profile = None
+            try:
+                print(f"🧠 Executing SQL:\n{sql_query}")
+                with self._cursor() as cur:
+                    if self.pool is not None:
+                        check_read_only(cur, sql_query)
+                    rewritten = self.rollups.rewrite(cur, sql_query)
+                    if rewritten:
+                        print(f"📦 Answered from rollup:\n{rewritten}")
+                        sql_query = rewritten
+                    span.set(rollup=bool(rewritten))
+                    if not self.guarded:
+                        result = cur.execute(sql_query).fetch_arrow_table()
+                    else:
+                        result = self._run_guarded(cur, sql_query)
+                    slow = self.slow_query_ms > 0 and span.elapsed_ms() >= self.slow_query_ms
+                    # the cursor's profile is of its last statement, so read it before giving the cursor back
+                    profile = cur.get_profiling_information(format="json") if slow else None
+            except Exception as e:
+                result = f"❌ Query error: {e}"
+            if isinstance(result, str):
+                span.fail(result)
+            else:
+                span.set(rows=result.num_rows, truncated=is_truncated(result))
+                if profile:
+                    self._save_profile(span, sql_query, profile)
             return result
+
+    def _save_profile(self, span, sql_query: str, profile: str):
+        """Write DuckDB's JSON profile of a slow query's own run (nothing is executed again)."""
+        try:
+            profile = json.loads(profile)
+            if profile.get("result") == "disabled":
+                return
+            path = os.path.join(self.profile_dir, f"{span.trace_id[:12]}_{span.span_id}.json")
+            elapsed_ms = span.elapsed_ms()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"sql": sql_query, "elapsed_ms": round(elapsed_ms, 3), "captured_at": time.time(),
+                           "profile": profile}, f, indent=2)
+            span.set(profile=path)
+            print(f"🐢 Slow query ({elapsed_ms:,.0f} ms) profiled to {path}")
         except Exception as e:
-            return f"❌ Query error: {e}"
+            print(f"⚠️ Could not save slow query profile: {e}")
+
+    def iter_batches(self, sql_query: str, batch_size: int = 65536):
+        """
+        Yield RecordBatches of the result for exports; only the batch being consumed is
+        materialized. In guarded mode the query gets the same single-statement and cost
+        checks and timeout as run_query(), and stops after QUERY_MAX_EXPORT_ROWS rows.
+        """
+        with self._cursor() as cur:
+            if self.pool is not None:
+                check_read_only(cur, sql_query)
+            if not self.guarded:
+                yield from cur.execute(sql_query).fetch_record_batch(batch_size)
+                return
+            if single_statement(cur, sql_query) == duckdb.StatementType.SELECT:
+                sql_query = f"SELECT * FROM (\n{sql_query}\n) AS exported LIMIT {self.max_export_rows}"
+                estimated = estimate_rows(cur, sql_query)
+                if estimated > self.max_estimated_rows:
+                    raise ValueError(f"❌ Export rejected: the plan is estimated to process ~{estimated:,} rows "
+                                     f"(limit {self.max_estimated_rows:,}).")
+            with QueryTimeout(cur, self.timeout) as timer:
+                try:
+                    yield from cur.execute(sql_query).fetch_record_batch(batch_size)
+                except duckdb.InterruptException:
+                    if timer.fired:
+                        raise TimeoutError(f"❌ Export timed out after {self.timeout:g}s.")
+                    raise
+
+    def _run_guarded(self, cur, sql_query: str):
+        # exactly one SELECT (capped and cost-checked) or a plain EXPLAIN (nothing runs)
+        kind = single_statement(cur, sql_query)
+        capped = cap_rows(cur, sql_query, self.max_rows)
+        estimated = estimate_rows(cur, capped) if kind == duckdb.StatementType.SELECT else None
+        if estimated is not None and estimated > self.max_estimated_rows:
+            return (f"❌ Query rejected: the plan is estimated to process ~{estimated:,} rows "
+                    f"(limit {self.max_estimated_rows:,}). Add filters, aggregate, or avoid cross joins.")
+        with QueryTimeout(cur, self.timeout) as timer:
+            try:
+                result = fetch_limited(cur.execute(capped), self.max_rows + 1)
+            except duckdb.InterruptException:
+                if timer.fired:
+                    return f"❌ Query timed out after {self.timeout:g}s."
+                raise
+        truncated = result.num_rows > self.max_rows
+        if truncated:
+            result = result.slice(0, self.max_rows)
+        return with_flags(result, truncated=int(truncated), estimated_rows=estimated)
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pandas as pd
+
+# Query results travel as pyarrow Tables from DuckDB to the UI; these helpers keep
+# every consumer on the zero-copy path and only convert small slices to pandas.
+
+
+def with_flags(table: pa.Table, **flags) -> pa.Table:
+    """Attach string flags (e.g. truncated=1) as schema metadata; no data is copied. None values are skipped."""
+    metadata = dict(table.schema.metadata or {})
+    metadata.update({k.encode(): str(v).encode() for k, v in flags.items() if v is not None})
+    return table.replace_schema_metadata(metadata)
+
+
+def get_flag(table: pa.Table, name: str, default: str = None) -> str:
+    value = (table.schema.metadata or {}).get(name.encode())
+    return value.decode() if value is not None else default
+
+
+def is_truncated(table: pa.Table) -> bool:
+    return get_flag(table, "truncated") == "1"
+
+
+def preview(table: pa.Table, n: int = 10) -> pd.DataFrame:
+    """First n rows as pandas (for prompts / markdown) — only those rows are converted."""
+    return table.slice(0, n).to_pandas()
+
+
+def first_values(table: pa.Table, column: str, n: int = 3) -> list:
+    return pc.drop_null(table.column(column)).slice(0, n).to_pylist()
+
+
+def csv_bytes(table: pa.Table) -> bytes:
+    """CSV-encode a Table without going through pandas."""
+    sink = pa.BufferOutputStream()
+    pa_csv.write_csv(table, sink)
+    return sink.getvalue().to_pybytes()
+
+
+def csv_file(batches):
+    """
+    CSV-encode an iterable of RecordBatches into a temporary file, one batch at a time,
+    and return it open for reading; the file is already unlinked, so closing it frees the disk.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as tmp:
+        path = tmp.name
+    try:
+        writer = None
+        with pa.OSFile(path, "wb") as sink:
+            for batch in batches:
+                if writer is None:
+                    writer = pa_csv.CSVWriter(sink, batch.schema)
+                writer.write_batch(batch)
+            if writer is not None:
+                writer.close()
+        return open(path, "rb")
+    finally:
+        os.unlink(path)
@@ -0,0 +1,236 @@
+import itertools
+import json
+
+# Materialized rollups for dashboard-style aggregates, plus a rewriter that answers a
+# generated query from a rollup when it only groups/filters by rollup dimensions and
+# aggregates rollup measures. One table per base table holds every grouping set of up
+# to MAX_ROLLUP_DIMS dimensions (told apart by `_gid`), so any such query reads a few
+# hundred pre-aggregated rows instead of scanning the base table.
+
+MAX_ROLLUP_DIMS = 3
+
+ROLLUP_SPECS = {
+    "olist": {
+        "dims": ["order_year", "order_month", "customer_state", "seller_state",
+                 "product_category_name_english", "payment_type"],
+        "measures": ["price", "freight_value", "payment_value", "total_order_value", "delivery_days",
+                     "review_score", "distance_km"],
+        "distinct": ["order_id", "customer_unique_id", "seller_id", "product_id"],
+    },
+    "order_facts": {
+        "dims": ["order_year", "order_month", "customer_state", "main_payment_type", "order_status"],
+        "measures": ["total_order_value", "payment_value", "items_value", "freight_value", "delivery_days",
+                     "review_score", "n_items", "distance_km"],
+        "distinct": ["customer_unique_id"],
+    },
+}
+
+AGGREGATES = {"sum", "count", "count_star", "avg", "min", "max"}
+
+
+class _Unsupported(Exception):
+    """The query shape can't be answered from a rollup; run it unchanged."""
+
+
+def rollup_table(base: str) -> str:
+    return f"rollup_{base}"
+
+
+def grouping_sets(dims: list, max_dims: int = MAX_ROLLUP_DIMS) -> list:
+    return [combo for k in range(max_dims + 1) for combo in itertools.combinations(dims, k)]
+
+
+def grouping_id(dims: list, grouped: set) -> int:
+    """Value of GROUPING(dims...) for a grouping set: bit set = dimension rolled up."""
+    gid = 0
+    for dim in dims:
+        gid = (gid << 1) | (0 if dim in grouped else 1)
+    return gid
+
+
+def build_rollups(conn, specs: dict = ROLLUP_SPECS, max_dims: int = MAX_ROLLUP_DIMS) -> dict:
+    """Create rollup_<base> for every base table present; returns {base: spec} of what was built."""
+    tables = {}
+    for table, column in conn.execute(
+        "SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = 'main'"
+    ).fetchall():
+        tables.setdefault(table, set()).add(column)
+
+    built = {}
+    for base, spec in specs.items():
+        needed = set(spec["dims"]) | set(spec["measures"]) | set(spec["distinct"])
+        if not needed <= tables.get(base, set()):
+            continue
+        dims = spec["dims"]
+        aggs = ["count(*) AS n_rows"]
+        for m in spec["measures"]:
+            aggs += [f"sum({m}) AS sum_{m}", f"count({m}) AS cnt_{m}", f"min({m}) AS min_{m}", f"max({m}) AS max_{m}"]
+        aggs += [f"count(DISTINCT {d}) AS distinct_{d}" for d in spec["distinct"]]
+        sets = ", ".join("(" + ", ".join(combo) + ")" for combo in grouping_sets(dims, max_dims))
+        conn.execute(f"""
+CREATE OR REPLACE TABLE {rollup_table(base)} AS
+SELECT {', '.join(dims)}, GROUPING({', '.join(dims)}) AS _gid, {', '.join(aggs)}
+FROM {base}
+GROUP BY GROUPING SETS ({sets})
+ORDER BY _gid
+""")
+        built[base] = spec
+    if built:
+        print("✅ Rollups:", ", ".join(rollup_table(b) for b in built))
+    return built
+
+
+class _Rewrite:
+    """State for rewriting one SELECT node against one rollup spec."""
+
+    def __init__(self, conn, base: str, spec: dict, qualifiers: set, aliases: set):
+        self.conn = conn
+        self.base = base
+        self.spec = spec
+        self.qualifiers = qualifiers
+        self.aliases = aliases
+        self.dims_used = set()
+        self.n_aggregates = 0
+        self.count_distinct = False
+
+    def _column(self, ref: dict) -> str:
+        names = ref["column_names"]
+        if len(names) == 2 and names[0] in self.qualifiers:
+            return names[1]
+        if len(names) != 1:
+            raise _Unsupported()
+        return names[0]
+
+    def _expr(self, sql_expr: str, alias: str) -> dict:
+        parsed = json.loads(self.conn.execute("SELECT json_serialize_sql(?)", [f"SELECT {sql_expr}"]).fetchone()[0])
+        node = parsed["statements"][0]["node"]["select_list"][0]
+        node["alias"] = alias
+        return node
+
+    def aggregate(self, node: dict) -> dict:
+        name = node["function_name"]
+        if node.get("filter") or node.get("order_bys", {}).get("orders") or node.get("export_state"):
+            raise _Unsupported()
+        self.n_aggregates += 1
+        alias = node.get("alias", "")
+        if name == "count_star":
+            return self._expr("CAST(sum(n_rows) AS BIGINT)", alias)
+        children = node.get("children", [])
+        if len(children) != 1 or children[0].get("class") != "COLUMN_REF":
+            raise _Unsupported()
+        col = self._column(children[0])
+        if node.get("distinct"):
+            if name != "count" or col not in self.spec["distinct"]:
+                raise _Unsupported()
+            self.count_distinct = True
+            return self._expr(f"CAST(sum(distinct_{col}) AS BIGINT)", alias)
+        if col not in self.spec["measures"]:
+            raise _Unsupported()
+        return self._expr({
+            "sum": f"sum(sum_{col})",
+            "count": f"CAST(sum(cnt_{col}) AS BIGINT)",
+            "avg": f"sum(sum_{col}) / sum(cnt_{col})",
+            "min": f"min(min_{col})",
+            "max": f"max(max_{col})",
+        }[name], alias)
+
+    def walk(self, node):
+        if isinstance(node, list):
+            return [self.walk(n) for n in node]
+        if not isinstance(node, dict):
+            return node
+        cls = node.get("class")
+        if cls in ("SUBQUERY", "WINDOW", "STAR", "LAMBDA"):
+            raise _Unsupported()
+        if cls == "FUNCTION" and node.get("function_name") in AGGREGATES:
+            return self.aggregate(node)
+        if cls == "COLUMN_REF":
+            col = self._column(node)
+            if col in self.spec["dims"]:
+                self.dims_used.add(col)
+            elif col not in self.aliases:
+                raise _Unsupported()
+            return node
+        return {k: self.walk(v) for k, v in node.items()}
+
+
+class RollupStore:
+    """Knows which rollups exist and rewrites eligible SQL to read from them."""
+
+    def __init__(self, specs: dict = None, max_dims: int = MAX_ROLLUP_DIMS):
+        self.specs = specs or {}
+        self.max_dims = max_dims
+
+    @classmethod
+    def build(cls, conn, specs: dict = ROLLUP_SPECS, max_dims: int = MAX_ROLLUP_DIMS):
+        return cls(build_rollups(conn, specs, max_dims), max_dims)
+
+    @staticmethod
+    def _group_dim(rw: _Rewrite, node: dict, expr: dict) -> str:
+        """Dimension named by a GROUP BY item: a column, a select-list position, or a select-list alias."""
+        if expr.get("class") == "CONSTANT" and expr["value"]["type"]["id"] in ("INTEGER", "BIGINT"):
+            position = expr["value"]["value"]
+            if not 1 <= position <= len(node["select_list"]):
+                raise _Unsupported()
+            expr = node["select_list"][position - 1]
+        elif expr.get("class") == "COLUMN_REF" and len(expr["column_names"]) == 1:
+            aliased = [item for item in node["select_list"] if item.get("alias") == expr["column_names"][0]]
+            expr = aliased[0] if aliased else expr
+        if expr.get("class") != "COLUMN_REF" or rw._column(expr) not in rw.spec["dims"]:
+            raise _Unsupported()
+        return rw._column(expr)
+
+    def rewrite(self, conn, sql_query: str):
+        """Equivalent SQL over a rollup table, or None when the query isn't eligible."""
+        if not self.specs:
+            return None
+        try:
+            parsed = json.loads(conn.execute("SELECT json_serialize_sql(?)", [sql_query]).fetchone()[0])
+            if parsed.get("error") or len(parsed["statements"]) != 1:
+                return None
+            node = parsed["statements"][0]["node"]
+            source = node.get("from_table") or {}
+            base = source.get("table_name")
+            if (node.get("type") != "SELECT_NODE" or source.get("type") != "BASE_TABLE"
+                    or base not in self.specs or source.get("schema_name") not in ("", "main")
+                    or node.get("cte_map", {}).get("map") or node.get("sample") or node.get("qualify")
+                    or node.get("aggregate_handling") != "STANDARD_HANDLING" or len(node.get("group_sets", [])) > 1):
+                return None
+
+            spec = self.specs[base]
+            qualifiers = {source.get("alias") or base}
+            aliases = {item["alias"] for item in node["select_list"] if item.get("alias")}
+            rw = _Rewrite(conn, base, spec, qualifiers, set())
+            group_dims = {self._group_dim(rw, node, g) for g in node.get("group_expressions", [])}
+            for key in ("select_list", "where_clause", "group_expressions"):
+                node[key] = rw.walk(node.get(key))
+            # ORDER BY / HAVING may also name select-list aliases
+            rw.aliases = aliases
+            for key in ("having", "modifiers"):
+                node[key] = rw.walk(node.get(key))
+            if rw.n_aggregates == 0 or len(rw.dims_used) > self.max_dims:
+                return None
+            if rw.count_distinct and rw.dims_used != group_dims:
+                # distinct counts only add up when every rollup row is exactly one output group
+                return None
+
+            # keep result column names identical to the original query
+            names = [row[0] for row in conn.execute(f"DESCRIBE {sql_query}").fetchall()]
+            for item, name in zip(node["select_list"], names):
+                if not item.get("alias"):
+                    item["alias"] = name
+
+            gid = grouping_id(spec["dims"], rw.dims_used)
+            gid_filter = rw._expr(f"_gid = {gid}", "")
+            where = node.get("where_clause")
+            node["where_clause"] = gid_filter if where is None else {
+                "class": "CONJUNCTION", "type": "CONJUNCTION_AND", "alias": "", "children": [where, gid_filter],
+            }
+            source["table_name"] = rollup_table(base)
+            source["alias"] = source.get("alias") or base
+            return conn.execute("SELECT json_deserialize_sql(?)", [json.dumps(parsed)]).fetchone()[0]
+        except _Unsupported:
+            return None
+        except Exception as e:
+            print(f"⚠️ Rollup rewrite skipped: {e}")
+            return None
@@ -0,0 +1,143 @@
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from tracing import count
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    RETRYABLE_ERRORS = (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+    )
+except Exception:
+    RETRYABLE_ERRORS = ()
+
+
+def is_retryable(error: Exception) -> bool:
+    return isinstance(error, RETRYABLE_ERRORS) or "429" in str(error)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter; lives on a single event loop so needs no locking."""
+
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Scheduler:
+    """
+    Process-wide engine for ChatBot.ask_async: one background event loop shared by all
+    sessions, a token bucket for model requests, bounded model concurrency, jittered
+    exponential backoff on 429/5xx, and a thread pool for DuckDB execution.
+    """
+
+    def __init__(self, requests_per_minute: float = 60, burst: int = 10, max_concurrency: int = 8,
+                 max_retries: int = 4, backoff_base: float = 1.0, backoff_cap: float = 30.0,
+                 db_workers: int = 4):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._db_pool = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix="duckdb")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="chatbot-scheduler", daemon=True)
+        self._thread.start()
+
+        async def init():
+            self._bucket = TokenBucket(requests_per_minute / 60.0, burst)
+            self._llm_slots = asyncio.Semaphore(max_concurrency)
+
+        self.run(init())
+
+    # ------------------------ ENTRY POINTS ------------------------
+    def submit(self, coro):
+        """Schedule a coroutine on the shared loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro, timeout: float = None):
+        """Block the calling (e.g. Streamlit script) thread until the coroutine finishes."""
+        return self.submit(coro).result(timeout)
+
+    def iterate(self, agen):
+        """Drive an async generator from synchronous code (e.g. st.write_stream)."""
+        while True:
+            try:
+                yield self.run(agen.__anext__())
+            except StopAsyncIteration:
+                return
+
+    def shutdown(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._db_pool.shutdown(wait=False)
+
+    # ------------------------ MODEL CALLS ------------------------
+    async def _with_retries(self, call):
+        for attempt in range(self.max_retries + 1):
+            await self._bucket.acquire()
+            try:
+                async with self._llm_slots:
+                    return await call()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                # full jitter keeps bursts of 429s from retrying in lockstep
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                count("retries")
+                print(f"⏳ Model rate-limited ({e}); retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def generate(self, model, prompt: str, **kwargs):
+        """Rate-limited, retried model.generate_content; uses the native async client when present."""
+        if hasattr(model, "generate_content_async"):
+            return await self._with_retries(lambda: model.generate_content_async(prompt, **kwargs))
+        loop = asyncio.get_running_loop()
+        return await self._with_retries(
+            lambda: loop.run_in_executor(None, partial(model.generate_content, prompt, **kwargs))
+        )
+
+    async def generate_stream(self, model, prompt: str, **kwargs):
+        """Async generator of text chunks from a streamed generate_content call."""
+        if hasattr(model, "generate_content_async"):
+            response = await self.generate(model, prompt, stream=True, **kwargs)
+            async for chunk in response:
+                text = getattr(chunk, "text", "")
+                if text:
+                    yield text
+            return
+
+        loop = asyncio.get_running_loop()
+        chunks = iter(await self.generate(model, prompt, stream=True, **kwargs))
+        done = object()
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, done)
+            if chunk is done:
+                return
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+
+    # ------------------------ DUCKDB ------------------------
+    async def run_db(self, fn, *args):
+        """Run blocking DuckDB work on the dedicated pool so the loop keeps serving other sessions."""
+        # run_in_executor does not carry contextvars over; copy them so trace spans nest
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self._db_pool, partial(context.run, fn, *args))
@@ -0,0 +1,214 @@
+import re
+
+from intents import SOURCES, MEASURES, DIMENSIONS, _phrase_regex
+
+# Schema index for prompt compaction. Instead of every column of every table, the SQL
+# prompt gets only the tables and columns a question refers to: by column-name words,
+# by the fast-path vocabulary ("revenue" → total_order_value, price…), or by a known value
+# ("boleto", "SP", a category name). Join keys always come along, and categorical columns
+# show a few example values so the model writes valid filters.
+
+# word parts too generic to select a column on their own
+GENERIC_PARTS = {"id", "name", "value", "date", "order", "orders", "count", "qty", "at", "cm", "g", "n",
+                 "lenght", "english", "zip", "code", "prefix", "main", "total", "unique", "sequential"}
+TEMPORAL_WORDS = {"year", "years", "month", "months", "monthly", "yearly", "date", "dates", "when", "trend",
+                  "time", "over", "since", "last", "recent", "growth", "season", "seasonal", "week", "day", "days"}
+GEO_WORDS = {"distance", "km", "kilometers", "near", "nearby", "radius", "within", "far", "lat", "lng", "geo"}
+MAX_EXAMPLE_VALUES = 6
+# categorical columns whose distinct values are indexed for matching (and shown as examples)
+MAX_DISTINCT = 200
+# longer values are free text (e.g. review comments), not labels worth showing
+MAX_VALUE_CHARS = 40
+
+
+def _words(text: str) -> set:
+    words = set(re.sub(r"[^\w\s]", " ", text.lower()).split())
+    # crude singulars: "deliveries" → "delivery", "states" → "state"
+    return words | {w[:-3] + "y" if w.endswith("ies") else w[:-1] for w in words if w.endswith("s") and len(w) > 3}
+
+
+def _is_key(column: str) -> bool:
+    return column.endswith("_id") or column.endswith("zip_code_prefix") or column == "zip_prefix"
+
+
+def _joinable(a: set, b: set) -> bool:
+    """Two tables' column sets share an *_id key, or one is geo (zip_prefix) and the other has a zip prefix."""
+    if any(c.endswith("_id") for c in a & b):
+        return True
+    zips = (any(c.endswith("zip_code_prefix") for c in a), any(c.endswith("zip_code_prefix") for c in b))
+    return ("zip_prefix" in a and zips[1]) or ("zip_prefix" in b and zips[0])
+
+
+def _vocabulary_columns() -> list:
+    """[(phrase regex, {column names})] from the fast-path measure/dimension phrases."""
+    exprs = {}
+    for source in SOURCES.values():
+        for key, expr in {**source["dims"], **source["measures"]}.items():
+            exprs.setdefault(key, set()).update(re.findall(r"\b[a-z]\.(\w+)", expr))
+    vocab = []
+    for key, (phrases, *_rest) in {**MEASURES, **DIMENSIONS}.items():
+        columns = exprs.get(key, {key})
+        vocab += [(_phrase_regex(p), columns) for p in phrases]
+    return vocab
+
+
+class SchemaIndex:
+    """
+    tables: {table: [(column, type)]}; values: {(table, column): [values, most frequent first]}.
+    describe(question) returns the compact schema text for the SQL prompt.
+    """
+
+    def __init__(self, tables: dict, values: dict = None):
+        # rollups are internal and the wide olist join is only listed when nothing else exists
+        self.tables = {t: cols for t, cols in tables.items()
+                       if not t.startswith("rollup_") and (t != "olist" or set(tables) <= {"olist"})}
+        self.values = values or {}
+        self.vocab = _vocabulary_columns()
+
+    @classmethod
+    def from_executor(cls, executor):
+        rows = executor.run_query(
+            "SELECT table_name, column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = 'main' ORDER BY table_name, ordinal_position"
+        )
+        tables = {}
+        if not isinstance(rows, str):
+            for table, column, dtype in zip(*(rows.column(i).to_pylist() for i in range(3))):
+                tables.setdefault(table, []).append((column, dtype))
+        index = cls(tables)
+        index.values = cls._categorical_values(executor, index.tables)
+        return index
+
+    @staticmethod
+    def _categorical_values(executor, tables: dict) -> dict:
+        """Distinct values (most frequent first) of the low-cardinality text columns, in two queries."""
+        text = [(t, c) for t, cols in tables.items() for c, dtype in cols if dtype == "VARCHAR" and not _is_key(c)]
+        if not text:
+            return {}
+        counts = executor.run_query(" UNION ALL ".join(
+            f"SELECT '{t}' AS t, '{c}' AS c, approx_count_distinct(\"{c}\") AS n FROM \"{t}\"" for t, c in text
+        ))
+        if isinstance(counts, str):
+            return {}
+        low = [(t, c) for t, c, n in zip(*(counts.column(i).to_pylist() for i in range(3))) if n and n <= MAX_DISTINCT]
+        if not low:
+            return {}
+        rows = executor.run_query(" UNION ALL ".join(
+            f"(SELECT '{t}' AS t, '{c}' AS c, \"{c}\"::VARCHAR AS v FROM \"{t}\" WHERE \"{c}\" IS NOT NULL "
+            f"GROUP BY 3 ORDER BY count(*) DESC, 3 LIMIT {MAX_DISTINCT})" for t, c in low
+        ))
+        values = {}
+        if not isinstance(rows, str):
+            for t, c, v in zip(*(rows.column(i).to_pylist() for i in range(3))):
+                if len(v) <= MAX_VALUE_CHARS and "\n" not in v:
+                    values.setdefault((t, c), []).append(v)
+        return values
+
+    def _mentioned(self, table: str, column: str, question: str) -> list:
+        q = question.lower().replace("_", " ")
+        return [v for v in self.values.get((table, column), [])
+                if len(v) > 1 and _phrase_regex(v.lower().replace("_", " ")).search(q)]
+
+    # ------------------------ SELECTION ------------------------
+    def select(self, question: str) -> dict:
+        """{table: [columns]} relevant to the question; {} when nothing matched."""
+        q = question.lower()
+        words = _words(question)
+        named = set()
+        for regex, columns in self.vocab:
+            if regex.search(q):
+                named |= columns
+        temporal = bool(words & TEMPORAL_WORDS) or re.search(r"\b20\d\d\b", q) is not None
+
+        selected = {}
+        for table, cols in self.tables.items():
+            hits = []
+            for column, dtype in cols:
+                parts = {p for p in column.split("_") if p not in GENERIC_PARTS and len(p) > 1}
+                if column in named or _phrase_regex(column.lower()).search(q) or parts & words \
+                        or self._mentioned(table, column, question):
+                    hits.append(column)
+                elif temporal and (dtype.startswith(("TIMESTAMP", "DATE")) or column in ("order_year", "order_month")):
+                    hits.append(column)
+            if any(not (t.startswith(("TIMESTAMP", "DATE")) or c in ("order_year", "order_month"))
+                   for c, t in cols if c in hits):
+                keys = [c for c, _ in cols if _is_key(c) and c not in hits]
+                selected[table] = keys + hits
+        for table in self._bridges(selected):
+            selected[table] = [c for c, _ in self.tables[table] if _is_key(c)]
+        return selected
+
+    def _bridges(self, selected: dict) -> list:
+        """
+        Unselected tables needed to join the selected ones, e.g. items between products and
+        order_facts / reviews: shortest paths over shared *_id keys, one component at a time.
+        """
+        columns = {t: {c for c, _ in cols} for t, cols in self.tables.items()}
+        linked = {t: [u for u in self.tables if u != t and _joinable(columns[t], columns[u])] for t in self.tables}
+        connected, pending, bridges = set(), list(selected), []
+        if pending:
+            connected.add(pending.pop(0))
+        while pending:
+            # breadth-first from everything connected so far to the nearest pending table
+            previous = {t: None for t in connected}
+            frontier, found = list(connected), None
+            while frontier and found is None:
+                following = []
+                for t in frontier:
+                    for u in linked[t]:
+                        if u not in previous:
+                            previous[u] = t
+                            if u in pending:
+                                found = u
+                                break
+                            # geo is a lookup, not a bridge: same zip prefix is not a relationship
+                            if any(c.endswith("_id") for c in columns[u]):
+                                following.append(u)
+                    if found:
+                        break
+                frontier = following
+            if found is None:
+                # no join path at all; the model gets the table on its own
+                connected.add(pending.pop(0))
+                continue
+            t = found
+            while t not in connected:
+                if t not in selected:
+                    bridges.append(t)
+                connected.add(t)
+                t = previous[t]
+            pending.remove(found)
+        return bridges
+
+    def _column_text(self, table: str, column: str, dtype: str, question: str) -> str:
+        text = column
+        if dtype.startswith(("TIMESTAMP", "DATE")):
+            text += f" ({dtype.lower()})"
+        values = self.values.get((table, column))
+        if values:
+            mentioned = self._mentioned(table, column, question)
+            shown = (mentioned + [v for v in values if v not in mentioned])[:MAX_EXAMPLE_VALUES]
+            more = ", …" if len(values) > len(shown) else ""
+            text += " [" + ", ".join(str(v) for v in shown) + more + "]"
+        return text
+
+    def describe(self, question: str) -> str:
+        selected = self.select(question)
+        if not selected:
+            # nothing recognisable: the order-level fact table answers most questions
+            default = "order_facts" if "order_facts" in self.tables else next(iter(self.tables))
+            selected = {default: [c for c, _ in self.tables[default]]}
+        desc = "Tables and the columns relevant to this question (other columns omitted):\n"
+        for table, columns in selected.items():
+            types = dict(self.tables[table])
+            desc += f"- {table}({', '.join(self._column_text(table, c, types[c], question) for c in columns)})\n"
+        others = sorted(set(self.tables) - set(selected))
+        if others:
+            desc += f"Other tables: {', '.join(others)}.\n"
+        desc += "Join on the *_id keys; geo.zip_prefix matches the *_zip_code_prefix columns.\n"
+        if "order_facts" in self.tables:
+            desc += "order_facts has one row per order: use it for revenue, order counts, delivery and review averages.\n"
+        if _words(question) & GEO_WORDS:
+            desc += ("Geo functions: haversine_km(lat1, lng1, lat2, lng2) returns km; "
+                     "zips_within_km(lat, lng, km) is a table function (zip_prefix, city, state, distance_km).\n")
+        return desc
@@ -0,0 +1,110 @@
+import difflib
+import re
+
+import duckdb
+
+# Local pre-validation of generated SQL. A single SELECT is bound with conn.sql() (the
+# binder resolves every table, column and function but nothing is executed). Unknown
+# identifiers are then fixed without another model call: DuckDB's own "Did you mean"
+# suggestion or candidate bindings when they are close, otherwise the closest name in
+# the catalog. Only identifier tokens are rewritten (never string literals), and at most
+# max_fixes rounds are tried.
+
+SUGGESTION = re.compile(r'with name "?([\w.]+)"? does not exist!\s*Did you mean "([^"]+)"\?', re.S)
+UNKNOWN_COLUMN = [
+    re.compile(r'Referenced column "([^"]+)" not found'),
+    re.compile(r'does not have a column named "([^"]+)"'),
+]
+UNKNOWN_TABLE = re.compile(r'Table with name (\w+) does not exist')
+CANDIDATES = re.compile(r'Candidate bindings:[\s:]*(.*?)(?:\n|$)')
+
+# Names closer than this (difflib ratio) count as a typo of a known identifier
+MATCH_CUTOFF = 0.75
+
+
+def catalog_names(conn) -> dict:
+    """{"tables": [...], "columns": [...]} visible in the main schema (internal rollups excluded)."""
+    rows = conn.execute(
+        "SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = 'main'"
+    ).fetchall()
+    rows = [(t, c) for t, c in rows if not t.startswith("rollup_")]
+    return {"tables": sorted({t for t, _ in rows}), "columns": sorted({c for _, c in rows})}
+
+
+def closest(name: str, candidates: list, cutoff: float = MATCH_CUTOFF):
+    lowered = {c.lower(): c for c in candidates}
+    match = difflib.get_close_matches(name.lower(), list(lowered), n=1, cutoff=cutoff)
+    return lowered[match[0]] if match else None
+
+
+def replace_identifier(sql_query: str, old: str, new: str) -> str:
+    """Replace identifier tokens spelled `old` (quoted or not, any case) with `new`."""
+    tokens = duckdb.tokenize(sql_query)
+    out, last = [], 0
+    for i, (offset, kind) in enumerate(tokens):
+        if kind != duckdb.token_type.identifier:
+            continue
+        end = tokens[i + 1][0] if i + 1 < len(tokens) else len(sql_query)
+        text = sql_query[offset:end].rstrip()
+        if text.strip('"').lower() == old.lower():
+            out.append(sql_query[last:offset])
+            out.append(f'"{new}"' if text.startswith('"') else new)
+            last = offset + len(text)
+    out.append(sql_query[last:])
+    return "".join(out)
+
+
+def _suggest(message: str, names: dict):
+    """(unknown identifier, replacement) for a binder/catalog error, or None."""
+    found = SUGGESTION.search(message)
+    if found and difflib.SequenceMatcher(None, found.group(1).lower(), found.group(2).lower()).ratio() >= 0.6:
+        return found.group(1).split(".")[-1], found.group(2).split(".")[-1]
+    table = UNKNOWN_TABLE.search(message)
+    if table:
+        fix = closest(table.group(1), names["tables"])
+        return (table.group(1), fix) if fix else None
+    for pattern in UNKNOWN_COLUMN:
+        column = pattern.search(message)
+        if column:
+            name = column.group(1).split(".")[-1]
+            bindings = CANDIDATES.search(message)
+            candidates = [c.split(".")[-1] for c in re.findall(r'"([^"]+)"', bindings.group(1))] if bindings else []
+            fix = closest(name, candidates) or closest(name, names["columns"])
+            return (name, fix) if fix else None
+    return None
+
+
+def check_sql(conn, sql_query: str, max_fixes: int = 3) -> dict:
+    """
+    Bind sql_query without running it and repair unknown identifiers.
+    Returns {"sql": possibly repaired SQL, "fixes": [(old, new), ...], "error": str | None};
+    anything other than a single SELECT is returned unchecked.
+    """
+    fixes, names = [], None
+    try:
+        statements = conn.extract_statements(sql_query)
+    except duckdb.Error as e:
+        return {"sql": sql_query, "fixes": fixes, "error": str(e)}
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        return {"sql": sql_query, "fixes": fixes, "error": None}
+
+    for _ in range(max_fixes + 1):
+        try:
+            conn.sql(sql_query)
+            return {"sql": sql_query, "fixes": fixes, "error": None}
+        except (duckdb.BinderException, duckdb.CatalogException) as e:
+            error = str(e)
+        except duckdb.Error as e:
+            return {"sql": sql_query, "fixes": fixes, "error": str(e)}
+        if len(fixes) >= max_fixes:
+            break
+        names = names or catalog_names(conn)
+        suggestion = _suggest(error, names)
+        if suggestion is None or suggestion in fixes or suggestion[0].lower() == suggestion[1].lower():
+            break
+        repaired = replace_identifier(sql_query, *suggestion)
+        if repaired == sql_query:
+            break
+        fixes.append(suggestion)
+        sql_query = repaired
+    return {"sql": sql_query, "fixes": fixes, "error": error}
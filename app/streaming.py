@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+import time
+
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+from data_loader import OLIST_FILES, source_fingerprint, load_olist_duckdb, load_star_schema, _sql_path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Streaming loader for exports larger than RAM. Each CSV is read block by block with an
+# explicit Arrow schema (no type sniffing, timestamps parsed once per block with a fixed
+# format) and spilled to Parquet partitions. DuckDB then builds `olist` and the star
+# tables from those partitions under a memory ceiling, spilling its joins to disk too.
+# Peak memory is therefore bounded by the block size and the DuckDB limit, not the file size.
+
+TIMESTAMP_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"]
+
+# Column types per file; columns not listed (e.g. extra columns in newer exports) are inferred
+STREAM_SCHEMAS = {
+    "orders": {
+        "order_id": pa.string(), "customer_id": pa.string(), "order_status": pa.string(),
+        "order_purchase_timestamp": pa.timestamp("s"), "order_approved_at": pa.timestamp("s"),
+        "order_delivered_carrier_date": pa.timestamp("s"), "order_delivered_customer_date": pa.timestamp("s"),
+        "order_estimated_delivery_date": pa.timestamp("s"),
+    },
+    "customers": {
+        "customer_id": pa.string(), "customer_unique_id": pa.string(), "customer_zip_code_prefix": pa.int64(),
+        "customer_city": pa.string(), "customer_state": pa.string(),
+    },
+    "items": {
+        "order_id": pa.string(), "order_item_id": pa.int64(), "product_id": pa.string(), "seller_id": pa.string(),
+        "shipping_limit_date": pa.timestamp("s"), "price": pa.float64(), "freight_value": pa.float64(),
+    },
+    "products": {
+        "product_id": pa.string(), "product_category_name": pa.string(),
+        "product_name_lenght": pa.int64(), "product_description_lenght": pa.int64(),
+        "product_photos_qty": pa.int64(), "product_weight_g": pa.float64(), "product_length_cm": pa.float64(),
+        "product_height_cm": pa.float64(), "product_width_cm": pa.float64(),
+    },
+    "payments": {
+        "order_id": pa.string(), "payment_sequential": pa.int64(), "payment_type": pa.string(),
+        "payment_installments": pa.int64(), "payment_value": pa.float64(),
+    },
+    "reviews": {
+        "review_id": pa.string(), "order_id": pa.string(), "review_score": pa.int64(),
+        "review_comment_title": pa.string(), "review_comment_message": pa.string(),
+        "review_creation_date": pa.timestamp("s"), "review_answer_timestamp": pa.timestamp("s"),
+    },
+    "sellers": {
+        "seller_id": pa.string(), "seller_zip_code_prefix": pa.int64(),
+        "seller_city": pa.string(), "seller_state": pa.string(),
+    },
+    "geolocs": {
+        "geolocation_zip_code_prefix": pa.int64(), "geolocation_lat": pa.float64(),
+        "geolocation_lng": pa.float64(), "geolocation_city": pa.string(), "geolocation_state": pa.string(),
+    },
+    "translation": {"product_category_name": pa.string(), "product_category_name_english": pa.string()},
+}
+
+# Review comments contain quoted line breaks; that parser mode is slower, so it is opt-in per file
+MULTILINE_FILES = {"reviews"}
+
+MANIFEST_FILE = "stream.manifest.json"
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (None where `resource` is unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def stream_csv(path: str, out_dir: str, schema: dict, block_mb: int = 16, rows_per_file: int = 1_000_000,
+               multiline: bool = False) -> dict:
+    """
+    Read one CSV in blocks of block_mb and write Parquet partitions of about rows_per_file
+    rows into out_dir. Only one block plus one row group is held in memory.
+    Returns {"rows", "seconds", "files", "peak_arrow_mb"}.
+    """
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    reader = pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(block_size=block_mb << 20),
+        parse_options=pv.ParseOptions(newlines_in_values=multiline),
+        convert_options=pv.ConvertOptions(column_types=schema, timestamp_parsers=TIMESTAMP_FORMATS,
+                                          strings_can_be_null=True),
+    )
+    rows, files, writer, in_file, peak_arrow = 0, 0, None, 0, 0
+    try:
+        for batch in reader:
+            if writer is None or in_file >= rows_per_file:
+                if writer is not None:
+                    writer.close()
+                writer = pq.ParquetWriter(os.path.join(out_dir, f"part-{files:05d}.parquet"),
+                                          reader.schema, compression="zstd")
+                files, in_file = files + 1, 0
+            writer.write_batch(batch)
+            rows += batch.num_rows
+            in_file += batch.num_rows
+            peak_arrow = max(peak_arrow, pa.total_allocated_bytes())
+    finally:
+        if writer is not None:
+            writer.close()
+    return {"rows": rows, "seconds": time.perf_counter() - start, "files": files,
+            "peak_arrow_mb": peak_arrow / (1024 * 1024)}
+
+
+def stage_olist(data_path: str, spill_dir: str, block_mb: int = 16, rows_per_file: int = 1_000_000) -> dict:
+    """
+    Stream every Olist CSV in data_path into spill_dir/<key>/part-*.parquet. Partitions
+    are reused while the source files' sizes/mtimes (source_fingerprint) are unchanged.
+    Returns {key: read_parquet(...) relation} for the files that exist.
+    """
+    fingerprint = source_fingerprint(data_path)
+    manifest = os.path.join(spill_dir, MANIFEST_FILE)
+    try:
+        with open(manifest, "r", encoding="utf-8") as f:
+            reuse = json.load(f) == fingerprint
+    except (OSError, ValueError):
+        reuse = False
+
+    sources, total_rows, total_seconds = {}, 0, 0.0
+    for key, name in OLIST_FILES.items():
+        path = os.path.join(data_path, name)
+        if not os.path.exists(path):
+            continue
+        out_dir = os.path.join(spill_dir, key)
+        if not reuse:
+            shutil.rmtree(out_dir, ignore_errors=True)
+            stats = stream_csv(path, out_dir, STREAM_SCHEMAS.get(key, {}), block_mb, rows_per_file,
+                               multiline=key in MULTILINE_FILES)
+            total_rows += stats["rows"]
+            total_seconds += stats["seconds"]
+            print(f"🌊 {name}: {stats['rows']:,} rows in {stats['seconds']:.2f}s "
+                  f"({stats['rows'] / max(stats['seconds'], 1e-9):,.0f} rows/s, {stats['files']} partition(s), "
+                  f"peak Arrow {stats['peak_arrow_mb']:.0f} MB)")
+        sources[key] = f"read_parquet('{_sql_path(os.path.join(out_dir, '*.parquet'))}')"
+
+    if reuse:
+        print(f"⚡ Reusing staged partitions in {spill_dir}")
+    else:
+        with open(manifest, "w", encoding="utf-8") as f:
+            json.dump(fingerprint, f)
+        print(f"🌊 Staged {total_rows:,} rows in {total_seconds:.2f}s "
+              f"({total_rows / max(total_seconds, 1e-9):,.0f} rows/s)")
+    return sources
+
+
+def load_olist_streaming(conn, data_path: str, spill_dir: str, memory_limit: str = "1GB",
+                         block_mb: int = 16, restore_memory_limit: str = None) -> bool:
+    """
+    Streaming counterpart of load_olist_duckdb + load_star_schema: stage the CSVs as
+    Parquet partitions, then build `olist` and the star tables with DuckDB capped at
+    memory_limit and spilling to spill_dir/duckdb_tmp. Prints rows/s and peak RSS.
+    """
+    start = time.perf_counter()
+    sources = stage_olist(data_path, spill_dir, block_mb)
+    conn.execute(f"SET temp_directory = '{_sql_path(os.path.join(spill_dir, 'duckdb_tmp'))}'")
+    conn.execute(f"SET memory_limit = '{memory_limit}'")
+    # ordered inserts keep every row buffered until its predecessors are written
+    conn.execute("SET preserve_insertion_order = false")
+    try:
+        if not load_olist_duckdb(conn, data_path, sources=sources):
+            return False
+        load_star_schema(conn, data_path, sources=sources)
+    finally:
+        conn.execute("RESET preserve_insertion_order")
+        if restore_memory_limit:
+            conn.execute(f"SET memory_limit = '{restore_memory_limit}'")
+        else:
+            conn.execute("RESET memory_limit")
+
+    n_rows = conn.execute("SELECT count(*) FROM olist").fetchone()[0]
+    seconds = time.perf_counter() - start
+    peak = peak_rss_mb()
+    print(f"📊 Streaming load: {n_rows:,} olist rows in {seconds:.2f}s ({n_rows / max(seconds, 1e-9):,.0f} rows/s)"
+          + (f", peak RSS {peak:,.0f} MB" if peak is not None else ""))
+    return True
@@ -0,0 +1,44 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Wall-clock timings per named stage, e.g. for the startup breakdown. Safe to use from
+    worker threads; stages that ran concurrently overlap, so the report also shows the
+    elapsed time since the timer was created.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stages = []
+        self._start = self._last = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, label: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._last = time.perf_counter()
+                self.stages.append((label, self._last - start))
+
+    def lap(self, label: str):
+        """Record the time since the previous stage or lap ended as `label`."""
+        with self._lock:
+            now = time.perf_counter()
+            self.stages.append((label, now - self._last))
+            self._last = now
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def report(self) -> str:
+        elapsed = self.elapsed()
+        lines = [f"⏱️ {self.name}: {elapsed:.2f}s"]
+        for label, seconds in self.stages:
+            lines.append(f"   {label:<28} {seconds:7.2f}s  {100 * seconds / max(elapsed, 1e-9):5.1f}%")
+        return "\n".join(lines)
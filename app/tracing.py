@@ -0,0 +1,249 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import TRACE_EXPORT, TRACE_JSONL_PATH, METRICS_PORT
+
+# Per-stage tracing for the question → answer pipeline. Every stage (ask, intent,
+# translate, generate_sql, execute, duckdb, fix_sql, summarize, chart…) runs in a span
+# with its duration and attributes such as token counts, rows, cache hits and retries.
+# The active span lives in a contextvar, so nested stages find their parent in threads
+# and asyncio tasks alike. Finished spans go to the exporters: JSON lines and/or a
+# Prometheus registry that serves /metrics. Anything with an export(span) method can
+# be plugged in. Exporter errors are swallowed: tracing must never break an answer.
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, tracer, name: str, trace_id: str, parent_id: str = None, attrs: dict = None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attrs = dict(attrs or {})
+        self.start = time.time()
+        self.duration_ms = None
+        self.status = "ok"
+        self.error = None
+        self._t0 = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key: str, n=1):
+        self.attrs[key] = self.attrs.get(key, 0) + n
+
+    def fail(self, message):
+        """Mark the span as failed without an exception (the pipeline returns errors as strings)."""
+        self.status = "error"
+        self.error = str(message)[:500]
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000
+
+    def end(self, error: BaseException = None):
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = self.elapsed_ms()
+        if error is not None:
+            self.fail(f"{type(error).__name__}: {error}")
+        self.tracer._finish(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "start": self.start, "duration_ms": round(self.duration_ms or 0.0, 3),
+            "status": self.status, "error": self.error, "attrs": self.attrs,
+        }
+
+
+class Tracer:
+    def __init__(self, exporters: list = None):
+        self.exporters = list(exporters or [])
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def start_span(self, name: str, parent: Span = None, **attrs) -> Span:
+        """
+        Open a span without making it current: for work that outlives the caller's
+        block, e.g. a streamed summary. Call span.end() when it finishes.
+        """
+        parent = parent or _current.get()
+        trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        return Span(self, name, trace_id, parent.span_id if parent is not None else None, attrs)
+
+    @contextmanager
+    def span(self, name: str, parent: Span = None, **attrs):
+        span = self.start_span(name, parent, **attrs)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        finally:
+            _current.reset(token)
+            span.end()
+
+    def _finish(self, span: Span):
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                print(f"⚠️ Trace export failed ({type(exporter).__name__}): {e}")
+
+
+def count(key: str, n=1):
+    """Add n to an attribute of the current span, if any (e.g. retries)."""
+    span = _current.get()
+    if span is not None:
+        span.add(key, n)
+
+
+def record_usage(span: Span, response):
+    """Copy token counts from a Gemini response's usage_metadata onto the span."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for attr, key in (("prompt_token_count", "prompt_tokens"), ("candidates_token_count", "output_tokens")):
+        value = getattr(usage, attr, None)
+        if value:
+            span.set(**{key: int(value)})
+
+
+# ------------------------ EXPORTERS ------------------------
+class JsonlExporter:
+    """Append one JSON object per finished span to `path`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{str(v).replace(chr(34), "")}"' for k, v in sorted(labels.items())) + "}"
+
+
+class PrometheusMetrics:
+    """
+    Aggregates finished spans into Prometheus counters and a duration histogram per
+    stage; render() is the text exposition format and serve() exposes it on /metrics.
+    Attributes named <cache>_cache_hit count as cache lookups.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self, prefix: str = "genai"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {}    # (metric, labels) -> value
+        self._histograms = {}  # stage -> [bucket counts..., +Inf count, sum]
+
+    def _inc(self, metric: str, labels: str, value=1):
+        self._counters[(metric, labels)] = self._counters.get((metric, labels), 0) + value
+
+    def export(self, span: Span):
+        stage, seconds = span.name, (span.duration_ms or 0.0) / 1000
+        with self._lock:
+            hist = self._histograms.setdefault(stage, [0] * (len(self.BUCKETS) + 2))
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += 1
+            hist[-1] += seconds
+            self._inc("stage_total", _labels(stage=stage, status=span.status))
+            for key, kind in (("prompt_tokens", "prompt"), ("output_tokens", "output")):
+                if span.attrs.get(key):
+                    self._inc("tokens_total", _labels(stage=stage, kind=kind), span.attrs[key])
+            if span.attrs.get("rows") is not None:
+                self._inc("rows_returned_total", _labels(stage=stage), span.attrs["rows"])
+            if span.attrs.get("retries"):
+                self._inc("retries_total", _labels(stage=stage), span.attrs["retries"])
+            for key, value in span.attrs.items():
+                if key.endswith("_cache_hit"):
+                    self._inc("cache_lookups_total",
+                              _labels(stage=stage, cache=key[:-len("_cache_hit")], result="hit" if value else "miss"))
+
+    def render(self) -> str:
+        p = self.prefix
+        with self._lock:
+            lines = [f"# TYPE {p}_stage_duration_seconds histogram"]
+            for stage, hist in sorted(self._histograms.items()):
+                for bound, n in zip(self.BUCKETS, hist):
+                    lines.append(f"{p}_stage_duration_seconds_bucket{_labels(stage=stage, le=bound)} {n}")
+                lines.append(f"{p}_stage_duration_seconds_bucket{_labels(stage=stage, le='+Inf')} {hist[-2]}")
+                lines.append(f"{p}_stage_duration_seconds_count{_labels(stage=stage)} {hist[-2]}")
+                lines.append(f"{p}_stage_duration_seconds_sum{_labels(stage=stage)} {hist[-1]:.6f}")
+            typed = set()
+            for (metric, labels), value in sorted(self._counters.items()):
+                if metric not in typed:
+                    lines.append(f"# TYPE {p}_{metric} counter")
+                    typed.add(metric)
+                lines.append(f"{p}_{metric}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "0.0.0.0"):
+        """Serve render() on http://host:port/metrics from a daemon thread; returns the server."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+
+# ------------------------ PROCESS-WIDE TRACER ------------------------
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """
+    The process-wide tracer, configured from TRACE_EXPORT ("jsonl", "prometheus" or
+    both, comma-separated). Without exporters spans are timed and dropped.
+    """
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+            targets = {t.strip() for t in TRACE_EXPORT.split(",") if t.strip()}
+            if "jsonl" in targets:
+                _tracer.add_exporter(JsonlExporter(TRACE_JSONL_PATH))
+                print(f"🧵 Writing trace spans to {TRACE_JSONL_PATH}")
+            if "prometheus" in targets:
+                metrics = PrometheusMetrics()
+                _tracer.add_exporter(metrics)
+                try:
+                    metrics.serve(METRICS_PORT)
+                    print(f"📈 Prometheus metrics on :{METRICS_PORT}/metrics")
+                except OSError as e:
+                    print(f"⚠️ Metrics endpoint not started on :{METRICS_PORT}: {e}")
+        return _tracer
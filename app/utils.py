@@ -12,3 +12,11 @@ def clean_sql(sql: str) -> str:
     if sql.endswith(";"):
         sql = sql[:-1]
     return sql.strip()
+
+
+def clean_json(text: str) -> str:
+    """Strips markdown fences around model-generated JSON."""
+    if not isinstance(text, str):
+        return ""
+    text = text.strip().replace("```json", "").replace("```", "")
+    return text.strip()
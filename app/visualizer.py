@@ -1,88 +1,125 @@
 # app/visualizer.py
 import plotly.express as px
-import pandas as pd
+import pyarrow as pa
 import streamlit as st
-import hashlib
+import importlib.util
+import uuid
+from results import csv_bytes, csv_file, first_values, is_truncated
+from config import QUERY_MAX_EXPORT_ROWS
+from chart_rules import recommend_chart
 
 
-def export_pdf_simple(df: pd.DataFrame, filename: str = "analysis_report.pdf"):
-    """Export simple PDF summary of DataFrame using fpdf."""
-    try:
-        from fpdf import FPDF
-    except Exception:
-        return False, "fpdf not installed"
+def pdf_bytes(table: pa.Table) -> bytes:
+    """Simple PDF summary of a result table, built in memory with fpdf."""
+    from fpdf import FPDF
     pdf = FPDF()
     pdf.add_page()
     pdf.set_font("Arial", size=12)
     pdf.cell(200, 10, txt="E-Commerce Analysis Report", ln=True, align="C")
     pdf.ln(4)
-    for col in df.columns[:8]:
-        pdf.cell(0, 6, txt=f"{col}: {', '.join(map(str, df[col].dropna().astype(str).head(3)))}", ln=True)
-    pdf.output(filename)
-    return True, filename
+    for col in table.column_names[:8]:
+        pdf.cell(0, 6, txt=f"{col}: {', '.join(map(str, first_values(table, col, 3)))}", ln=True)
+    out = pdf.output(dest="S")
+    return out.encode("latin-1") if isinstance(out, str) else bytes(out)
+
+
+def build_figure(spec: dict):
+    """Plotly figure for a chart_rules.recommend_chart spec (None when nothing fits)."""
+    chart_type, data, x, y, title = spec["type"], spec["table"], spec["x"], spec["y"], spec["title"]
+    try:
+        if chart_type == "bar":
+            return px.bar(data, x=x, y=y, title=title)
+        elif chart_type == "line":
+            return px.line(data, x=x, y=y, title=title, markers=data.num_rows <= 60)
+        elif chart_type == "pie":
+            return px.pie(data, names=x, values=y, title=title)
+        elif chart_type == "scatter":
+            return px.scatter(data, x=x, y=y, title=title)
+        elif chart_type == "histogram":
+            return px.histogram(data, x=x, title=title)
+    except Exception:
+        pass
+    return None
+
+
+def prepare_visual(user_query: str, table: pa.Table) -> dict:
+    """
+    The chart type (local rules, see chart_rules.py) and the Plotly figure, computed
+    once and stored with the chat message.
+    Export bytes are added lazily by render_visual on the first download.
+    """
+    if table is None or table.num_rows == 0:
+        return {"chart_type": None, "figure": None, "key": uuid.uuid4().hex[:8]}
+    spec = recommend_chart(table, user_query)
+    return {"chart_type": spec["type"], "figure": build_figure(spec), "key": uuid.uuid4().hex[:8]}
 
 
-def visualize_result(user_query: str, df: pd.DataFrame):
-    """Display result tables, charts, and unique download buttons."""
-    if df is None or df.empty:
+def _lazy_export(visual: dict, name: str, build, keep: bool = True):
+    """Download-button callable that builds the export on first click and (if keep) keeps the bytes."""
+    def export():
+        if name in visual:
+            return visual[name]
+        data = build()
+        if keep:
+            visual[name] = data
+        return data
+    return export
+
+
+def render_visual(visual: dict, table: pa.Table, full_export=None, load=None):
+    """
+    Display a result from its stored visual state — no model calls, no figure rebuilds,
+    no exports until a download is requested. full_export, if given, returns
+    RecordBatches of the result past the display cap (see QueryExecutor.iter_batches).
+    load, if given, returns the full result for the exports when `table` only holds the
+    first rows of one moved out of memory (see history.py); those exports are rebuilt
+    per click rather than kept in memory.
+    """
+    if table is None or table.num_rows == 0:
         st.warning("⚠️ No data found for this query.")
         return
 
-    # Generate a unique hash for widget keys
-    unique_key = hashlib.md5(user_query.encode()).hexdigest()[:8]
+    unique_key = visual["key"]
+
+    def export_table():
+        full = load() if load is not None else None
+        return full if full is not None else table
 
     # --- Display Data Table ---
-    st.dataframe(df.head(100), use_container_width=True)
+    st.dataframe(table.slice(0, 100), use_container_width=True)
 
-    # --- Automatic Chart Suggestion ---
-    try:
-        from google.generativeai import GenerativeModel
-        model = GenerativeModel("gemini-2.0-flash")
-        chart_prompt = f"""
-Based on this query and these columns, suggest the best chart type:
-(bar, line, pie, scatter, histogram, or none)
-Query: {user_query}
-Columns: {list(df.columns)}
-"""
-        chart_type = model.generate_content(chart_prompt).text.lower().strip()
-    except Exception:
-        chart_type = "bar"
-
-    if df.shape[1] >= 2:
-        x, y = df.columns[0], df.columns[1]
-        try:
-            if "bar" in chart_type:
-                fig = px.bar(df, x=x, y=y, title=f"{y} by {x}")
-            elif "line" in chart_type:
-                fig = px.line(df, x=x, y=y, title=f"{y} trend")
-            elif "pie" in chart_type:
-                fig = px.pie(df, names=x, values=y, title=f"{y} share by {x}")
-            elif "scatter" in chart_type:
-                fig = px.scatter(df, x=x, y=y, title=f"{y} vs {x}")
-            else:
-                fig = None
-            if fig is not None:
-                st.plotly_chart(fig, use_container_width=True, key=f"chart_{unique_key}")
-        except Exception:
-            pass
-
-    # --- Downloads ---
-    csv = df.to_csv(index=False).encode("utf-8")
+    # --- Chart ---
+    if visual.get("figure") is not None:
+        st.plotly_chart(visual["figure"], use_container_width=True, key=f"chart_{unique_key}")
+
+    # --- Downloads (built on click) ---
     st.download_button(
         "📥 Download CSV",
-        data=csv,
+        data=_lazy_export(visual, "csv", lambda: csv_bytes(export_table()), keep=load is None),
         file_name=f"analysis_result_{unique_key}.csv",
         mime="text/csv",
         key=f"csv_{unique_key}"
     )
+    if full_export is not None and is_truncated(table):
+        # streamed batch by batch from DuckDB into a temp file only when clicked
+        st.download_button(
+            f"📥 Download full CSV (up to {QUERY_MAX_EXPORT_ROWS:,} rows)",
+            data=lambda: csv_file(full_export()),
+            file_name=f"analysis_result_{unique_key}_full.csv",
+            mime="text/csv",
+            key=f"csv_full_{unique_key}"
+        )
+
+    if importlib.util.find_spec("fpdf") is not None:
+        st.download_button(
+            "📄 Download PDF",
+            data=_lazy_export(visual, "pdf", lambda: pdf_bytes(export_table()), keep=load is None),
+            file_name=f"analysis_report_{unique_key}.pdf",
+            mime="application/pdf",
+            key=f"pdf_{unique_key}"
+        )
+
 
-    ok, file = export_pdf_simple(df, filename=f"analysis_report_{unique_key}.pdf")
-    if ok:
-        with open(file, "rb") as f:
-            st.download_button(
-                "📄 Download PDF",
-                data=f,
-                file_name=file,
-                mime="application/pdf",
-                key=f"pdf_{unique_key}"
-            )
+def visualize_result(user_query: str, table: pa.Table, full_export=None):
+    """Display result tables, charts, and download buttons (prepare + render in one go)."""
+    render_visual(prepare_visual(user_query, table), table, full_export=full_export)
@@ -0,0 +1,90 @@
+"""
+Stand-in for google.generativeai.GenerativeModel: no network, configurable latency and
+canned answers chosen from the prompt. ChatBot only calls generate_content(prompt,
+stream=..., generation_config=...) and reads .text, so that is all this implements.
+"""
+import json
+import random
+import re
+import threading
+import time
+
+# question keyword -> SQL the "model" writes for it (first match wins)
+CANNED_SQL = [
+    ("state", "SELECT customer_state, SUM(total_order_value) AS revenue FROM order_facts "
+              "GROUP BY customer_state ORDER BY revenue DESC"),
+    ("month", "SELECT order_year, order_month, COUNT(*) AS orders, SUM(total_order_value) AS revenue "
+              "FROM order_facts GROUP BY 1, 2 ORDER BY 1, 2"),
+    ("category", "SELECT p.product_category_name_english AS category, SUM(i.price) AS revenue "
+                 "FROM items i JOIN products p USING (product_id) GROUP BY 1 ORDER BY 2 DESC LIMIT 15"),
+    ("distance", "SELECT round(distance_km / 100) * 100 AS distance_bucket_km, AVG(delivery_days) AS avg_delivery_days "
+                 "FROM order_facts WHERE distance_km IS NOT NULL GROUP BY 1 ORDER BY 1"),
+    ("seller", "SELECT s.seller_state, COUNT(DISTINCT i.seller_id) AS sellers, SUM(i.price) AS revenue "
+               "FROM items i JOIN sellers s USING (seller_id) GROUP BY 1 ORDER BY 3 DESC"),
+    ("review", "SELECT review_score, COUNT(*) AS orders, AVG(delivery_days) AS avg_delivery_days "
+               "FROM order_facts WHERE review_score IS NOT NULL GROUP BY 1 ORDER BY 1"),
+]
+DEFAULT_SQL = "SELECT main_payment_type, COUNT(*) AS orders FROM order_facts GROUP BY 1 ORDER BY 2 DESC"
+SUMMARY = ("São Paulo leads on revenue and order volume, followed by Rio de Janeiro and Minas Gerais. "
+           "Delivery times grow with distance, and late deliveries drive the low review scores. "
+           "Credit card remains the dominant payment type.")
+GLOSSARY = "Average order value (AOV) is total revenue divided by the number of orders."
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    latency / jitter are seconds per call (uniform jitter); stream_chunks is how many
+    pieces a streamed summary is split into, each arriving after latency / stream_chunks.
+    """
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.1, stream_chunks: int = 6, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self) -> float:
+        """Count the call and draw its latency."""
+        with self._lock:
+            self.calls += 1
+            return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    @staticmethod
+    def _question(prompt: str) -> str:
+        found = re.search(r'(?:User query[^:\n]*|Query):\s*"?(.*?)"?\s*$', prompt, re.MULTILINE)
+        return found.group(1) if found else prompt
+
+    def _answer(self, prompt: str) -> str:
+        if "Write a concise" in prompt:
+            return SUMMARY
+        if "analytics tutor" in prompt:
+            return GLOSSARY
+        if prompt.lstrip().startswith("Translate"):
+            return self._question(prompt)
+        question = self._question(prompt).lower()
+        sql = next((s for keyword, s in CANNED_SQL if keyword in question), DEFAULT_SQL)
+        if "Return only a JSON object" in prompt:
+            return json.dumps({"question_en": self._question(prompt), "sql": sql})
+        return sql
+
+    def generate_content(self, prompt: str, stream: bool = False, generation_config=None, **kwargs):
+        text = self._answer(prompt)
+        delay = self._delay()
+        if not stream:
+            time.sleep(delay)
+            return FakeResponse(text)
+        return self._stream(text, delay)
+
+    def _stream(self, text: str, delay: float):
+        words = text.split(" ")
+        step = max(1, len(words) // self.stream_chunks)
+        for i in range(0, len(words), step):
+            time.sleep(delay / self.stream_chunks)
+            yield FakeResponse(" ".join(words[i:i + step]) + " ")
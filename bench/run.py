@@ -0,0 +1,374 @@
+"""
+Benchmark / load test for the question → answer pipeline, offline: synthetic data
+(bench/synth.py) and a fake model (bench/fake_model.py) with configurable latency.
+
+Scenarios:
+  load       load_olist_data (pandas merge) and create_olist_pool (DuckDB + star schema + rollups)
+  query      QueryExecutor.run_query over a fixed SQL mix
+  ask        ChatBot.ask_async end to end on a shared Scheduler, as the app runs it: intent fast
+             path, LLM SQL path, glossary (fake model). Reported twice: ask:cold clears the
+             session's AnswerCache before every question, ask:warm shares one pre-filled cache
+  visualize  visualize_result (chart rules + Plotly figure; Streamlit calls are no-ops outside `streamlit run`)
+
+Each of query / ask / visualize runs once per --sessions value: N threads, each a
+session with its own ChatBot, sharing one pool. Reports p50/p95/p99 latency,
+throughput and peak RSS, and saves JSON under bench/results/ for --compare.
+
+    python bench/run.py --scale 1 --sessions 1,4,16
+    python bench/run.py --scale 10 --scenarios query,ask --compare bench/results/<previous>.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+
+import duckdb  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from cache import AnswerCache  # noqa: E402
+from chatbot import ChatBot  # noqa: E402
+from config import LLM_BURST, LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES, DB_WORKERS  # noqa: E402
+from data_loader import load_olist_data  # noqa: E402
+from db_pool import create_olist_pool  # noqa: E402
+from query_executor import QueryExecutor  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+from streaming import peak_rss_mb  # noqa: E402
+from fake_model import FakeGenerativeModel, CANNED_SQL  # noqa: E402
+from synth import generate  # noqa: E402
+from visualizer import visualize_result  # noqa: E402
+
+SCENARIOS = ["load", "query", "ask", "visualize"]
+
+# Rollup-eligible aggregates, star-schema joins and raw olist scans
+BENCH_SQL = [sql for _, sql in CANNED_SQL] + [
+    "SELECT customer_state, AVG(review_score) AS avg_review FROM olist GROUP BY customer_state",
+    "SELECT product_category_name_english, SUM(price) AS revenue FROM olist GROUP BY 1 ORDER BY 2 DESC LIMIT 10",
+    "SELECT order_status, COUNT(DISTINCT order_id) AS orders FROM olist GROUP BY 1",
+    "SELECT * FROM order_facts WHERE delivery_days > 20 ORDER BY delivery_days DESC LIMIT 200",
+]
+
+# Fast-path intents (no model call), LLM questions (SQL + summary calls) and one glossary lookup
+BENCH_QUESTIONS = [
+    "revenue by customer state",
+    "average delivery days per month",
+    "top 5 categories by revenue in 2018",
+    "average review score by payment type",
+    "How do sales compare between sellers in each region?",
+    "Which states bring in the most money?",
+    "Is there a link between distance and delivery speed?",
+    "How are reviews spread out across orders?",
+    "What is average order value?",
+]
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+class MemorySampler:
+    """Background thread sampling RSS every `interval` s; peak_mb covers the sampled window."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.start_mb = self._rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _rss_mb():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except (OSError, ValueError, AttributeError):
+            # no procfs: fall back to the process-wide high-water mark
+            return peak_rss_mb() or 0.0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, self._rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_mb = self.start_mb
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, self._rss_mb())
+
+
+def summarize(name: str, sessions: int, latencies: list, wall: float, errors: int, memory: MemorySampler) -> dict:
+    ms = np.asarray(latencies) * 1000
+    return {
+        "scenario": name, "sessions": sessions, "ops": len(latencies), "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_ops_s": round(len(latencies) / max(wall, 1e-9), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2) if len(ms) else None,
+        "p95_ms": round(float(np.percentile(ms, 95)), 2) if len(ms) else None,
+        "p99_ms": round(float(np.percentile(ms, 99)), 2) if len(ms) else None,
+        "mean_ms": round(float(ms.mean()), 2) if len(ms) else None,
+        "max_ms": round(float(ms.max()), 2) if len(ms) else None,
+        "peak_rss_mb": round(memory.peak_mb, 1),
+        "rss_delta_mb": round(memory.peak_mb - memory.start_mb, 1),
+    }
+
+
+def run_sessions(make_session, work: list, sessions: int, iterations: int, quiet: bool = True):
+    """
+    Start `sessions` threads; each builds its session with make_session() and runs
+    op(session, item) for `iterations` items, cycling through `work` from its own offset.
+    An op fails if it raises or returns False. Returns (latencies, wall seconds, errors).
+    """
+    latencies, errors, lock = [], [0], threading.Lock()
+    barrier = threading.Barrier(sessions + 1)
+
+    def worker(index):
+        session = make_session()
+        done = []
+        barrier.wait()
+        for i in range(iterations):
+            op, item = work[(index + i) % len(work)]
+            start = time.perf_counter()
+            try:
+                ok = op(session, item) is not False
+            except Exception:
+                ok = False
+            done.append(time.perf_counter() - start)
+            if not ok:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(done)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(sessions)]
+    # the app prints every SQL statement; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        for t in threads:
+            t.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+    return latencies, wall, errors[0]
+
+
+def bench_load(data_path: str, repeats: int, quiet: bool) -> list:
+    results = []
+    for name, fn in [
+        ("load:load_olist_data", lambda: load_olist_data(data_path)),
+        ("load:create_olist_pool", lambda: create_olist_pool(data_path, loader_mode="duckdb")),
+    ]:
+        latencies = []
+        with MemorySampler() as memory:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+                    out = fn()
+                latencies.append(time.perf_counter() - t0)
+                del out
+            wall = time.perf_counter() - start
+        results.append(summarize(name, 1, latencies, wall, 0, memory))
+    return results
+
+
+def _query_op(executor, sql):
+    return not isinstance(executor.run_query(sql), str)
+
+
+def _ask_op(session, question):
+    bot, scheduler, cold = session
+    if cold:
+        bot.cache.clear()
+    response = scheduler.run(bot.ask_async(question, stream=True))
+    if response.get("stream") is not None:
+        response["answer"] += "".join(scheduler.iterate(response["stream"]))
+    return not str(response.get("answer", "")).startswith(("❌", "⚠️"))
+
+
+def _visualize_op(_, item):
+    question, table = item
+    visualize_result(question, table)
+
+
+def _make_bot(pool, scheduler, cache, args):
+    bot = ChatBot(api_key="bench", model_name="fake", executor=QueryExecutor(pool=pool), cache=cache,
+                  fused=not args.no_fused, fast_path=not args.no_fast_path, scheduler=scheduler)
+    bot.model = FakeGenerativeModel(args.latency, args.jitter)
+    return bot
+
+
+def bench_ask(pool, scheduler, sessions: int, iterations: int, args) -> list:
+    """ask:cold (every question misses the cache) and ask:warm (one shared cache, already filled)."""
+    work = [(_ask_op, q) for q in BENCH_QUESTIONS]
+    results = []
+    with MemorySampler() as memory:
+        latencies, wall, errors = run_sessions(
+            lambda: (_make_bot(pool, scheduler, AnswerCache(), args), scheduler, True),
+            work, sessions, iterations, quiet=not args.verbose)
+    results.append(summarize("ask:cold", sessions, latencies, wall, errors, memory))
+
+    shared = AnswerCache()
+    with contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext():
+        warmer = (_make_bot(pool, scheduler, shared, args), scheduler, False)
+        for question in BENCH_QUESTIONS:
+            _ask_op(warmer, question)
+    with MemorySampler() as memory:
+        latencies, wall, errors = run_sessions(
+            lambda: (_make_bot(pool, scheduler, shared, args), scheduler, False),
+            work, sessions, iterations, quiet=not args.verbose)
+    results.append(summarize("ask:warm", sessions, latencies, wall, errors, memory))
+    return results
+
+
+def bench_scenario(name: str, pool, sessions: int, iterations: int, args) -> dict:
+    if name == "query":
+        make = lambda: QueryExecutor(pool=pool)  # noqa: E731
+        work = [(_query_op, sql) for sql in BENCH_SQL]
+    else:
+        executor = QueryExecutor(pool=pool)
+        with contextlib.redirect_stdout(io.StringIO()):
+            tables = [(sql, executor.run_query(sql)) for sql in BENCH_SQL]
+        make = lambda: None  # noqa: E731
+        work = [(_visualize_op, (sql, t)) for sql, t in tables if not isinstance(t, str)]
+    with MemorySampler() as memory:
+        latencies, wall, errors = run_sessions(make, work, sessions, iterations, quiet=not args.verbose)
+    return summarize(name, sessions, latencies, wall, errors, memory)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment(args, data_path: str) -> dict:
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+        "duckdb": duckdb.__version__, "pandas": pd.__version__,
+        "scale": args.scale, "data_path": data_path, "sessions": args.sessions, "iterations": args.iterations,
+        "latency": args.latency, "jitter": args.jitter, "rpm": args.rpm, "fused": not args.no_fused,
+        "fast_path": not args.no_fast_path,
+    }
+
+
+def print_table(results: list):
+    print(f"{'scenario':<24}{'sess':>5}{'ops':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'ops/s':>9}{'peak MB':>9}")
+    for r in results:
+        print(f"{r['scenario']:<24}{r['sessions']:>5}{r['ops']:>6}{r['errors']:>5}{r['p50_ms']:>10.1f}"
+              f"{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['throughput_ops_s']:>9.1f}{r['peak_rss_mb']:>9.0f}")
+
+
+def compare(results: list, previous_path: str):
+    """Print p50/p95/throughput changes against a saved run (matched by scenario and sessions)."""
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {(r["scenario"], r["sessions"]): r for r in json.load(f)["results"]}
+
+    def pct(new, old):
+        return f"{100 * (new - old) / old:+7.1f}%" if old else "    n/a"
+
+    print(f"\n📈 Compared with {previous_path}")
+    print(f"{'scenario':<24}{'sess':>5}{'p50':>10}{'p95':>10}{'ops/s':>10}{'peak MB':>10}")
+    for r in results:
+        old = previous.get((r["scenario"], r["sessions"]))
+        if old is None:
+            print(f"{r['scenario']:<24}{r['sessions']:>5}   (new)")
+            continue
+        print(f"{r['scenario']:<24}{r['sessions']:>5}{pct(r['p50_ms'], old['p50_ms']):>10}"
+              f"{pct(r['p95_ms'], old['p95_ms']):>10}{pct(r['throughput_ops_s'], old['throughput_ops_s']):>10}"
+              f"{pct(r['peak_rss_mb'], old['peak_rss_mb']):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1, help="synthetic data scale (1 ≈ 10k orders)")
+    parser.add_argument("--data", default=None, help="existing Olist CSV directory (skips generation)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--sessions", default="1,4,16", help="comma-separated concurrent session counts")
+    parser.add_argument("--iterations", type=int, default=20, help="operations per session")
+    parser.add_argument("--load-repeats", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake model seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--rpm", type=float, default=6000,
+                        help="Scheduler model requests per minute (the fake model has no quota; the app uses "
+                             "LLM_REQUESTS_PER_MINUTE)")
+    parser.add_argument("--no-fused", action="store_true",
+                        help="separate translate and SQL model calls (the app fuses them unless FUSED_PROMPTS=0)")
+    parser.add_argument("--no-fast-path", action="store_true", help="send every question to the model")
+    parser.add_argument("--out", default=RESULTS_DIR, help="directory for the JSON results")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", default=None, help="previous results JSON to diff against")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's own output")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    args.sessions = [int(s) for s in args.sessions.split(",")]
+
+    data_path = args.data or os.path.join(BENCH_DIR, "data", f"x{args.scale:g}")
+    if args.data is None and not os.path.exists(os.path.join(data_path, "olist_orders_dataset.csv")):
+        print(f"🧪 Generating synthetic data x{args.scale:g} in {data_path}")
+        generate(data_path, args.scale)
+
+    # Streamlit warns about a missing ScriptRunContext on every call from a worker thread
+    # (and resets its loggers' levels, so filter instead of raising the level)
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda record: "ScriptRunContext" not in record.getMessage())
+
+    results = []
+    if "load" in scenarios:
+        print(f"⏱️ load x{args.load_repeats}")
+        results += bench_load(data_path, args.load_repeats, quiet=not args.verbose)
+    rest = [s for s in scenarios if s != "load"]
+    if rest:
+        with contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext():
+            pool = create_olist_pool(data_path, loader_mode="duckdb")
+        # one process-wide scheduler, as in the app; burst / concurrency / retries from config.py
+        scheduler = Scheduler(args.rpm, LLM_BURST, LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES, db_workers=DB_WORKERS)
+        for name in rest:
+            for sessions in args.sessions:
+                print(f"⏱️ {name} with {sessions} session(s)")
+                if name == "ask":
+                    results += bench_ask(pool, scheduler, sessions, args.iterations, args)
+                else:
+                    results.append(bench_scenario(name, pool, sessions, args.iterations, args))
+        scheduler.shutdown()
+
+    print()
+    print_table(results)
+    report = {"env": environment(args, data_path), "results": results}
+    if not args.no_save:
+        os.makedirs(args.out, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(args.out, f"{stamp}_x{args.scale:g}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Saved {path}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
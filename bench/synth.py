@@ -0,0 +1,202 @@
+"""
+Synthetic Olist export for benchmarks: the nine CSVs with the real file names, columns,
+id format (32-char hex), timestamp format and rough null rates, sized by a scale factor.
+Scale 1 is ~10k orders; scale 10 is about the size of the public dataset (~100k orders);
+scale 100 is ~1M orders.
+
+    python bench/synth.py --scale 10 --out bench/data/x10
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from data_loader import OLIST_FILES  # noqa: E402
+
+BASE_ORDERS = 10_000
+STATES = ["SP", "RJ", "MG", "RS", "PR", "SC", "BA", "DF", "GO", "ES", "PE", "CE", "PA", "MT", "MA"]
+STATE_WEIGHTS = np.array([42, 13, 12, 6, 5, 4, 3.5, 2.2, 2, 2, 1.7, 1.3, 1, 1, 0.8])
+CITIES = ["sao paulo", "rio de janeiro", "belo horizonte", "porto alegre", "curitiba", "florianopolis",
+          "salvador", "brasilia", "goiania", "vitoria", "recife", "fortaleza", "belem", "cuiaba", "sao luis"]
+# rough state centroids, used to scatter geolocation points
+STATE_CENTERS = {
+    "SP": (-23.5, -46.6), "RJ": (-22.9, -43.2), "MG": (-19.9, -43.9), "RS": (-30.0, -51.2),
+    "PR": (-25.4, -49.3), "SC": (-27.6, -48.5), "BA": (-12.9, -38.5), "DF": (-15.8, -47.9),
+    "GO": (-16.7, -49.3), "ES": (-20.3, -40.3), "PE": (-8.1, -34.9), "CE": (-3.7, -38.5),
+    "PA": (-1.5, -48.5), "MT": (-15.6, -56.1), "MA": (-2.5, -44.3),
+}
+STATUSES = ["delivered", "shipped", "canceled", "invoiced", "processing", "unavailable"]
+STATUS_WEIGHTS = np.array([97, 1.1, 0.6, 0.4, 0.3, 0.6])
+PAYMENT_TYPES = ["credit_card", "boleto", "voucher", "debit_card"]
+PAYMENT_WEIGHTS = np.array([74, 19, 5.5, 1.5])
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+TRANSLATION_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data",
+                               "product_category_name_translation.csv")
+
+
+def _hex_ids(rng, n: int) -> np.ndarray:
+    raw = rng.bytes(16 * n).hex()
+    return np.array([raw[i:i + 32] for i in range(0, 32 * n, 32)])
+
+
+def _pick(rng, values, weights, n):
+    return np.asarray(values)[rng.choice(len(values), size=n, p=weights / weights.sum())]
+
+
+def _with_nulls(rng, values, rate: float):
+    s = pd.Series(values)
+    return s.mask(rng.random(len(s)) < rate)
+
+
+def _fmt(ts, mask=None) -> pd.Series:
+    s = pd.Series(ts.strftime(TS_FORMAT))
+    return s if mask is None else s.mask(np.asarray(mask))
+
+
+def _categories():
+    try:
+        t = pd.read_csv(TRANSLATION_CSV, encoding="utf-8-sig")
+        return t["product_category_name"].tolist(), t
+    except OSError:
+        names = [f"categoria_{i:02d}" for i in range(70)]
+        return names, pd.DataFrame({"product_category_name": names,
+                                    "product_category_name_english": [f"category_{i:02d}" for i in range(70)]})
+
+
+def generate(out_dir: str, scale: float = 1, seed: int = 0) -> dict:
+    """Write the nine Olist CSVs into out_dir; returns {file key: row count}."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    n_orders = max(100, int(BASE_ORDERS * scale))
+    n_products = max(50, n_orders // 3)
+    n_sellers = max(10, n_orders // 32)
+    n_zips = min(19_000, max(100, n_orders // 5))
+
+    # geography: zip prefixes with a home state, ~10 noisy points each (plus a few outliers)
+    zips = np.sort(rng.choice(np.arange(1000, 99999), size=n_zips, replace=False))
+    zip_state = _pick(rng, STATES, STATE_WEIGHTS, n_zips)
+    reps = rng.integers(3, 18, size=n_zips)
+    g_zip = np.repeat(zips, reps)
+    g_state = np.repeat(zip_state, reps)
+    centers = np.array([STATE_CENTERS[s] for s in g_state])
+    lat = centers[:, 0] + rng.normal(0, 0.6, len(g_zip))
+    lng = centers[:, 1] + rng.normal(0, 0.6, len(g_zip))
+    outliers = rng.random(len(g_zip)) < 0.0005
+    lat[outliers], lng[outliers] = 40.0, -8.0
+    city_of_state = dict(zip(STATES, CITIES))
+    geolocs = pd.DataFrame({
+        "geolocation_zip_code_prefix": g_zip, "geolocation_lat": lat.round(6), "geolocation_lng": lng.round(6),
+        "geolocation_city": [city_of_state[s] for s in g_state], "geolocation_state": g_state,
+    })
+
+    categories, translation = _categories()
+    product_ids = _hex_ids(rng, n_products)
+    products = pd.DataFrame({
+        "product_id": product_ids,
+        "product_category_name": _with_nulls(rng, rng.choice(categories, n_products), 0.018),
+        "product_name_lenght": _with_nulls(rng, rng.integers(5, 76, n_products), 0.018).astype("Int64"),
+        "product_description_lenght": _with_nulls(rng, rng.integers(4, 3993, n_products), 0.018).astype("Int64"),
+        "product_photos_qty": _with_nulls(rng, rng.integers(1, 11, n_products), 0.018).astype("Int64"),
+        "product_weight_g": rng.gamma(1.2, 1800, n_products).round(),
+        "product_length_cm": rng.integers(7, 105, n_products).astype(float),
+        "product_height_cm": rng.integers(2, 105, n_products).astype(float),
+        "product_width_cm": rng.integers(6, 118, n_products).astype(float),
+    })
+
+    seller_zip = rng.choice(len(zips), n_sellers)
+    sellers = pd.DataFrame({
+        "seller_id": _hex_ids(rng, n_sellers), "seller_zip_code_prefix": zips[seller_zip],
+        "seller_city": [city_of_state[s] for s in zip_state[seller_zip]], "seller_state": zip_state[seller_zip],
+    })
+
+    customer_zip = rng.choice(len(zips), n_orders)
+    customer_ids = _hex_ids(rng, n_orders)
+    # ~3% of customers come back: reuse an earlier unique id
+    unique_ids = _hex_ids(rng, n_orders)
+    repeat = rng.random(n_orders) < 0.03
+    unique_ids[repeat] = unique_ids[rng.integers(0, n_orders, repeat.sum())]
+    customers = pd.DataFrame({
+        "customer_id": customer_ids, "customer_unique_id": unique_ids,
+        "customer_zip_code_prefix": zips[customer_zip],
+        "customer_city": [city_of_state[s] for s in zip_state[customer_zip]], "customer_state": zip_state[customer_zip],
+    })
+
+    order_ids = _hex_ids(rng, n_orders)
+    start = pd.Timestamp("2016-09-04")
+    purchase = start + pd.to_timedelta(rng.integers(0, 730 * 86400, n_orders), unit="s")
+    approved = purchase + pd.to_timedelta(rng.integers(600, 86400, n_orders), unit="s")
+    carrier = approved + pd.to_timedelta(rng.integers(1, 6 * 86400, n_orders), unit="s")
+    delivered = carrier + pd.to_timedelta(rng.gamma(2.0, 4.5, n_orders) * 86400, unit="s").round("s")
+    estimated = purchase.normalize() + pd.to_timedelta(rng.integers(10, 45, n_orders), unit="D")
+    status = _pick(rng, STATUSES, STATUS_WEIGHTS, n_orders)
+    not_delivered = status != "delivered"
+    orders = pd.DataFrame({
+        "order_id": order_ids, "customer_id": customer_ids, "order_status": status,
+        "order_purchase_timestamp": _fmt(purchase), "order_approved_at": _fmt(approved, rng.random(n_orders) < 0.002),
+        "order_delivered_carrier_date": _fmt(carrier, not_delivered & (rng.random(n_orders) < 0.5)),
+        "order_delivered_customer_date": _fmt(delivered, not_delivered),
+        "order_estimated_delivery_date": _fmt(estimated),
+    })
+
+    # items: 1-4 per order (mostly 1); ~0.8% of orders have none
+    n_items = _pick(rng, [0, 1, 2, 3, 4], np.array([0.8, 88, 8, 2, 1.2]), n_orders)
+    item_order = np.repeat(np.arange(n_orders), n_items)
+    item_seq = np.concatenate([np.arange(1, k + 1) for k in n_items if k]) if len(item_order) else np.array([])
+    items = pd.DataFrame({
+        "order_id": order_ids[item_order], "order_item_id": item_seq,
+        "product_id": product_ids[rng.integers(0, n_products, len(item_order))],
+        "seller_id": sellers["seller_id"].to_numpy()[rng.integers(0, n_sellers, len(item_order))],
+        "shipping_limit_date": _fmt(purchase[item_order] + pd.Timedelta(days=6)),
+        "price": rng.lognormal(4.4, 0.9, len(item_order)).round(2),
+        "freight_value": rng.gamma(3.0, 6.7, len(item_order)).round(2),
+    })
+
+    # payments: mostly one per order, a few split into vouchers
+    n_pay = _pick(rng, [0, 1, 2, 3], np.array([0.01, 95.6, 3.5, 0.9]), n_orders)
+    pay_order = np.repeat(np.arange(n_orders), n_pay)
+    payments = pd.DataFrame({
+        "order_id": order_ids[pay_order],
+        "payment_sequential": np.concatenate([np.arange(1, k + 1) for k in n_pay if k]),
+        "payment_type": _pick(rng, PAYMENT_TYPES, PAYMENT_WEIGHTS, len(pay_order)),
+        "payment_installments": rng.integers(1, 11, len(pay_order)),
+        "payment_value": rng.lognormal(4.8, 0.85, len(pay_order)).round(2),
+    })
+
+    has_review = rng.random(n_orders) < 0.99
+    r_orders = np.flatnonzero(has_review)
+    answered = delivered[r_orders] + pd.Timedelta(days=1)
+    reviews = pd.DataFrame({
+        "review_id": _hex_ids(rng, len(r_orders)), "order_id": order_ids[r_orders],
+        "review_score": _pick(rng, [1, 2, 3, 4, 5], np.array([11.5, 3.2, 8.2, 19.3, 57.8]), len(r_orders)),
+        "review_comment_title": _with_nulls(rng, rng.choice(["recomendo", "otimo", "ruim", "bom"], len(r_orders)), 0.88),
+        "review_comment_message": _with_nulls(
+            rng, rng.choice(["chegou antes do prazo", "produto ok,\nentrega rapida", "nao recebi"], len(r_orders)), 0.59),
+        "review_creation_date": _fmt(answered.normalize()),
+        "review_answer_timestamp": _fmt(answered + pd.Timedelta(hours=20)),
+    })
+
+    frames = {
+        "orders": orders, "customers": customers, "items": items, "products": products, "payments": payments,
+        "reviews": reviews, "sellers": sellers, "geolocs": geolocs, "translation": translation,
+    }
+    for key, df in frames.items():
+        df.to_csv(os.path.join(out_dir, OLIST_FILES[key]), index=False)
+    return {key: len(df) for key, df in frames.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1, help="1 ≈ 10k orders, 10 ≈ Olist size, 100 ≈ 1M orders")
+    parser.add_argument("--out", default=None, help="output directory (default bench/data/x<scale>)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", f"x{args.scale:g}")
+    counts = generate(out, args.scale, args.seed)
+    print(f"✅ Synthetic Olist x{args.scale:g} in {out}: " + ", ".join(f"{k}={v:,}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
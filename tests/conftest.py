@@ -0,0 +1,7 @@
+import os
+import sys
+
+# app/ modules import each other flat (`from config import ...`), as under `streamlit run app/main.py`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+# bench/synth.py writes small synthetic Olist exports for the loader tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench"))
@@ -0,0 +1,50 @@
+import duckdb
+import pandas as pd
+import pytest
+
+from compact import compact_frame
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "order_id": ["a" * 32, "b" * 32, "a" * 32, "c" * 32],
+        "payment_type": ["boleto", "credit_card", "boleto", "boleto"],
+        "order_year": pd.Series([2017, 2018, 2018, 2016], dtype="int32"),
+        "review_score": [5.0, 4.0, None, 1.0],
+        "product_weight_g": [30000.0, 2.0, None, 40425.0],
+        "product_length_cm": [105.0, 16.0, 100.0, 100.0],
+        "product_height_cm": [105.0, 2.0, 100.0, 100.0],
+        "product_width_cm": [118.0, 11.0, 100.0, 100.0],
+        "price": [129.9, 10.0, None, 6735.0],
+    })
+
+
+def test_values_are_unchanged(frame):
+    compacted = compact_frame(frame)
+    assert isinstance(compacted["order_id"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(compacted.astype(object).where(compacted.notna(), None),
+                                  frame.astype(object).where(frame.notna(), None), check_dtype=False)
+
+
+def test_no_narrow_integers(frame):
+    compacted = compact_frame(frame)
+    for col in ("order_year", "review_score", "product_weight_g", "product_length_cm"):
+        assert compacted[col].dtype.itemsize == 8, col
+    assert compacted["price"].dtype == "float64"
+
+
+def test_arithmetic_in_duckdb_does_not_overflow(frame):
+    conn = duckdb.connect()
+    conn.register("df", compact_frame(frame))
+    conn.execute("CREATE TABLE olist AS SELECT * FROM df")
+    volume, weighted, year = conn.execute("""
+        SELECT max(product_length_cm * product_height_cm * product_width_cm),
+               sum(product_weight_g * review_score),
+               max(order_year * 1000)
+        FROM olist""").fetchone()
+    assert volume == 105 * 105 * 118
+    assert weighted == 30000 * 5 + 2 * 4 + 40425 * 1
+    assert year == 2018000
+    # categoricals become ENUMs that still filter against plain strings
+    assert conn.execute("SELECT count(*) FROM olist WHERE payment_type = 'boleto'").fetchone()[0] == 3
@@ -0,0 +1,58 @@
+import json
+import duckdb
+import pytest
+
+from db_pool import DuckDBPool, check_read_only
+from query_executor import QueryExecutor
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = DuckDBPool(max_cursors=2)
+    with pool.writer() as conn:
+        conn.execute("CREATE TABLE olist AS SELECT range AS order_item_id FROM range(10)")
+    (tmp_path / "secret.csv").write_text("a,b\n1,2\n")
+    pool.secret = str(tmp_path / "secret.csv")
+    pool.seal()
+    yield pool
+    pool.close()
+
+
+def test_sealed_pool_refuses_file_access(pool):
+    executor = QueryExecutor(pool=pool)
+    assert executor.run_query("SELECT count(*) AS n FROM olist").column("n")[0].as_py() == 10
+    for sql in (f"SELECT * FROM read_csv('{pool.secret}')", f"SELECT * FROM '{pool.secret}'",
+                "SELECT * FROM glob('/etc/*')"):
+        result = executor.run_query(sql)
+        assert isinstance(result, str) and "❌" in result, sql
+
+
+def test_sealed_pool_configuration_is_locked(pool):
+    with pool.cursor() as cur:
+        with pytest.raises(duckdb.Error):
+            cur.execute("SET enable_external_access = true")
+        with pytest.raises(duckdb.Error):
+            cur.execute("SET lock_configuration = false")
+
+
+def test_only_read_only_statements(pool):
+    with pool.cursor() as cur:
+        check_read_only(cur, "SELECT 1; EXPLAIN SELECT 2")
+        with pytest.raises(ValueError):
+            check_read_only(cur, "DROP TABLE olist")
+
+
+def test_slow_query_profile_comes_from_the_run_itself(tmp_path):
+    pool = DuckDBPool(max_cursors=2)
+    with pool.writer() as conn:
+        conn.execute("CREATE TABLE olist AS SELECT range AS order_item_id FROM range(1000)")
+    pool.seal(profiling=True)
+    executor = QueryExecutor(pool=pool)
+    executor.slow_query_ms = 1e-9
+    executor.profile_dir = str(tmp_path)
+    executor.run_query("SELECT sum(order_item_id) AS total FROM olist")
+    (path,) = tmp_path.glob("*.json")
+    saved = json.loads(path.read_text())
+    assert "sum(order_item_id)" in saved["profile"]["query_name"]
+    assert "EXPLAIN" not in saved["profile"]["query_name"]
+    pool.close()
@@ -0,0 +1,61 @@
+import duckdb
+import pytest
+
+from guardrails import fetch_limited, single_statement
+from query_executor import QueryExecutor
+from results import csv_file, is_truncated
+
+
+@pytest.fixture
+def executor():
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE olist AS SELECT range AS order_item_id FROM range(200000)")
+    executor = QueryExecutor(conn=conn, guarded=True)
+    executor.max_rows = 100
+    yield executor
+    conn.close()
+
+
+def test_single_statement_rejects_batches_and_explain_analyze():
+    conn = duckdb.connect()
+    assert single_statement(conn, "SELECT 1") == duckdb.StatementType.SELECT
+    assert single_statement(conn, "EXPLAIN SELECT 1") == duckdb.StatementType.EXPLAIN
+    for sql in ("SELECT 1; SELECT 2", "EXPLAIN ANALYZE SELECT 1", "EXPLAIN (ANALYZE, FORMAT JSON) SELECT 1",
+                "CREATE TABLE t AS SELECT 1"):
+        with pytest.raises(ValueError):
+            single_statement(conn, sql)
+
+
+def test_fetch_limited_stops_reading_at_the_limit():
+    conn = duckdb.connect()
+    table = fetch_limited(conn.execute("SELECT range AS n FROM range(1000000)"), 10, batch_size=1000)
+    assert table.num_rows == 10 and table.column_names == ["n"]
+    empty = fetch_limited(conn.execute("SELECT range AS n FROM range(0)"), 10)
+    assert empty.num_rows == 0 and empty.column_names == ["n"]
+
+
+def test_guarded_query_is_capped_and_flagged(executor):
+    result = executor.run_query("SELECT * FROM olist")
+    assert result.num_rows == 100 and is_truncated(result)
+    small = executor.run_query("SELECT * FROM olist LIMIT 5")
+    assert small.num_rows == 5 and not is_truncated(small)
+
+
+def test_guarded_query_refuses_multiple_statements(executor):
+    result = executor.run_query("SELECT 1; SELECT * FROM olist a, olist b")
+    assert isinstance(result, str) and "one statement" in result
+
+
+def test_export_is_limited_and_streamed_to_a_file(executor):
+    executor.max_export_rows = 1000
+    with csv_file(executor.iter_batches("SELECT * FROM olist", batch_size=256)) as f:
+        lines = f.read().decode().splitlines()
+    assert lines[0] == '"order_item_id"' and len(lines) == 1001
+
+
+def test_export_refuses_multiple_statements_and_costly_plans(executor):
+    with pytest.raises(ValueError):
+        list(executor.iter_batches("SELECT 1; SELECT * FROM olist"))
+    executor.max_estimated_rows = 1000
+    with pytest.raises(ValueError, match="Export rejected"):
+        list(executor.iter_batches("SELECT * FROM olist a, olist b"))
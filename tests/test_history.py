@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+
+import numpy as np
+import plotly.express as px
+import pyarrow as pa
+import pytest
+
+from history import ChatHistory, cleanup_expired
+
+ROWS = 20_000
+TABLE_MB = ROWS * 16 / 1024 / 1024  # two 8-byte columns
+
+
+def _table(seed: int) -> pa.Table:
+    return pa.table({"x": np.arange(ROWS, dtype=np.int64), "y": np.full(ROWS, float(seed))})
+
+
+def _message(seed: int, figure: bool = False) -> dict:
+    table = _table(seed)
+    visual = {"chart_type": "line" if figure else None, "key": str(seed),
+              "figure": px.line(table, x="x", y="y") if figure else None}
+    return {"role": "bot", "text": str(seed), "data": table, "question": f"q{seed}",
+            "sql": f"SELECT range AS x, {float(seed)} AS y FROM range({ROWS})", "visual": visual}
+
+
+@pytest.fixture
+def history(tmp_path):
+    return ChatHistory(str(tmp_path), budget_mb=2.5 * TABLE_MB, keep_rows=10)
+
+
+def test_least_recently_used_results_are_spilled(history):
+    first, second, third = (history.append(_message(i)) for i in range(3))
+    assert first["data"] is None and second["data"] is not None and third["data"] is not None
+    assert first["rows"] == ROWS and first["preview"].num_rows == 10
+    assert os.path.exists(first["spilled"])
+    assert history.resident_bytes() <= history.budget
+    # shown() falls back to the preview
+    assert history.shown(first) is first["preview"] and history.shown(second) is second["data"]
+
+
+def test_reload_makes_result_resident_and_evicts_the_oldest(history):
+    first, second, third = (history.append(_message(i)) for i in range(3))
+    reloaded = history.result(first)
+    assert reloaded.equals(_table(0))
+    assert first["data"] is reloaded and first["preview"] is None
+    assert second["data"] is None and third["data"] is not None
+
+
+def test_load_does_not_change_residency(history):
+    first, _, _ = (history.append(_message(i)) for i in range(3))
+    assert history.load(first).equals(_table(0))
+    assert first["data"] is None
+
+
+def test_without_spill_results_are_recomputed(tmp_path):
+    queries = []
+
+    def recompute(sql):
+        queries.append(sql)
+        return _table(0)
+
+    history = ChatHistory(str(tmp_path), budget_mb=1.5 * TABLE_MB, keep_rows=10, spill=False, recompute=recompute)
+    first = history.append(_message(0))
+    history.append(_message(1))
+    assert first["data"] is None and first["spilled"] is None
+    assert not os.listdir(tmp_path)
+    assert history.result(first).equals(_table(0))
+    assert queries == [first["sql"]]
+
+
+def test_small_results_are_never_spilled(history):
+    small = history.append({"role": "bot", "text": "", "data": _table(0).slice(0, 10).combine_chunks()})
+    for i in range(4):
+        history.append(_message(i))
+    assert small["data"] is not None
+
+
+def test_figures_count_against_the_budget_and_are_rebuilt(tmp_path):
+    rebuilt = []
+
+    def visualize(question, table):
+        rebuilt.append(question)
+        return px.line(table, x="x", y="y")
+
+    history = ChatHistory(str(tmp_path), budget_mb=2.5 * TABLE_MB, keep_rows=10, visualize=visualize)
+    first = history.append(_message(0, figure=True))
+    # table + figure copy of x/y no longer fit twice
+    second = history.append(_message(1, figure=True))
+    assert first["data"] is None and first["visual"]["figure"] is None
+    assert second["visual"]["figure"] is not None
+    history.result(first)
+    assert rebuilt == ["q0"] and first["visual"]["figure"] is not None
+    assert second["data"] is None and second["visual"]["figure"] is None
+
+
+def test_concurrent_loads_and_appends(history):
+    messages = [history.append(_message(i)) for i in range(4)]
+    errors = []
+
+    def reader():
+        try:
+            for _ in range(20):
+                for message in list(history):
+                    history.result(message)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for i in range(4, 10):
+        messages.append(history.append(_message(i)))
+    for t in threads:
+        t.join()
+    assert not errors
+    assert history.resident_bytes() <= history.budget
+    for i, message in enumerate(messages):
+        assert history.load(message).column("y")[0].as_py() == float(i)
+
+
+def test_clear_and_cleanup_remove_spilled_files(tmp_path, history):
+    for i in range(3):
+        history.append(_message(i))
+    assert os.path.isdir(history.dir)
+    history.clear()
+    assert not os.path.exists(history.dir) and len(history) == 0
+
+    stale, fresh = tmp_path / "stale", tmp_path / "fresh"
+    stale.mkdir()
+    fresh.mkdir()
+    old = time.time() - 3600
+    os.utime(stale, (old, old))
+    assert cleanup_expired(str(tmp_path), ttl=60) == 1
+    assert not stale.exists() and fresh.exists()
@@ -0,0 +1,63 @@
+import duckdb
+import pytest
+
+from rollups import RollupStore
+
+SPECS = {
+    "sales": {
+        "dims": ["year", "state", "payment_type"],
+        "measures": ["price", "score"],
+        "distinct": ["customer_id"],
+    },
+}
+
+QUERIES = [
+    "SELECT state, sum(price) AS revenue FROM sales GROUP BY state",
+    "SELECT year, state, count(*), avg(score) FROM sales GROUP BY 1, 2",
+    "SELECT payment_type, min(price), max(price) FROM sales WHERE year = 2018 GROUP BY payment_type",
+    "SELECT count(*) AS n, sum(price) FROM sales",
+    "SELECT state, count(DISTINCT customer_id) AS customers FROM sales GROUP BY state",
+    "SELECT s.state, avg(s.price) AS avg_price FROM sales s GROUP BY s.state HAVING avg_price > 40",
+]
+
+
+@pytest.fixture(scope="module")
+def conn():
+    conn = duckdb.connect()
+    conn.execute("""
+        CREATE TABLE sales AS
+        SELECT 2016 + i % 3 AS year,
+               ['SP', 'RJ', 'MG', NULL][1 + i % 4] AS state,
+               ['boleto', 'credit_card'][1 + i % 2] AS payment_type,
+               CASE WHEN i % 7 = 0 THEN NULL ELSE (i * 37 % 100)::DOUBLE + 0.5 END AS price,
+               1 + i % 5 AS score,
+               'c' || (i % 40) AS customer_id
+        FROM range(500) t(i)""")
+    return conn
+
+
+@pytest.fixture(scope="module")
+def store(conn):
+    return RollupStore.build(conn, SPECS)
+
+
+def _rows(result):
+    rows = [tuple(round(v, 6) if isinstance(v, float) else v for v in row) for row in result.fetchall()]
+    return [d[0] for d in result.description], sorted(rows, key=repr)
+
+
+@pytest.mark.parametrize("sql", QUERIES)
+def test_rewrite_is_equivalent(conn, store, sql):
+    rewritten = store.rewrite(conn, sql)
+    assert rewritten is not None and "rollup_sales" in rewritten
+    assert _rows(conn.execute(rewritten)) == _rows(conn.execute(sql))
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT state, price FROM sales",
+    "SELECT customer_id, sum(price) FROM sales GROUP BY customer_id",
+    "SELECT state, count(DISTINCT customer_id) FROM sales WHERE year = 2018 GROUP BY state",
+    "SELECT state, median(price) FROM sales GROUP BY state",
+])
+def test_ineligible_queries_are_left_alone(conn, store, sql):
+    assert store.rewrite(conn, sql) is None
@@ -0,0 +1,54 @@
+from schema_index import SchemaIndex
+
+TABLES = {
+    "order_facts": [("order_id", "VARCHAR"), ("customer_unique_id", "VARCHAR"), ("customer_state", "VARCHAR"),
+                    ("order_purchase_timestamp", "TIMESTAMP"), ("order_year", "BIGINT"),
+                    ("total_order_value", "DOUBLE"), ("main_payment_type", "VARCHAR"),
+                    ("delivery_days", "DOUBLE"), ("review_score", "BIGINT")],
+    "sellers": [("seller_id", "VARCHAR"), ("seller_zip_code_prefix", "BIGINT"), ("seller_state", "VARCHAR")],
+    "rollup_order_facts": [("customer_state", "VARCHAR"), ("_gid", "BIGINT")],
+}
+VALUES = {
+    ("order_facts", "main_payment_type"): ["credit_card", "boleto", "voucher", "debit_card"],
+    ("order_facts", "customer_state"): ["SP", "RJ", "MG"],
+}
+
+
+def test_selects_columns_by_name_and_known_value():
+    index = SchemaIndex(TABLES, VALUES)
+    selected = index.select("average delivery days for boleto payments")
+    assert set(selected) == {"order_facts"}
+    assert {"delivery_days", "main_payment_type", "order_id"} <= set(selected["order_facts"])
+    assert "review_score" not in selected["order_facts"]
+
+
+def test_temporal_questions_bring_date_columns():
+    selected = SchemaIndex(TABLES, VALUES).select("review score by year")
+    assert {"review_score", "order_year", "order_purchase_timestamp"} <= set(selected["order_facts"])
+
+
+def test_describe_hides_rollups_and_lists_other_tables():
+    text = SchemaIndex(TABLES, VALUES).describe("orders paid with boleto")
+    assert "rollup_" not in text
+    assert "main_payment_type [boleto, credit_card" in text
+    assert "Other tables: sellers." in text
+
+
+def test_bridge_tables_bring_their_join_keys():
+    tables = {
+        "products": [("product_id", "VARCHAR"), ("product_category_name", "VARCHAR")],
+        "items": [("order_id", "VARCHAR"), ("order_item_id", "BIGINT"), ("product_id", "VARCHAR"),
+                  ("seller_id", "VARCHAR"), ("price", "DOUBLE")],
+        "reviews": [("review_id", "VARCHAR"), ("order_id", "VARCHAR"), ("review_score", "BIGINT")],
+        "orders": [("order_id", "VARCHAR"), ("customer_id", "VARCHAR")],
+        "customers": [("customer_id", "VARCHAR"), ("customer_zip_code_prefix", "BIGINT")],
+        "sellers": [("seller_id", "VARCHAR"), ("seller_zip_code_prefix", "BIGINT")],
+        "geo": [("zip_prefix", "BIGINT"), ("lat", "DOUBLE")],
+    }
+    values = {("products", "product_category_name"): ["beleza_saude", "esporte_lazer"]}
+    selected = SchemaIndex(tables, values).select("average review score for beleza_saude")
+    assert set(selected) == {"products", "reviews", "items"}
+    assert selected["items"] == ["order_id", "order_item_id", "product_id", "seller_id"]
+    # customers reach sellers through orders and items, not through a shared zip prefix in geo
+    selected = SchemaIndex(tables).select("customer_zip_code_prefix vs seller_zip_code_prefix")
+    assert set(selected) == {"customers", "sellers", "orders", "items"}
@@ -0,0 +1,72 @@
+import duckdb
+import pytest
+
+from sql_check import catalog_names, check_sql, replace_identifier
+
+
+@pytest.fixture(scope="module")
+def conn():
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE order_facts (order_id VARCHAR, customer_state VARCHAR, "
+                 "total_order_value DOUBLE, review_score BIGINT)")
+    conn.execute("CREATE TABLE sellers (seller_id VARCHAR, seller_state VARCHAR)")
+    conn.execute("CREATE TABLE rollup_order_facts (customer_state VARCHAR, _gid BIGINT)")
+    return conn
+
+
+def test_valid_sql_is_unchanged(conn):
+    sql = "SELECT customer_state, sum(total_order_value) FROM order_facts GROUP BY 1"
+    assert check_sql(conn, sql) == {"sql": sql, "fixes": [], "error": None}
+
+
+@pytest.mark.parametrize("sql, fixed, fixes", [
+    ("SELECT sum(total_order_valu) FROM order_facts",
+     "SELECT sum(total_order_value) FROM order_facts", [("total_order_valu", "total_order_value")]),
+    ("SELECT count(*) FROM order_fact",
+     "SELECT count(*) FROM order_facts", [("order_fact", "order_facts")]),
+    ('SELECT "customer_stat", avg(review_scor) FROM order_facts GROUP BY 1',
+     'SELECT "customer_state", avg(review_score) FROM order_facts GROUP BY 1',
+     [("customer_stat", "customer_state"), ("review_scor", "review_score")]),
+])
+def test_misspelled_identifiers_are_repaired(conn, sql, fixed, fixes):
+    checked = check_sql(conn, sql)
+    assert checked["error"] is None
+    assert checked["sql"] == fixed
+    assert checked["fixes"] == fixes
+
+
+def test_string_literals_are_not_rewritten(conn):
+    checked = check_sql(conn, "SELECT count(*) FROM order_facts WHERE customer_stat = 'customer_stat'")
+    assert checked["sql"] == "SELECT count(*) FROM order_facts WHERE customer_state = 'customer_stat'"
+
+
+def test_unrelated_names_are_reported_not_guessed(conn):
+    checked = check_sql(conn, "SELECT shipping_carrier FROM order_facts")
+    assert checked["fixes"] == []
+    assert "shipping_carrier" in checked["error"]
+
+
+def test_max_fixes_is_respected(conn):
+    checked = check_sql(conn, "SELECT customer_stat, review_scor FROM order_fact", max_fixes=1)
+    assert len(checked["fixes"]) == 1
+    assert checked["error"] is not None
+
+
+def test_non_select_statements_are_not_checked(conn):
+    sql = "DROP TABLE sellerz"
+    assert check_sql(conn, sql) == {"sql": sql, "fixes": [], "error": None}
+
+
+def test_syntax_errors_are_returned(conn):
+    assert check_sql(conn, "SELEC * FROM order_facts")["error"]
+
+
+def test_catalog_excludes_rollups(conn):
+    names = catalog_names(conn)
+    assert names["tables"] == ["order_facts", "sellers"]
+    assert "_gid" not in names["columns"]
+
+
+def test_replace_identifier_keeps_quoting_and_literals():
+    sql = 'SELECT "Price", price, \'price\' FROM t'
+    assert replace_identifier(sql, "price", "unit_price") == 'SELECT "unit_price", unit_price, \'price\' FROM t'